@@ -0,0 +1,207 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from motor_amortizacao import VERSAO_MOTOR, PlanoAmortizacao
+
+CAMINHO_PADRAO = os.environ.get(
+    "SIMULADOR_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "simulacoes.sqlite")
+)
+LIMITE_BYTES_PADRAO = 256 * 1024 * 1024
+LIMITE_MEMORIA_PADRAO = 64  # resultados mantidos em memória no processo
+
+# Posições dos valores em reais de cada tipo de evento; só eles são arredondados a
+# centavos na chave (taxas, projeções e versões de séries entram com precisão total)
+CAMPOS_MONETARIOS = {
+    'unica': (2,),
+    'plano': tuple(1 + PlanoAmortizacao._fields.index(campo) for campo in ('valor', 'parcela_minima', 'saldo_minimo')),
+}
+
+
+def hash_contrato(df: pd.DataFrame) -> str:
+    """Hash do conteúdo do cronograma base, estável entre processos."""
+    valores = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    return hashlib.sha256(valores.tobytes() + ",".join(df.columns).encode()).hexdigest()
+
+
+def normalizar_cenario(eventos: Sequence[Sequence[Any]]) -> str:
+    """Representação canônica da lista de eventos do cenário (valores em reais arredondados a centavos)."""
+    normalizados = []
+    for evento in eventos:
+        monetarios = CAMPOS_MONETARIOS.get(evento[0], ())
+        normalizados.append([
+            (round(float(v), 2) if i in monetarios else float(v)) if isinstance(v, (float, np.floating)) else v
+            for i, v in enumerate(evento)
+        ])
+    return json.dumps(normalizados, separators=(",", ":"), default=str)
+
+
+def serializar_tabela(df: pd.DataFrame) -> bytes:
+    """Grava as colunas do cronograma como arrays compactados (sem pickle)."""
+    arrays = {}
+    tipos = {}
+    for i, coluna in enumerate(df.columns):
+        serie = df[coluna]
+        tipos[coluna] = str(serie.dtype)
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            arrays[f"c{i}"] = serie.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        elif serie.dtype == object:
+            arrays[f"c{i}"] = serie.fillna("").astype(str).to_numpy(dtype=str)
+            arrays[f"n{i}"] = serie.isna().to_numpy()
+        else:
+            arrays[f"c{i}"] = serie.to_numpy()
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, __colunas__=np.array(json.dumps(tipos)), **arrays)
+    return buffer.getvalue()
+
+
+def desserializar_tabela(dados: bytes) -> pd.DataFrame:
+    """Reconstrói o cronograma gravado por serializar_tabela."""
+    with np.load(io.BytesIO(dados), allow_pickle=False) as arquivo:
+        tipos = json.loads(str(arquivo["__colunas__"]))
+        colunas = {}
+        for i, (coluna, tipo) in enumerate(tipos.items()):
+            valores = arquivo[f"c{i}"]
+            if tipo.startswith("datetime64"):
+                colunas[coluna] = valores.view("datetime64[ns]")
+            elif tipo == "object":
+                valores = valores.astype(object)
+                valores[arquivo[f"n{i}"]] = None
+                colunas[coluna] = valores
+            else:
+                colunas[coluna] = valores
+    return pd.DataFrame(colunas)
+
+
+class CacheSimulacoes:
+    """Cache de resultados de simulação em SQLite, compartilhado entre sessões e reinícios.
+
+    A chave combina o hash do contrato, o cenário normalizado e a versão do motor.
+    Os resultados mais recentes também ficam em memória no processo; no disco o
+    tamanho total é limitado e os menos acessados são descartados (LRU).
+    """
+
+    def __init__(self, caminho: str = CAMINHO_PADRAO, limite_bytes: int = LIMITE_BYTES_PADRAO,
+                 limite_memoria: int = LIMITE_MEMORIA_PADRAO):
+        self.caminho = caminho
+        self.limite_bytes = limite_bytes
+        self.limite_memoria = limite_memoria
+        self.memoria: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self._trava = threading.Lock()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        with self._conectar() as conexao:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS resultados ("
+                "chave TEXT PRIMARY KEY, dados BLOB NOT NULL, tamanho INTEGER NOT NULL, ultimo_acesso REAL NOT NULL)"
+            )
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_acesso ON resultados (ultimo_acesso)")
+            conexao.execute("CREATE TABLE IF NOT EXISTS estatisticas (nome TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+
+    @staticmethod
+    def chave(hash_base: str, eventos: Sequence[Sequence[Any]]) -> str:
+        """Chave do resultado: contrato, cenário normalizado e versão do motor."""
+        conteudo = f"{hash_base}|{normalizar_cenario(eventos)}|{VERSAO_MOTOR}"
+        return hashlib.sha256(conteudo.encode()).hexdigest()
+
+    def _contar(self, conexao: sqlite3.Connection, nome: str) -> None:
+        conexao.execute(
+            "INSERT INTO estatisticas (nome, valor) VALUES (?, 1) "
+            "ON CONFLICT(nome) DO UPDATE SET valor = valor + 1",
+            (nome,)
+        )
+
+    def _lembrar(self, chave: str, df: pd.DataFrame) -> None:
+        with self._trava:
+            self.memoria[chave] = df
+            self.memoria.move_to_end(chave)
+            while len(self.memoria) > self.limite_memoria:
+                self.memoria.popitem(last=False)
+
+    def obter(self, chave: str) -> Optional[pd.DataFrame]:
+        """Resultado em cache (somente leitura) ou None."""
+        with self._trava:
+            df = self.memoria.get(chave)
+            if df is not None:
+                self.memoria.move_to_end(chave)
+                self.acertos += 1
+                return df
+
+        with self._conectar() as conexao:
+            linha = conexao.execute("SELECT dados FROM resultados WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                self._contar(conexao, "falhas")
+            else:
+                conexao.execute("UPDATE resultados SET ultimo_acesso = ? WHERE chave = ?", (time.time(), chave))
+                self._contar(conexao, "acertos")
+
+        with self._trava:
+            if linha is None:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+        df = desserializar_tabela(linha[0])
+        self._lembrar(chave, df)
+        return df
+
+    def guardar(self, chave: str, df: pd.DataFrame) -> None:
+        """Grava o resultado e descarta os menos usados se o limite de tamanho for excedido."""
+        dados = serializar_tabela(df)
+        with self._conectar() as conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO resultados (chave, dados, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?)",
+                (chave, sqlite3.Binary(dados), len(dados), time.time())
+            )
+            total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM resultados").fetchone()[0]
+            if total > self.limite_bytes:
+                excedente = total - self.limite_bytes
+                removidas = []
+                for chave_antiga, tamanho in conexao.execute(
+                    "SELECT chave, tamanho FROM resultados ORDER BY ultimo_acesso"
+                ):
+                    if excedente <= 0:
+                        break
+                    removidas.append((chave_antiga,))
+                    excedente -= tamanho
+                conexao.executemany("DELETE FROM resultados WHERE chave = ?", removidas)
+        self._lembrar(chave, df)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores do processo e totais persistidos no disco."""
+        with self._conectar() as conexao:
+            totais = dict(conexao.execute("SELECT nome, valor FROM estatisticas").fetchall())
+            entradas, tamanho = conexao.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM resultados"
+            ).fetchone()
+        return {
+            "Acertos (processo)": self.acertos,
+            "Falhas (processo)": self.falhas,
+            "Acertos (total)": totais.get("acertos", 0),
+            "Falhas (total)": totais.get("falhas", 0),
+            "Entradas em disco": entradas,
+            "Tamanho em disco (bytes)": tamanho,
+            "Entradas em memória": len(self.memoria),
+        }
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Sequence
+
+from motor_amortizacao import TAXA_JUROS_ANUAL, taxa_mensal, arrays_parcelas, juros_futuros
+
+# Tabela regressiva do IR sobre aplicações de renda fixa: (prazo em dias até, alíquota)
+TABELA_IR = (
+    (180, 0.225),
+    (360, 0.20),
+    (720, 0.175),
+    (np.inf, 0.15),
+)
+DIAS_POR_MES = 30
+
+
+def aliquota_ir(dias: np.ndarray) -> np.ndarray:
+    """Alíquota de IR da tabela regressiva para cada prazo em dias."""
+    limites = np.array([limite for limite, _ in TABELA_IR])
+    aliquotas = np.array([aliquota for _, aliquota in TABELA_IR])
+    return aliquotas[np.searchsorted(limites, np.asarray(dias), side='left')]
+
+
+def comparar_antecipacao_investimento(df: pd.DataFrame, taxas_anuais: Sequence[float],
+                                      parcelas: Sequence[int], valores: Sequence[float],
+                                      tipo_reducao: str = 'prazo',
+                                      taxa_anual: float = TAXA_JUROS_ANUAL) -> Dict[str, np.ndarray]:
+    """Compara antecipar x investir para a grade taxas × parcelas × valores numa única conta vetorizada.
+
+    A economia da antecipação é a diferença de juros de calcular_impacto, obtida pela
+    forma fechada da recorrência (juros_futuros, com a correção monetária do
+    cronograma, se houver) e medida contra o mesmo recálculo
+    sem antecipação, para isolar o efeito do valor antecipado. O investimento rende a taxa informada
+    até o fim do prazo restante, com IR regressivo sobre o rendimento. A taxa de
+    equilíbrio é a rentabilidade anual bruta que iguala os dois resultados.
+    """
+    taxa = taxa_mensal(taxa_anual)
+    dados = arrays_parcelas(df)
+    taxas_anuais = np.asarray(taxas_anuais, dtype=np.float64)
+    valores = np.asarray(valores, dtype=np.float64)
+
+    # Posição de cada parcela alvo no cronograma e prazo restante após ela
+    posicoes = np.searchsorted(dados['numero'], np.asarray(parcelas, dtype=np.int64))
+    posicoes = np.clip(posicoes, 0, len(dados['numero']) - 1)
+    restantes = (len(dados['numero']) - 1 - posicoes).astype(np.float64)
+    saldo = dados['saldo_devedor'][posicoes]
+    amortizacao = dados['amortizacao'][posicoes]
+
+    # Economia de juros (parcelas × valores)
+    saldo_grade = saldo[:, None]
+    novo_saldo = np.maximum(saldo_grade - valores[None, :], 0.0)
+    fator_correcao = dados['fator_correcao'] if np.any(dados['fator_correcao'] != 1.0) else None
+    economia = (
+        juros_futuros(saldo_grade, amortizacao[:, None], restantes[:, None], taxa, tipo_reducao,
+                      fator_correcao, posicoes[:, None])
+        - juros_futuros(novo_saldo, amortizacao[:, None], restantes[:, None], taxa, tipo_reducao,
+                        fator_correcao, posicoes[:, None])
+    )
+    valido = valores[None, :] <= saldo_grade
+
+    # Rendimento líquido do investimento (taxas × parcelas × valores)
+    ir = aliquota_ir(restantes * DIAS_POR_MES)
+    fator = (1 + taxas_anuais[:, None]) ** (restantes[None, :] / 12) - 1
+    rendimento = valores[None, None, :] * (fator * (1 - ir[None, :]))[:, :, None]
+
+    # Taxa anual que iguala rendimento líquido e juros economizados
+    with np.errstate(divide='ignore', invalid='ignore'):
+        base = 1 + economia / (valores[None, :] * (1 - ir[:, None]))
+        equilibrio = base ** (12 / restantes[:, None]) - 1
+
+    return {
+        'economia_juros': np.where(valido, economia, np.nan),
+        'rendimento_liquido': np.where(valido[None, :, :], rendimento, np.nan),
+        'vantagem_investir': np.where(valido[None, :, :], rendimento - economia[None, :, :], np.nan),
+        'taxa_equilibrio': np.where(valido & (restantes[:, None] > 0), equilibrio, np.nan),
+    }
+
@@ -0,0 +1,157 @@
+import numpy as np
+from typing import Dict, List, Any, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+class Parcela(NamedTuple):
+    """Parcela do extrato, com os campos na ordem em que aparecem no PDF."""
+    numero: int
+    vencimento: str
+    amortizacao: float
+    juros: float
+    indice_correcao_parcela: float
+    seguro_mip: float
+    seguro_dfi: float
+    seguro_res: float
+    tca: float
+    indice_correcao_saldo: float
+    multa: float
+    mora: float
+    ajuste_financeiro: float
+    fgts_mensal: float
+    parcelado_acordado: float
+    situacao_parcela: str
+    valor_parcela: float
+    saldo_devedor: float
+
+    tipo = 'parcela'
+
+    @property
+    def data_evento(self) -> str:
+        return self.vencimento
+
+    def para_dict(self) -> Dict[str, Any]:
+        """Converte a parcela para o formato gravado no JSON."""
+        return {'tipo': self.tipo, **self._asdict()}
+
+
+class Operacao(NamedTuple):
+    """Operação especial do extrato (implantação, seguro, amortização extra...)."""
+    descricao: str
+    data: Optional[str]
+    valor: Optional[float] = None
+    juros_pro_rata: Optional[float] = None
+    atualizacao_monetaria: Optional[float] = None
+
+    tipo = 'operacao'
+
+    @property
+    def data_evento(self) -> Optional[str]:
+        return self.data
+
+    @property
+    def eh_amortizacao(self) -> bool:
+        return 'amortizacao' in self.descricao.lower()
+
+    def para_dict(self) -> Dict[str, Any]:
+        """Converte a operação para o formato gravado no JSON, omitindo campos vazios."""
+        dados = {'tipo': self.tipo, **self._asdict()}
+        return {k: v for k, v in dados.items() if v is not None}
+
+
+Evento = Union[Parcela, Operacao]
+
+# Campos textuais das parcelas; todos os demais (exceto 'numero') são monetários/índices
+CAMPOS_TEXTO_PARCELA = ('vencimento', 'situacao_parcela')
+CAMPOS_NUMERICOS_PARCELA = tuple(
+    campo for campo in Parcela._fields if campo != 'numero' and campo not in CAMPOS_TEXTO_PARCELA
+)
+CAMPOS_NUMERICOS_OPERACAO = ('valor', 'juros_pro_rata', 'atualizacao_monetaria')
+
+
+def _validar_campos(dados: Dict[str, Any], obrigatorios: Sequence[str], permitidos: Sequence[str]) -> None:
+    """Falha caso o evento tenha campos ausentes ou desconhecidos."""
+    faltando = [campo for campo in obrigatorios if campo not in dados]
+    extras = [campo for campo in dados if campo not in permitidos and campo != 'tipo']
+    if faltando or extras:
+        raise ValueError(
+            f"Evento '{dados.get('tipo')}' fora do esquema: "
+            f"campos ausentes {faltando}, campos desconhecidos {extras}"
+        )
+
+
+def parcela_de_dict(dados: Dict[str, Any]) -> Parcela:
+    """Valida e converte um dicionário de parcela do JSON em Parcela."""
+    _validar_campos(dados, Parcela._fields, Parcela._fields)
+    valores = {campo: float(dados[campo]) for campo in CAMPOS_NUMERICOS_PARCELA}
+    return Parcela(
+        numero=int(dados['numero']),
+        vencimento=str(dados['vencimento']),
+        situacao_parcela=str(dados['situacao_parcela']),
+        **valores
+    )
+
+
+def operacao_de_dict(dados: Dict[str, Any]) -> Operacao:
+    """Valida e converte um dicionário de operação do JSON em Operacao."""
+    _validar_campos(dados, ('descricao',), Operacao._fields)
+    valores = {
+        campo: float(dados[campo]) if dados.get(campo) is not None else None
+        for campo in CAMPOS_NUMERICOS_OPERACAO
+    }
+    return Operacao(descricao=str(dados['descricao']), data=dados.get('data'), **valores)
+
+
+def evento_de_dict(dados: Dict[str, Any]) -> Evento:
+    """Converte um evento do JSON no registro tipado correspondente."""
+    tipo = dados.get('tipo')
+    if tipo == Parcela.tipo:
+        return parcela_de_dict(dados)
+    if tipo == Operacao.tipo:
+        return operacao_de_dict(dados)
+    raise ValueError(f"Tipo de evento desconhecido: {tipo!r}")
+
+
+def eventos_de_json(eventos: List[Dict[str, Any]]) -> Tuple[List[Parcela], List[Operacao]]:
+    """Converte a lista de eventos do JSON, separando parcelas e operações."""
+    parcelas = []
+    operacoes = []
+    for dados in eventos:
+        evento = evento_de_dict(dados)
+        if isinstance(evento, Parcela):
+            parcelas.append(evento)
+        else:
+            operacoes.append(evento)
+    return parcelas, operacoes
+
+
+def parcelas_para_colunas(parcelas: Sequence[Parcela]) -> Dict[str, np.ndarray]:
+    """Transpõe uma lista de parcelas diretamente em arrays colunares."""
+    if not parcelas:
+        colunas = {campo: np.empty(0, dtype=np.float64) for campo in CAMPOS_NUMERICOS_PARCELA}
+        colunas['numero'] = np.empty(0, dtype=np.int64)
+        for campo in CAMPOS_TEXTO_PARCELA:
+            colunas[campo] = np.empty(0, dtype=object)
+        return colunas
+
+    # zip(*) transpõe as tuplas sem criar dicionários intermediários
+    transposto = dict(zip(Parcela._fields, zip(*parcelas)))
+    colunas = {'numero': np.fromiter(transposto['numero'], dtype=np.int64, count=len(parcelas))}
+    for campo in CAMPOS_NUMERICOS_PARCELA:
+        colunas[campo] = np.fromiter(transposto[campo], dtype=np.float64, count=len(parcelas))
+    for campo in CAMPOS_TEXTO_PARCELA:
+        colunas[campo] = np.array(transposto[campo], dtype=object)
+    return colunas
+
+
+def operacoes_para_colunas(operacoes: Sequence[Operacao]) -> Dict[str, np.ndarray]:
+    """Transpõe uma lista de operações em arrays colunares (campos ausentes viram NaN)."""
+    colunas = {
+        'descricao': np.array([op.descricao for op in operacoes], dtype=object),
+        'data': np.array([op.data for op in operacoes], dtype=object),
+    }
+    for campo in CAMPOS_NUMERICOS_OPERACAO:
+        colunas[campo] = np.array(
+            [np.nan if getattr(op, campo) is None else getattr(op, campo) for op in operacoes],
+            dtype=np.float64
+        )
+    return colunas
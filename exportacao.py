@@ -0,0 +1,183 @@
+import argparse
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from eventos import eventos_de_json, parcelas_para_colunas
+
+try:
+    import xlsxwriter
+except ImportError:  # exportação XLSX opcional
+    xlsxwriter = None
+
+TAMANHO_BLOCO = 10000
+LIMITE_LINHAS_XLSX = 1048576 - 1  # por planilha, descontando o cabeçalho
+COLUNAS_INTEIRAS = ('numero',)
+COLUNAS_INDICES = ('indice_correcao_parcela', 'indice_correcao_saldo', 'fator_correcao')  # fatores: sem arredondar a centavos
+TROCA_SEPARADORES = str.maketrans(',.', '.,')
+
+# Fonte de exportação: (rótulos fixos da fonte, ex. {'contrato': ...}, colunas como arrays)
+Fonte = Tuple[Dict[str, Any], Dict[str, np.ndarray]]
+
+
+def colunas_tabela(df: pd.DataFrame, colunas: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """Arrays das colunas do DataFrame, sem cópia para as colunas numéricas."""
+    return {coluna: df[coluna].to_numpy() for coluna in (colunas or list(df.columns))}
+
+
+def colunas_contrato(caminho_json: str) -> Dict[str, np.ndarray]:
+    """Arrays das parcelas de um contrato direto do JSON, sem montar DataFrame."""
+    with open(caminho_json, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+    parcelas, _ = eventos_de_json(dados["eventos"])
+    return parcelas_para_colunas(parcelas)
+
+
+def _formatar_bloco(nome: str, valores: np.ndarray, formato: str) -> List[str]:
+    """Converte um bloco de uma coluna para texto no formato bruto ou brasileiro."""
+    if np.issubdtype(valores.dtype, np.datetime64):
+        padrao = '%d/%m/%Y' if formato == 'br' else '%Y-%m-%d'
+        return ['' if pd.isnull(v) else pd.Timestamp(v).strftime(padrao) for v in valores]
+    if np.issubdtype(valores.dtype, np.number):
+        valores = valores.astype(np.float64)
+        if nome in COLUNAS_INTEIRAS:
+            return ['' if np.isnan(v) else str(int(v)) for v in valores]
+        if formato == 'br' and nome in COLUNAS_INDICES:
+            return ['' if np.isnan(v) else repr(float(v)).replace('.', ',') for v in valores]
+        if formato == 'br':
+            return ['' if np.isnan(v) else f"{v:,.2f}".translate(TROCA_SEPARADORES) for v in valores]
+        return ['' if np.isnan(v) else repr(float(v)) for v in valores]
+    return ['' if v is None or (isinstance(v, float) and np.isnan(v)) else str(v) for v in valores]
+
+
+def blocos_linhas(fontes: Iterable[Fonte], formato: str = 'bruto',
+                  tamanho_bloco: int = TAMANHO_BLOCO) -> Iterator[Tuple[List[str], List[List[str]]]]:
+    """Percorre as fontes em blocos de linhas já formatadas, uma fonte por vez.
+
+    Só um bloco fica materializado como texto em cada momento, o que mantém a
+    memória limitada mesmo para milhares de contratos.
+    """
+    for rotulos, colunas in fontes:
+        cabecalho = list(rotulos) + list(colunas)
+        total = len(next(iter(colunas.values()))) if colunas else 0
+        for inicio in range(0, total, tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, total)
+            textos = [[str(valor)] * (fim - inicio) for valor in rotulos.values()]
+            textos += [_formatar_bloco(nome, valores[inicio:fim], formato) for nome, valores in colunas.items()]
+            yield cabecalho, [list(linha) for linha in zip(*textos)]
+
+
+def escrever_csv(destino: io.TextIOBase, fontes: Iterable[Fonte], formato: str = 'bruto',
+                 tamanho_bloco: int = TAMANHO_BLOCO) -> int:
+    """Grava as fontes em CSV bloco a bloco; 'br' usa ';' e números no padrão brasileiro."""
+    escritor = csv.writer(destino, delimiter=';' if formato == 'br' else ',', lineterminator='\n')
+    cabecalho_escrito = None
+    linhas = 0
+    for cabecalho, bloco in blocos_linhas(fontes, formato, tamanho_bloco):
+        if cabecalho != cabecalho_escrito:
+            escritor.writerow(cabecalho)
+            cabecalho_escrito = cabecalho
+        escritor.writerows(bloco)
+        linhas += len(bloco)
+    return linhas
+
+
+def exportar_csv_bytes(fontes: Iterable[Fonte], formato: str = 'bruto') -> bytes:
+    """CSV em bytes (UTF-8 com BOM, para abrir corretamente no Excel) para download."""
+    buffer = io.BytesIO()
+    texto = io.TextIOWrapper(buffer, encoding='utf-8-sig', newline='')
+    escrever_csv(texto, fontes, formato)
+    texto.flush()
+    texto.detach()
+    return buffer.getvalue()
+
+
+def xlsx_disponivel() -> bool:
+    return xlsxwriter is not None
+
+
+def escrever_xlsx(destino: Any, fontes: Iterable[Fonte], formato: str = 'bruto',
+                  tamanho_bloco: int = TAMANHO_BLOCO) -> int:
+    """Grava as fontes em XLSX linha a linha (modo de memória constante do xlsxwriter).
+
+    Ao atingir o limite de linhas do Excel uma nova planilha é criada. No formato
+    'br' os valores seguem numéricos, com formato de exibição 0.000,00 (índices com
+    seis casas) e datas dd/mm/aaaa.
+    """
+    if xlsxwriter is None:
+        raise RuntimeError("Exportação XLSX requer o pacote 'xlsxwriter' (pip install xlsxwriter).")
+
+    livro = xlsxwriter.Workbook(destino, {'constant_memory': True, 'in_memory': False})
+    formato_valor = livro.add_format({'num_format': '#,##0.00'}) if formato == 'br' else None
+    formato_indice = livro.add_format({'num_format': '0.000000'}) if formato == 'br' else None
+    formato_data = livro.add_format({'num_format': 'dd/mm/yyyy' if formato == 'br' else 'yyyy-mm-dd'})
+    planilha = None
+    cabecalho_escrito = None
+    linha_planilha = 0
+    linhas = 0
+
+    for rotulos, colunas in fontes:
+        cabecalho = list(rotulos) + list(colunas)
+        total = len(next(iter(colunas.values()))) if colunas else 0
+        for inicio in range(0, total, tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, total)
+            blocos = [np.full(fim - inicio, valor, dtype=object) for valor in rotulos.values()]
+            blocos += [valores[inicio:fim] for valores in colunas.values()]
+            for i in range(fim - inicio):
+                if planilha is None or linha_planilha > LIMITE_LINHAS_XLSX or cabecalho != cabecalho_escrito:
+                    planilha = livro.add_worksheet(f"Dados {len(livro.worksheets()) + 1}")
+                    planilha.write_row(0, 0, cabecalho)
+                    cabecalho_escrito = cabecalho
+                    linha_planilha = 1
+                for j, (nome, bloco) in enumerate(zip(cabecalho, blocos)):
+                    valor = bloco[i]
+                    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+                        continue
+                    if isinstance(valor, np.datetime64):
+                        planilha.write_datetime(linha_planilha, j, pd.Timestamp(valor).to_pydatetime(), formato_data)
+                    elif isinstance(valor, (int, float, np.number)):
+                        if nome in COLUNAS_INTEIRAS:
+                            formato_numero = None
+                        elif nome in COLUNAS_INDICES:
+                            formato_numero = formato_indice
+                        else:
+                            formato_numero = formato_valor
+                        planilha.write_number(linha_planilha, j, float(valor), formato_numero)
+                    else:
+                        planilha.write_string(linha_planilha, j, str(valor))
+                linha_planilha += 1
+                linhas += 1
+
+    livro.close()
+    return linhas
+
+
+def exportar_xlsx_bytes(fontes: Iterable[Fonte], formato: str = 'bruto') -> bytes:
+    """XLSX em bytes para download."""
+    buffer = io.BytesIO()
+    escrever_xlsx(buffer, fontes, formato)
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta cronogramas de um ou mais contratos para CSV ou XLSX")
+    parser.add_argument("contratos", nargs="+", help="Arquivos JSON gerados pelo pdf_to_json_converter.py")
+    parser.add_argument("--saida", required=True, help="Arquivo de saída (.csv ou .xlsx)")
+    parser.add_argument("--formato", choices=["bruto", "br"], default="bruto", help="Valores brutos ou no padrão brasileiro")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="Linhas formatadas por bloco")
+    args = parser.parse_args()
+
+    # Gerador: cada contrato é lido apenas quando chega sua vez de ser gravado
+    fontes = (({'contrato': caminho}, colunas_contrato(caminho)) for caminho in args.contratos)
+    if args.saida.lower().endswith(".xlsx"):
+        if not xlsx_disponivel():
+            parser.error("exportação XLSX requer o pacote 'xlsxwriter' (pip install xlsxwriter)")
+        total = escrever_xlsx(args.saida, fontes, args.formato, args.bloco)
+    else:
+        with open(args.saida, 'w', encoding='utf-8-sig', newline='') as f:
+            total = escrever_csv(f, fontes, args.formato, args.bloco)
+    print(f"{total} linhas exportadas para {args.saida}")
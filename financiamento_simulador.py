@@ -3,10 +3,28 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import json
+import math
+import os
+import pickle
+import sys
 import plotly.express as px
 import plotly.graph_objects as go
 from decimal import Decimal, ROUND_HALF_UP
 
+from eventos import eventos_de_json, parcelas_para_colunas, operacoes_para_colunas
+from kernel_amortizacao import TOLERANCIA_PRAZO
+from motor_amortizacao import (
+    TAXA_JUROS_ANUAL, taxa_mensal, sensibilidade_juros, PlanoAmortizacao, simular_planos,
+    SITUACAO_SIMULADA, extras_existentes, aplicar_amortizacoes
+)
+from comparador_investimento import comparar_antecipacao_investimento
+from cache_simulacoes import CacheSimulacoes, hash_contrato
+from tarifas import COLUNAS_TARIFAS, tabela_do_extrato, aplicar_tarifas
+from meta_amortizacao import resolver_meta, parcela_limite
+from portabilidade import OfertaPortabilidade, SISTEMAS, avaliar_ofertas
+from indices import BaseIndices, fatores_do_extrato, aplicar_correcao, conferir_extrato
+from exportacao import colunas_tabela, exportar_csv_bytes, exportar_xlsx_bytes, xlsx_disponivel
+
 # Configuração da página
 st.set_page_config(
     page_title="Simulador de Financiamento",
@@ -52,11 +70,16 @@ def formatar_percentual(valor, casas_decimais=2):
         return "0,00%"
 
 def carregar_dados_json(caminho_json="financiamento.json"):
-    """Carrega os dados do arquivo JSON gerado pelo pdf_to_json_converter.py"""
+    """Carrega os dados do arquivo JSON gerado pelo pdf_to_json_converter.py, validando os eventos"""
     try:
         with open(caminho_json, 'r', encoding='utf-8') as f:
             dados = json.load(f)
-        return dados
+        parcelas, operacoes = eventos_de_json(dados["eventos"])
+        return {
+            "metadados": dados.get("metadados", {}),
+            "parcelas": parcelas,
+            "operacoes": operacoes
+        }
     except Exception as e:
         st.error(f"Erro ao carregar arquivo JSON: {str(e)}")
         return None
@@ -64,47 +87,47 @@ def carregar_dados_json(caminho_json="financiamento.json"):
 def criar_tabela_consolidada(dados_json):
     """Cria uma tabela consolidada com parcelas e operações de amortização"""
     try:
-        # Criar DataFrame para parcelas
-        parcelas = []
-        for evento in dados_json["eventos"]:
-            if evento["tipo"] == "parcela":
-                parcela = {
-                    "numero": evento["numero"],
-                    "vencimento": evento["vencimento"],
-                    "amortizacao": evento["amortizacao"],
-                    "juros": evento["juros"],
-                    "seguro_mip": evento.get("seguro_mip", 0),
-                    "seguro_df": evento.get("seguro_df", 0),
-                    "taxa_adm": evento.get("taxa_adm", 0),
-                    "valor_parcela": evento["valor_parcela"],
-                    "saldo_devedor": evento["saldo_devedor"],
-                    "situacao_parcela": evento["situacao_parcela"],
-                    "tipo": "parcela",
-                    "data": datetime.strptime(evento["vencimento"], "%d/%m/%Y")
-                }
-                parcelas.append(parcela)
-            elif evento["tipo"] == "operacao" and "amortizacao" in evento.get("descricao", "").lower():
-                operacao = {
-                    "numero": None,
-                    "vencimento": evento["data"],
-                    "amortizacao": evento.get("valor", 0),
-                    "juros": evento.get("juros_pro_rata", 0),
-                    "seguro_mip": None,
-                    "seguro_df": None,
-                    "taxa_adm": None,
-                    "valor_parcela": evento.get("valor", 0),
-                    "saldo_devedor": None,
-                    "situacao_parcela": "Amortizado",
-                    "tipo": "amortizacao",
-                    "data": datetime.strptime(evento["data"], "%d/%m/%Y")
-                }
-                parcelas.append(operacao)
+        # Parcelas: arrays colunares direto dos registros tipados
+        colunas = parcelas_para_colunas(dados_json["parcelas"])
+        df_parcelas = pd.DataFrame({
+            "numero": colunas["numero"],
+            "vencimento": colunas["vencimento"],
+            "amortizacao": colunas["amortizacao"],
+            "juros": colunas["juros"],
+            "seguro_mip": colunas["seguro_mip"],
+            "seguro_dfi": colunas["seguro_dfi"],
+            "seguro_res": colunas["seguro_res"],
+            "tca": colunas["tca"],
+            "valor_parcela": colunas["valor_parcela"],
+            "saldo_devedor": colunas["saldo_devedor"],
+            "situacao_parcela": colunas["situacao_parcela"],
+            "tipo": "parcela",
+            "data": pd.to_datetime(colunas["vencimento"], format="%d/%m/%Y")
+        })
         
-        # Criar DataFrame
-        df = pd.DataFrame(parcelas)
+        # Operações de amortização extra
+        amortizacoes = [op for op in dados_json["operacoes"] if op.eh_amortizacao]
+        colunas_op = operacoes_para_colunas(amortizacoes)
+        df_operacoes = pd.DataFrame({
+            "numero": np.nan,
+            "vencimento": colunas_op["data"],
+            "amortizacao": np.nan_to_num(colunas_op["valor"]),
+            "juros": np.nan_to_num(colunas_op["juros_pro_rata"]),
+            "seguro_mip": np.nan,
+            "seguro_dfi": np.nan,
+            "seguro_res": np.nan,
+            "tca": np.nan,
+            "valor_parcela": np.nan_to_num(colunas_op["valor"]),
+            "saldo_devedor": np.nan,
+            "situacao_parcela": "Amortizado",
+            "tipo": "amortizacao",
+            "data": pd.to_datetime(colunas_op["data"], format="%d/%m/%Y")
+        })
+        
+        df = pd.concat([df_parcelas, df_operacoes], ignore_index=True)
         
-        # Ordenar por data
-        df = df.sort_values("data")
+        # Ordenar por data (parcelas antes das operações do mesmo dia)
+        df = df.sort_values("data", kind="stable").reset_index(drop=True)
         
         # Calcular saldo devedor para operações de amortização
         saldo_atual = None
@@ -125,7 +148,7 @@ def criar_tabela_consolidada(dados_json):
         st.error(f"Erro ao criar tabela consolidada: {str(e)}")
         return None
 
-def calcular_nova_tabela(df, parcela_alvo, valor_amortizacao, tipo_reducao='prazo'):
+def calcular_nova_tabela(df, parcela_alvo, valor_amortizacao, tipo_reducao='prazo', taxa_juros_anual=TAXA_JUROS_ANUAL):
     """Calcula nova tabela após amortização com opção de tipo de redução"""
     try:
         # Inicializar lista de logs
@@ -154,9 +177,8 @@ def calcular_nova_tabela(df, parcela_alvo, valor_amortizacao, tipo_reducao='praz
             st.error("Valor da amortização maior que o saldo devedor!")
             return df
             
-        # Taxa de juros anual do contrato
-        taxa_juros_anual = 0.10490  # 10.49%
-        taxa_juros_mensal = (1 + taxa_juros_anual) ** (1/12) - 1
+        # Taxa de juros do contrato (anual informada, mensal equivalente)
+        taxa_juros_mensal = taxa_mensal(taxa_juros_anual)
         
         logs.append({
             'titulo': "Parâmetros do Cálculo",
@@ -168,6 +190,23 @@ def calcular_nova_tabela(df, parcela_alvo, valor_amortizacao, tipo_reducao='praz
             }
         })
         
+        # Amortizações do extrato a partir da parcela alvo: refazer tudo numa única recorrência
+        posicao = int((df_novo['tipo'].to_numpy()[:idx] == 'parcela').sum())
+        existentes = extras_existentes(df_novo, posicao)
+        if existentes.any():
+            extras = np.zeros(len(existentes))
+            extras[posicao] = valor_amortizacao
+            df_novo = aplicar_amortizacoes(df_novo, extras, tipo_reducao, taxa_juros_anual)
+            logs.append({
+                'titulo': "Amortizações Existentes Refeitas",
+                'dados': {
+                    "Amortizações a partir da Parcela": f"R$ {existentes.sum():,.2f}",
+                    "Parcelas após Simulação": int((df_novo['tipo'] == 'parcela').sum())
+                }
+            })
+            st.session_state.debug_logs = logs
+            return df_novo
+        
         # Criar linha de amortização extra
         nova_linha = pd.Series({
             'numero': None,
@@ -175,11 +214,12 @@ def calcular_nova_tabela(df, parcela_alvo, valor_amortizacao, tipo_reducao='praz
             'amortizacao': valor_amortizacao,
             'juros': 0,  # Juros pro-rata seriam calculados se necessário
             'seguro_mip': 0,
-            'seguro_df': 0,
-            'taxa_adm': 0,
+            'seguro_dfi': 0,
+            'seguro_res': 0,
+            'tca': 0,
             'valor_parcela': valor_amortizacao,
             'saldo_devedor': saldo_atual - valor_amortizacao,
-            'situacao_parcela': 'Amortizado',
+            'situacao_parcela': SITUACAO_SIMULADA,
             'tipo': 'amortizacao',
             'data': pd.to_datetime(parcela_atual['vencimento'], format='%d/%m/%Y')
         })
@@ -187,40 +227,50 @@ def calcular_nova_tabela(df, parcela_alvo, valor_amortizacao, tipo_reducao='praz
         # Inserir linha de amortização após a parcela atual
         df_novo = pd.concat([
             df_novo.iloc[:idx+1],
-            pd.DataFrame([nova_linha]),
+            pd.DataFrame([nova_linha]).dropna(axis=1, how='all'),
             df_novo.iloc[idx+1:]
         ]).reset_index(drop=True)
         
         # Atualizar saldo devedor após amortização
         novo_saldo = nova_linha['saldo_devedor']
         
+        # Parcelas seguintes à amortização (posições no novo cronograma)
+        posicoes_seguintes = idx + 2 + np.flatnonzero(df_novo['tipo'].to_numpy()[idx + 2:] == 'parcela')
+        parcelas_restantes = len(posicoes_seguintes)
+        
         if tipo_reducao == 'prazo':
-            # Dados iniciais
-            valor_parcela_atual = parcela_atual['valor_parcela']
-            parcelas_restantes = len(df_novo[df_novo['tipo'] == 'parcela']) - (idx + 1)
-            
-            # Calcular novo prazo (n')
-            # n' = SD' / (P - (SD' * i))
-            novo_prazo = int(novo_saldo / (valor_parcela_atual - (novo_saldo * taxa_juros_mensal)))
-            
-            # Calcular nova amortização mensal (A')
-            # A' = SD' / n'
-            nova_amortizacao_mensal = novo_saldo / novo_prazo
-            
-            logs.append({
-                'titulo': "Cálculo de Redução de Prazo",
-                'dados': {
-                    "Saldo Após Amortização": f"R$ {novo_saldo:,.2f}",
-                    "Valor da Parcela Atual": f"R$ {valor_parcela_atual:,.2f}",
-                    "Parcelas Restantes Original": parcelas_restantes,
-                    "Novo Prazo": novo_prazo,
-                    "Nova Amortização Mensal": f"R$ {nova_amortizacao_mensal:,.2f}"
-                }
-            })
+            # Dados iniciais: amortização atual da parcela, que a redução de prazo procura manter
+            amortizacao_atual = parcela_atual['amortizacao']
             
-            # Ajustar o dataframe para o novo prazo
-            if novo_prazo < parcelas_restantes:
-                df_novo = df_novo.iloc[:idx + 2 + novo_prazo].copy()
+            # Calcular novo prazo (n'): menor prazo em que a amortização não passa da atual
+            # n' = teto(SD' / A), limitado às parcelas restantes
+            if novo_saldo <= 0:
+                novo_prazo = 0
+            else:
+                novo_prazo = min(max(math.ceil(novo_saldo / amortizacao_atual - TOLERANCIA_PRAZO), 1), parcelas_restantes)
+        else:
+            # Redução de valor: mesmo prazo, amortização menor
+            novo_prazo = parcelas_restantes if novo_saldo > 0 else 0
+        
+        # Calcular nova amortização mensal (A')
+        # A' = SD' / n'
+        nova_amortizacao_mensal = novo_saldo / novo_prazo if novo_prazo > 0 else 0.0
+        
+        logs.append({
+            'titulo': "Cálculo de Redução de Prazo" if tipo_reducao == 'prazo' else "Cálculo de Redução de Valor",
+            'dados': {
+                "Saldo Após Amortização": f"R$ {novo_saldo:,.2f}",
+                "Amortização Atual": f"R$ {parcela_atual['amortizacao']:,.2f}",
+                "Parcelas Restantes Original": parcelas_restantes,
+                "Novo Prazo": novo_prazo,
+                "Nova Amortização Mensal": f"R$ {nova_amortizacao_mensal:,.2f}"
+            }
+        })
+        
+        # Ajustar o dataframe para o novo prazo
+        if novo_prazo < parcelas_restantes:
+            fim = posicoes_seguintes[novo_prazo - 1] if novo_prazo > 0 else idx + 1
+            df_novo = df_novo.iloc[:fim + 1].copy()
         
         # Recalcular parcelas futuras
         for i in range(idx + 2, len(df_novo)):
@@ -233,7 +283,7 @@ def calcular_nova_tabela(df, parcela_alvo, valor_amortizacao, tipo_reducao='praz
                 # 2. Calcular juros sobre novo saldo
                 juros = saldo_anterior * taxa_juros_mensal
                 
-                # 3. Calcular valor da parcela (deve ser praticamente igual à anterior)
+                # 3. Amortização + juros (seguros e tarifas são somados depois, de forma vetorizada)
                 valor_parcela = amortizacao + juros
                 
                 # 4. Atualizar saldo
@@ -250,11 +300,24 @@ def calcular_nova_tabela(df, parcela_alvo, valor_amortizacao, tipo_reducao='praz
                         "Saldo Anterior": f"R$ {saldo_anterior:,.2f}",
                         "Amortização": f"R$ {amortizacao:,.2f}",
                         "Juros": f"R$ {juros:,.2f}",
-                        "Valor da Parcela": f"R$ {valor_parcela:,.2f}",
+                        "Amortização + Juros": f"R$ {valor_parcela:,.2f}",
                         "Novo Saldo": f"R$ {novo_saldo:,.2f}"
                     }
                 })
         
+        # Seguros e tarifas das parcelas recalculadas: MIP sobre o novo saldo, pelas taxas do cronograma
+        linhas_recalculadas = np.arange(idx + 2, len(df_novo))
+        aplicar_tarifas(df_novo, linhas_recalculadas, tabela_do_extrato(df))
+        
+        if len(linhas_recalculadas) > 0:
+            logs.append({
+                'titulo': "Seguros e Tarifas Recalculados",
+                'dados': {
+                    coluna: f"R$ {df_novo[coluna].iloc[linhas_recalculadas].sum():,.2f}"
+                    for coluna in COLUNAS_TARIFAS
+                }
+            })
+        
         # Recalcular valores acumulados
         df_novo['valor_total_pago'] = df_novo['valor_parcela'].cumsum()
         df_novo['valor_total_amortizado'] = df_novo['amortizacao'].cumsum()
@@ -300,20 +363,524 @@ def calcular_impacto(df_original, df_simulado):
         'economia_total': economia_total
     }
 
-# Inicialização dos dados
-dados_json = carregar_dados_json()
+# Tabelas e gráficos em cache: só são reconstruídos quando os dados de entrada mudam
+@st.cache_data(max_entries=32)
+def formatar_tabela(df, colunas_monetarias, contabil=True):
+    """Cópia do cronograma com as colunas monetárias formatadas para exibição"""
+    df_display = df.copy()
+    for col in colunas_monetarias:
+        if contabil:
+            df_display[col] = df_display[col].apply(lambda x: formatar_valor_contabil(x) if pd.notnull(x) else "-")
+        else:
+            df_display[col] = df_display[col].apply(lambda x: f"R$ {x:,.2f}" if pd.notnull(x) else "-")
+    return df_display
+
+@st.cache_data(max_entries=32)
+def figura_proporcao_pagamento(principal_pago, juros_pagos, valor_restante):
+    """Gráfico de barras empilhadas com a proporção de principal, juros e saldo"""
+    fig = go.Figure()
+    
+    # Adicionar as barras em sequência
+    fig.add_trace(go.Bar(
+        name='Principal Pago',
+        x=[principal_pago],
+        y=[''],
+        orientation='h',
+        marker=dict(color='#2ecc71'),
+        text=formatar_valor_contabil(principal_pago),
+        textposition='auto',
+        hovertemplate=f'Principal Pago: {formatar_valor_contabil(principal_pago)}<extra></extra>'
+    ))
+    
+    fig.add_trace(go.Bar(
+        name='Juros Pagos',
+        x=[juros_pagos],
+        y=[''],
+        orientation='h',
+        marker=dict(color='#e74c3c'),
+        text=formatar_valor_contabil(juros_pagos),
+        textposition='auto',
+        hovertemplate=f'Juros Pagos: {formatar_valor_contabil(juros_pagos)}<extra></extra>'
+    ))
+    
+    fig.add_trace(go.Bar(
+        name='Saldo Devedor',
+        x=[valor_restante],
+        y=[''],
+        orientation='h',
+        marker=dict(color='#ecf0f1'),
+        text=formatar_valor_contabil(valor_restante),
+        textposition='auto',
+        hovertemplate=f'Saldo Devedor: {formatar_valor_contabil(valor_restante)}<extra></extra>'
+    ))
+    
+    # Atualizar o layout
+    fig.update_layout(
+        barmode='stack',
+        height=100,
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        margin=dict(l=0, r=0, t=30, b=0),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        xaxis=dict(
+            showgrid=False,
+            zeroline=False,
+            showline=False,
+            showticklabels=False
+        ),
+        yaxis=dict(
+            showgrid=False,
+            zeroline=False,
+            showline=False,
+            showticklabels=False
+        )
+    )
+    
+    return fig
+
+@st.cache_data(max_entries=32)
+def figura_taxa_equilibrio(valores_grade, parcelas_futuras, taxa_equilibrio):
+    """Mapa de calor da taxa de equilíbrio entre antecipar e investir"""
+    fig = go.Figure(go.Heatmap(
+        x=valores_grade,
+        y=parcelas_futuras,
+        z=taxa_equilibrio * 100,
+        colorscale='RdYlGn_r',
+        colorbar=dict(title='% a.a.'),
+        hovertemplate='Parcela %{y}<br>Valor R$ %{x:,.2f}<br>Equilíbrio %{z:.2f}% a.a.<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        xaxis_title='Valor Antecipado (R$)',
+        yaxis_title='Número da Parcela',
+        height=400,
+        margin=dict(t=0, b=0)
+    )
+    
+    return fig
+
+@st.cache_data(max_entries=32)
+def figura_vantagem_rendimento(rendimentos_grade, vantagem_investir, taxa_equilibrio):
+    """Vantagem de investir em vez de antecipar para cada rendimento anual da grade"""
+    fig = go.Figure(go.Scatter(
+        x=rendimentos_grade * 100,
+        y=vantagem_investir,
+        mode='lines+markers',
+        line=dict(color='#2ecc71'),
+        hovertemplate='Rendimento %{x:.2f}% a.a.<br>Vantagem R$ %{y:,.2f}<extra></extra>'
+    ))
+    fig.add_hline(y=0, line_dash='dot', line_color='gray')
+    if np.isfinite(taxa_equilibrio):
+        fig.add_vline(x=taxa_equilibrio * 100, line_dash='dash', line_color='#e74c3c')
+    
+    fig.update_layout(
+        xaxis_title='Rendimento Bruto Anual (%)',
+        yaxis_title='Investir - Antecipar (R$)',
+        height=300,
+        margin=dict(t=0, b=0)
+    )
+    
+    return fig
+
+@st.cache_data(max_entries=32)
+def figura_evolucao_saldo(df_original, df_simulado):
+    """Gráfico da evolução do saldo devedor com e sem antecipação"""
+    # Filtrar apenas valores positivos do saldo devedor
+    df_plot_original = df_original[df_original['saldo_devedor'] > 0]
+    df_plot_simulado = df_simulado[df_simulado['saldo_devedor'] > 0]
+    
+    fig = go.Figure()
+    
+    # Adicionar linha do cenário original
+    fig.add_trace(go.Scatter(
+        x=df_plot_original['data'],
+        y=df_plot_original['saldo_devedor'],
+        name='Sem Antecipação',
+        line=dict(color='#3498db')
+    ))
+    
+    # Adicionar linha do cenário simulado
+    fig.add_trace(go.Scatter(
+        x=df_plot_simulado['data'],
+        y=df_plot_simulado['saldo_devedor'],
+        name='Com Antecipação',
+        line=dict(color='#2ecc71')
+    ))
+    
+    fig.update_layout(
+        xaxis_title='Data',
+        yaxis_title='Saldo Devedor (R$)',
+        height=400,
+        yaxis=dict(
+            rangemode='nonnegative'  # Força o eixo Y a começar do zero
+        ),
+        margin=dict(t=0, b=0)  # Remove margens superior e inferior
+    )
+    
+    return fig
+
+@st.cache_data(max_entries=32)
+def figura_sensibilidade(df_simulado, tipo_reducao, valor_amortizacao):
+    """Curva do valor de R$ 1 antecipado em cada parcela futura"""
+    df_sensibilidade = sensibilidade_juros(df_simulado, tipo_reducao, valor_amortizacao)
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=df_sensibilidade['numero'],
+        y=df_sensibilidade['economia_marginal'],
+        name='Economia marginal (R$ por R$ 1)',
+        line=dict(color='#9b59b6')
+    ))
+    
+    if 'economia_media' in df_sensibilidade:
+        fig.add_trace(go.Scatter(
+            x=df_sensibilidade['numero'],
+            y=df_sensibilidade['economia_media'],
+            name=f'Economia média para {formatar_valor_contabil(valor_amortizacao)}',
+            line=dict(color='#e67e22', dash='dash')
+        ))
+    
+    fig.update_layout(
+        xaxis_title='Número da Parcela',
+        yaxis_title='Juros economizados por R$ 1',
+        height=400,
+        margin=dict(t=0, b=0)
+    )
+    
+    return fig
+
+@st.cache_data(max_entries=32)
+def figura_evolucao_parcelas(df_original, df_simulado):
+    """Gráfico da evolução do valor das parcelas original e simulado"""
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=df_original['numero'],
+        y=df_original['valor_parcela'],
+        name='Original',
+        line=dict(color='#3498db')
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=df_simulado['numero'],
+        y=df_simulado['valor_parcela'],
+        name='Simulado',
+        line=dict(color='#2ecc71')
+    ))
+    
+    fig.update_layout(
+        xaxis_title='Número da Parcela',
+        yaxis_title='Valor da Parcela (R$)',
+        height=400
+    )
+    
+    return fig
+
+def tabela_diferencas(df_original, df_simulado):
+    """Totais do cronograma original e simulado com as diferenças, em valores brutos"""
+    df_diff = pd.DataFrame({
+        'Métrica': ['Valor Total', 'Total Amortização', 'Total Juros', 'Número de Parcelas'],
+        'Original': [
+            df_original['valor_parcela'].sum(),
+            df_original['amortizacao'].sum(),
+            df_original['juros'].sum(),
+            len(df_original[df_original['tipo'] == 'parcela'])
+        ],
+        'Simulado': [
+            df_simulado['valor_parcela'].sum(),
+            df_simulado['amortizacao'].sum(),
+            df_simulado['juros'].sum(),
+            len(df_simulado[df_simulado['tipo'] == 'parcela'])
+        ]
+    })
+    
+    df_diff['Diferença'] = df_diff['Simulado'] - df_diff['Original']
+    df_diff['Diferença %'] = (df_diff['Diferença'] / df_diff['Original'] * 100)
+    return df_diff
+
+# Formatos de exportação: (extensão, variante dos valores)
+FORMATOS_EXPORTACAO = {
+    "CSV": ("csv", "bruto"),
+    "CSV (padrão brasileiro)": ("csv", "br"),
+    "XLSX": ("xlsx", "bruto"),
+    "XLSX (padrão brasileiro)": ("xlsx", "br")
+}
+TIPOS_MIME = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+def ofertas_do_editor(ofertas_editadas):
+    """Ofertas válidas da tabela editável e quantidade de linhas ignoradas (sem taxa, prazo ou sistema)"""
+    completas = ofertas_editadas.dropna(subset=['Taxa Anual (%)', 'Prazo (meses)', 'Sistema'])
+    completas = completas[completas['Sistema'].isin(SISTEMAS)]
+    valor_ou_zero = lambda x: 0.0 if pd.isna(x) else float(x)
+    ofertas = [
+        OfertaPortabilidade(
+            nome=f"Oferta {i + 1}" if pd.isna(linha['Oferta']) else str(linha['Oferta']),
+            taxa_anual=float(linha['Taxa Anual (%)']) / 100,
+            prazo=int(linha['Prazo (meses)']),
+            custo_inicial=valor_ou_zero(linha['Custo Inicial (R$)']),
+            tarifa_mensal=valor_ou_zero(linha['Tarifa Mensal (R$)']),
+            sistema=str(linha['Sistema'])
+        )
+        for i, (_, linha) in enumerate(completas.iterrows())
+    ]
+    return ofertas, len(ofertas_editadas) - len(completas)
+
+def assinatura_exportacao(cenarios, formato_escolhido):
+    """Identificação do arquivo pelo formato e pelo conteúdo das tabelas"""
+    return (formato_escolhido, tuple(cenarios), tuple(hash_contrato(tabela) for tabela in cenarios.values()))
+
+@st.cache_data(max_entries=8)
+def arquivo_exportacao(assinatura, nomes, _tabelas, extensao, formato):
+    """Arquivo exportado em blocos a partir das colunas das tabelas; com mais de uma tabela, cada linha leva o cenário
+    
+    A chave do cache é a assinatura, sem serializar as tabelas a cada chamada.
+    """
+    fontes = [
+        ({'cenario': nome} if len(_tabelas) > 1 else {}, colunas_tabela(tabela))
+        for nome, tabela in zip(nomes, _tabelas)
+    ]
+    if extensao == "xlsx":
+        return exportar_xlsx_bytes(fontes, formato)
+    return exportar_csv_bytes(fontes, formato)
+
+def botao_exportacao(cenarios, nome_arquivo, chave):
+    """Seleção do formato e botão de download das tabelas informadas ({cenário: DataFrame})
+    
+    O arquivo só é montado depois de "Preparar arquivo" e volta a ser pedido se o
+    formato ou as tabelas mudarem; até lá as reexecuções não geram bytes.
+    """
+    formatos = [f for f in FORMATOS_EXPORTACAO if xlsx_disponivel() or not f.startswith("XLSX")]
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        formato_escolhido = st.selectbox(
+            "Formato de exportação",
+            formatos,
+            key=f"formato_{chave}",
+            help=None if xlsx_disponivel() else "Instale o pacote 'xlsxwriter' para exportar em XLSX"
+        )
+    extensao, formato = FORMATOS_EXPORTACAO[formato_escolhido]
+    with col2:
+        preparar = st.button("Preparar arquivo", key=f"preparar_{chave}")
+    preparado = st.session_state.get(f"preparado_{chave}")
+    if not preparar and preparado is None:
+        return
+    assinatura = assinatura_exportacao(cenarios, formato_escolhido)
+    if preparar:
+        st.session_state[f"preparado_{chave}"] = assinatura
+    elif preparado != assinatura:
+        # Formato ou conteúdo mudou: o arquivo anterior não vale mais
+        del st.session_state[f"preparado_{chave}"]
+        return
+    try:
+        dados = arquivo_exportacao(assinatura, tuple(cenarios.keys()), tuple(cenarios.values()), extensao, formato)
+    except Exception as e:
+        st.error(f"Erro ao exportar: {str(e)}")
+        return
+    with col2:
+        st.download_button(
+            "Baixar",
+            data=dados,
+            file_name=f"{nome_arquivo}.{extensao}",
+            mime=TIPOS_MIME[extensao],
+            key=f"baixar_{chave}"
+        )
+
+# Inicialização dos dados: carregados uma vez por processo e compartilhados, somente leitura,
+# entre todas as sessões (as funções de simulação sempre trabalham sobre cópias)
+@st.cache_resource
+def carregar_contrato(caminho_json="financiamento.json"):
+    """Dados do contrato e cronograma consolidado compartilhados entre as sessões"""
+    dados = carregar_dados_json(caminho_json)
+    if dados is None:
+        return None, None
+    return dados, criar_tabela_consolidada(dados)
+
+dados_json, df_original = carregar_contrato()
 if dados_json is None:
+    carregar_contrato.clear()
     st.error("Não foi possível carregar os dados. Verifique o arquivo 'financiamento.json' e tente novamente.")
     st.stop()
 
-df_original = criar_tabela_consolidada(dados_json)
 if df_original is None:
+    carregar_contrato.clear()
     st.error("Erro ao criar tabela consolidada.")
     st.stop()
 
-# Inicializar estados
-if 'df_simulado' not in st.session_state:
-    st.session_state.df_simulado = df_original.copy()
+# Limite de memória do estado próprio de cada sessão (MB)
+LIMITE_MEMORIA_SESSAO_MB = float(os.environ.get("SIMULADOR_LIMITE_SESSAO_MB", "16"))
+
+def memoria_sessao():
+    """Memória (bytes) de todo o estado próprio da sessão
+    
+    Os cronogramas simulados ficam no cache compartilhado; a sessão guarda apenas
+    os eventos do cenário, a chave do resultado e as tabelas editadas.
+    """
+    total = 0
+    for valor in st.session_state.to_dict().values():
+        if isinstance(valor, pd.DataFrame):
+            total += int(valor.memory_usage(deep=True).sum())
+        else:
+            try:
+                total += len(pickle.dumps(valor))
+            except Exception:
+                total += sys.getsizeof(valor)
+    return total
+
+# Cache de resultados compartilhado entre sessões e reinícios
+@st.cache_resource
+def obter_cache_simulacoes():
+    """Instância única por processo do cache de simulações em disco"""
+    return CacheSimulacoes()
+
+@st.cache_data
+def calcular_hash_contrato(df):
+    """Hash do conteúdo do contrato usado nas chaves do cache"""
+    return hash_contrato(df)
+
+# Base local de índices de correção (arquivos mapeados em memória, compartilhados entre sessões)
+@st.cache_resource
+def obter_base_indices():
+    """Instância única por processo da base de índices"""
+    return BaseIndices()
+
+cache_simulacoes = obter_cache_simulacoes()
+base_indices = obter_base_indices()
+hash_base = calcular_hash_contrato(df_original)
+
+def planos_do_cenario(cenario):
+    """Amortizações do cenário como planos (a amortização única é um plano de uma só parcela)"""
+    planos = []
+    for evento in cenario:
+        if evento[0] == 'unica':
+            _, parcela, valor, tipo = evento
+            planos.append(PlanoAmortizacao(valor, parcela, parcela, tipo_reducao='prazo' if tipo == 'prazo' else 'parcela'))
+        elif evento[0] == 'plano':
+            planos.append(PlanoAmortizacao(*evento[1:]))
+    return planos
+
+def base_cenario(cenario):
+    """Cronograma original com as correções monetárias do cenário, base das amortizações"""
+    df_base = df_original
+    for evento in cenario:
+        if evento[0] == 'correcao':
+            _, nome, projecao, _ = evento
+            df_base = aplicar_correcao(df_base, base_indices, nome, None, projecao)
+    return df_base
+
+def reconstruir_cenario(cenario):
+    """Refaz o cenário inteiro a partir do cronograma original, numa única recorrência
+    
+    Aplicar cada evento sobre o resultado do anterior tornaria o resultado dependente
+    da ordem (o prazo de um evento ficaria limitado ao prazo já truncado por outro).
+    As correções vêm primeiro e a recorrência das amortizações segue os fatores delas.
+    """
+    df_base = base_cenario(cenario)
+    planos = planos_do_cenario(cenario)
+    if len(cenario) == 1 and cenario[0][0] == 'unica':
+        # Amortização única: cálculo detalhado, com os logs de depuração
+        _, parcela, valor, tipo = cenario[0]
+        return calcular_nova_tabela(df_original, parcela, valor, tipo)
+    if not planos:
+        return df_base
+    return simular_planos(df_base, planos)
+
+# Análises do simulador em cache, com chave no contrato, nos eventos do cenário e nos controles
+# (o cronograma é refeito dentro da função, sem serializar o DataFrame a cada execução)
+@st.cache_data(max_entries=32)
+def comparacao_cenario(contrato, cenario, rendimentos, parcelas_futuras, valores_grade, tipo):
+    """Comparação entre antecipar e investir sobre a base do cenário, para a grade de rendimentos"""
+    return comparar_antecipacao_investimento(
+        base_cenario(cenario), rendimentos, parcelas_futuras, valores_grade, tipo
+    )
+
+@st.cache_data(max_entries=32)
+def meta_cenario(contrato, cenario, plano, meta, alvo):
+    """Valor de amortização que atinge a meta, com os eventos do cenário na mesma recorrência"""
+    return resolver_meta(base_cenario(cenario), plano, meta, alvo, planos=planos_do_cenario(cenario))
+
+@st.cache_data(max_entries=32)
+def ofertas_cenario(contrato, cenario, ofertas, parcela, valor, tipo, taxa_desconto_anual):
+    """Avaliação das ofertas de portabilidade sobre o saldo do cenário"""
+    return avaliar_ofertas(
+        base_cenario(cenario), ofertas, parcela, valor, tipo, taxa_desconto_anual,
+        planos=planos_do_cenario(cenario)
+    )
+
+def resultado_cenario(cenario, chave, registrar=False):
+    """Cronograma do cenário pelo cache compartilhado, refazendo-o a partir do original se preciso
+    
+    Devolve None se o cálculo falhar ou exceder o limite de memória.
+    """
+    df_resultado = cache_simulacoes.obter(chave)
+    em_cache = df_resultado is not None
+    if em_cache and registrar:
+        st.session_state.debug_logs = [{
+            'titulo': "Resultado do Cache",
+            'dados': {"Cenário": cenario, "Chave": chave}
+        }]
+    if not em_cache:
+        try:
+            df_resultado = reconstruir_cenario(cenario)
+        except Exception as e:
+            st.error(f"Erro ao simular o cenário: {str(e)}")
+            return None
+        # Em caso de erro o cálculo devolve o próprio cronograma original
+        if df_resultado is df_original:
+            return None
+    # O limite vale também para resultados do cache, que podem ter vindo de outra configuração
+    tamanho = int(df_resultado.memory_usage(deep=True).sum())
+    if tamanho > LIMITE_MEMORIA_SESSAO_MB * 1024 * 1024:
+        st.error(f"Simulação excede o limite de memória ({formatar_numero(LIMITE_MEMORIA_SESSAO_MB, 0)} MB).")
+        return None
+    if not em_cache:
+        cache_simulacoes.guardar(chave, df_resultado)
+    return df_resultado
+
+def cenario_simulado():
+    """Cronograma do cenário atual da sessão (o original compartilhado se não houver eventos)"""
+    if not st.session_state.cenario:
+        return df_original
+    df_resultado = resultado_cenario(st.session_state.cenario, st.session_state.chave_cenario)
+    return df_original if df_resultado is None else df_resultado
+
+def aplicar_evento(evento):
+    """Acrescenta um evento ao cenário da sessão, reaproveitando o resultado em cache quando existir
+    
+    A sessão guarda só a lista de eventos e a chave; o cronograma fica no cache compartilhado.
+    """
+    cenario = st.session_state.cenario + [evento]
+    chave = cache_simulacoes.chave(hash_base, cenario)
+    
+    df_base = cenario_simulado()
+    df_resultado = resultado_cenario(cenario, chave, registrar=True)
+    if df_resultado is None:
+        return df_base
+    
+    st.session_state.cenario = cenario
+    st.session_state.chave_cenario = chave
+    # O estado da sessão (eventos, logs, tabelas editadas) também tem limite próprio
+    if memoria_sessao() > LIMITE_MEMORIA_SESSAO_MB * 1024 * 1024:
+        st.session_state.cenario = cenario[:-1]
+        st.session_state.chave_cenario = cache_simulacoes.chave(hash_base, cenario[:-1])
+        st.error(f"Estado da sessão excede o limite de memória ({formatar_numero(LIMITE_MEMORIA_SESSAO_MB, 0)} MB).")
+        return df_base
+    return df_resultado
+
+# Inicializar estados: a sessão guarda só os eventos do cenário e a chave do resultado
+if 'cenario' not in st.session_state:
+    st.session_state.cenario = []
+    st.session_state.chave_cenario = None
 
 if 'amortizacoes' not in st.session_state:
     st.session_state.amortizacoes = pd.DataFrame({
@@ -328,10 +895,11 @@ if 'amortizacoes' not in st.session_state:
 # Interface principal
 st.title("Simulador de Financiamento Imobiliário")
 
-# Criar abas
-tab1, tab2, tab3, tab4 = st.tabs(["Visão Geral", "Cronograma", "Simulador", "Debug"])
+# Partial rerun do painel do Simulador quando a versão do Streamlit oferecer
+fragmento = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda funcao: funcao)
 
-with tab1:
+def renderizar_visao_geral():
+    """Visão Geral: situação do contrato e proporção de pagamento"""
     # Visão Geral
     st.subheader("Situação do contrato")
     
@@ -383,9 +951,9 @@ with tab1:
         if ultima_operacao is not None:
             # Calcular valor total amortizado (soma das operações de amortização)
             amortizacoes_extras = sum(
-                evento.get('valor', 0)
-                for evento in dados_json['eventos']
-                if evento['tipo'] == 'operacao' and 'Amortizacaoreducaodeprazorecursoproprio' in evento.get('descricao', '')
+                operacao.valor or 0
+                for operacao in dados_json['operacoes']
+                if 'Amortizacaoreducaodeprazorecursoproprio' in operacao.descricao
             )
             
             # Valor total de juros original e cálculo de economia
@@ -438,71 +1006,8 @@ with tab1:
         # Criar título personalizado
         st.markdown("### Proporção de Pagamento")
         
-        # Criar o gráfico com plotly
-        fig = go.Figure()
-        
-        # Adicionar as barras em sequência
-        fig.add_trace(go.Bar(
-            name='Principal Pago',
-            x=[principal_pago],
-            y=[''],
-            orientation='h',
-            marker=dict(color='#2ecc71'),
-            text=formatar_valor_contabil(principal_pago),
-            textposition='auto',
-            hovertemplate=f'Principal Pago: {formatar_valor_contabil(principal_pago)}<extra></extra>'
-        ))
-        
-        fig.add_trace(go.Bar(
-            name='Juros Pagos',
-            x=[juros_pagos],
-            y=[''],
-            orientation='h',
-            marker=dict(color='#e74c3c'),
-            text=formatar_valor_contabil(juros_pagos),
-            textposition='auto',
-            hovertemplate=f'Juros Pagos: {formatar_valor_contabil(juros_pagos)}<extra></extra>'
-        ))
-        
-        fig.add_trace(go.Bar(
-            name='Saldo Devedor',
-            x=[valor_restante],
-            y=[''],
-            orientation='h',
-            marker=dict(color='#ecf0f1'),
-            text=formatar_valor_contabil(valor_restante),
-            textposition='auto',
-            hovertemplate=f'Saldo Devedor: {formatar_valor_contabil(valor_restante)}<extra></extra>'
-        ))
-        
-        # Atualizar o layout
-        fig.update_layout(
-            barmode='stack',
-            height=100,
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-            margin=dict(l=0, r=0, t=30, b=0),
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            xaxis=dict(
-                showgrid=False,
-                zeroline=False,
-                showline=False,
-                showticklabels=False
-            ),
-            yaxis=dict(
-                showgrid=False,
-                zeroline=False,
-                showline=False,
-                showticklabels=False
-            )
-        )
+        # Criar o gráfico com plotly (em cache pelos valores)
+        fig = figura_proporcao_pagamento(principal_pago, juros_pagos, valor_restante)
         
         # Mostrar o gráfico
         st.plotly_chart(fig, use_container_width=True)
@@ -518,23 +1023,27 @@ with tab1:
     else:
         st.info("Nenhuma parcela paga até o momento.")
 
-with tab2:
+def renderizar_cronograma():
+    """Cronograma de pagamentos formatado"""
     # Cronograma
     st.subheader("Cronograma de Pagamentos")
     
     # Formatar valores monetários
-    df_display = df_original.copy()
-    colunas_monetarias = ['valor_parcela', 'amortizacao', 'juros', 'saldo_devedor', 'seguro_mip', 'seguro_df', 'taxa_adm']
-    for col in colunas_monetarias:
-        df_display[col] = df_display[col].apply(lambda x: formatar_valor_contabil(x) if pd.notnull(x) else "-")
+    colunas_monetarias = ['valor_parcela', 'amortizacao', 'juros', 'saldo_devedor', 'seguro_mip', 'seguro_dfi', 'seguro_res', 'tca']
+    df_display = formatar_tabela(df_original, colunas_monetarias)
     
     # Mostrar DataFrame com todas as colunas
     st.dataframe(
         df_display,
         use_container_width=True
     )
+    
+    # Exportação do cronograma com os valores originais (não formatados)
+    botao_exportacao({"Original": df_original}, "cronograma_original", "cronograma")
 
-with tab3:
+@fragmento
+def renderizar_simulador():
+    """Simulador: controles, comparação dos cenários e gráficos; reexecutado isoladamente a cada interação"""
     # Simulador
     st.markdown("### Simulador de Amortizações", help="Simule diferentes cenários de amortização")
     
@@ -551,7 +1060,10 @@ with tab3:
             )
         
         with col2:
-            saldo_atual = float(df_original[df_original["tipo"] == "parcela"].loc[parcela_alvo-1, "saldo_devedor"])
+            # Seleção pelo número: as amortizações do extrato ficam entre as parcelas no índice
+            saldo_atual = float(df_original.loc[
+                (df_original["tipo"] == "parcela") & (df_original["numero"] == parcela_alvo), "saldo_devedor"
+            ].iloc[0])
             valor_amortizacao = st.number_input(
                 "Valor da Amortização (R$)",
                 min_value=0.0,
@@ -583,20 +1095,383 @@ with tab3:
                 
                 st.session_state.amortizacoes_simuladas.append(nova_amortizacao)
                 
-                st.session_state.df_simulado = calcular_nova_tabela(
-                    df_original if 'df_simulado' not in st.session_state else st.session_state.df_simulado,
-                    parcela_alvo,
-                    valor_amortizacao,
-                    'prazo' if tipo_reducao == "Redução de Prazo" else 'valor'
-                )
+                tipo = 'prazo' if tipo_reducao == "Redução de Prazo" else 'valor'
+                aplicar_evento(('unica', int(parcela_alvo), float(valor_amortizacao), tipo))
                 st.success("Amortização aplicada com sucesso!")
         
         with col_btn2:
             if st.button("Resetar Simulação"):
-                st.session_state.df_simulado = df_original.copy()
                 st.session_state.amortizacoes_simuladas = []
+                st.session_state.cenario = []
+                st.session_state.chave_cenario = None
                 st.rerun()
     
+    # Comparação entre antecipar e investir o mesmo valor
+    with st.expander("Antecipar ou Investir?", expanded=False):
+        col1, col2 = st.columns([1, 3])
+        
+        with col1:
+            rendimento_anual = st.number_input(
+                "Rendimento Bruto Anual (%)",
+                min_value=0.0,
+                value=10.0,
+                format="%.2f",
+                help="Rentabilidade de uma aplicação tipo CDI; o IR regressivo é descontado pelo prazo restante"
+            )
+            # Nada é calculado enquanto o cálculo não for ativado
+            calcular_comparacao = st.toggle("Calcular comparação", key="calcular_comparacao")
+        
+        if not calcular_comparacao:
+            with col2:
+                st.info("Ative o cálculo para comparar antecipar e investir.")
+        else:
+            parcelas_futuras = df_original.loc[
+                (df_original['tipo'] == 'parcela') & (df_original['situacao_parcela'] != 'Paga'), 'numero'
+            ].astype(int).to_numpy()
+            valores_grade = np.linspace(5000.0, 100000.0, 20)
+            if valor_amortizacao > 0:
+                valores_grade = np.union1d(valores_grade, [valor_amortizacao])
+            # Grade de rendimentos de 4% a 16% a.a., com o rendimento informado
+            rendimentos_grade = np.union1d(np.arange(4, 17) / 100, [round(rendimento_anual / 100, 6)])
+            
+            comparacao = comparacao_cenario(
+                hash_base,
+                st.session_state.cenario,
+                rendimentos_grade,
+                parcelas_futuras,
+                valores_grade,
+                'prazo' if tipo_reducao == "Redução de Prazo" else 'valor'
+            )
+            
+            with col2:
+                if valor_amortizacao > 0 and parcela_alvo in parcelas_futuras:
+                    i_parcela = int(np.searchsorted(parcelas_futuras, parcela_alvo))
+                    i_valor = int(np.searchsorted(valores_grade, valor_amortizacao))
+                    i_rendimento = int(np.searchsorted(rendimentos_grade, round(rendimento_anual / 100, 6)))
+                    economia = comparacao['economia_juros'][i_parcela, i_valor]
+                    rendimento = comparacao['rendimento_liquido'][i_rendimento, i_parcela, i_valor]
+                    equilibrio = comparacao['taxa_equilibrio'][i_parcela, i_valor]
+                
+                    col_a, col_b, col_c = st.columns(3)
+                    col_a.metric("Juros economizados", formatar_valor_contabil(economia))
+                    col_b.metric("Rendimento líquido", formatar_valor_contabil(rendimento))
+                    col_c.metric("Taxa de equilíbrio (a.a.)", formatar_percentual(equilibrio))
+                
+                    if rendimento > economia:
+                        st.info("Investir o valor rende mais do que os juros economizados com a antecipação.")
+                    else:
+                        st.info("Antecipar economiza mais juros do que o rendimento líquido do investimento.")
+                    
+                    # Vantagem de investir em toda a grade de rendimentos para a parcela e o valor escolhidos
+                    fig = figura_vantagem_rendimento(
+                        rendimentos_grade, comparacao['vantagem_investir'][:, i_parcela, i_valor], equilibrio
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                else:
+                    st.info("Informe uma parcela futura e um valor de amortização para comparar.")
+            
+            # Superfície da taxa de equilíbrio: acima dela, investir compensa
+            fig = figura_taxa_equilibrio(valores_grade, parcelas_futuras, comparacao['taxa_equilibrio'])
+            
+            st.plotly_chart(fig, use_container_width=True)
+    
+    # Plano de amortizações recorrentes, calculado numa única passada
+    with st.expander("Plano de Amortização Recorrente", expanded=False):
+        total_parcelas_contrato = len(df_original[df_original["tipo"] == "parcela"])
+        frequencias = {"Mensal": 1, "Trimestral": 3, "Semestral": 6, "Anual": 12}
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            valor_plano = st.number_input(
+                "Valor por Amortização (R$)",
+                min_value=0.0,
+                value=0.0,
+                format="%.2f",
+                key="valor_plano"
+            )
+            crescimento_plano = st.number_input(
+                "Reajuste Anual do Valor (%)",
+                min_value=0.0,
+                value=0.0,
+                format="%.2f",
+                key="crescimento_plano"
+            )
+            saldo_minimo_plano = st.number_input(
+                "Amortizar Somente com Saldo Acima de (R$)",
+                min_value=0.0,
+                value=0.0,
+                format="%.2f",
+                key="saldo_minimo_plano"
+            )
+        
+        with col2:
+            parcela_inicial_plano = st.number_input(
+                "Parcela Inicial",
+                min_value=1,
+                max_value=total_parcelas_contrato,
+                value=1,
+                key="parcela_inicial_plano"
+            )
+            parcela_final_plano = st.number_input(
+                "Parcela Final",
+                min_value=1,
+                max_value=total_parcelas_contrato,
+                value=total_parcelas_contrato,
+                key="parcela_final_plano"
+            )
+        
+        with col3:
+            frequencia_plano = st.selectbox("Frequência", list(frequencias.keys()), key="frequencia_plano")
+            tipo_reducao_plano = st.radio(
+                "Tipo de Redução",
+                ["Redução de Prazo", "Redução de Valor"],
+                index=0,
+                key="tipo_reducao_plano"
+            )
+            parcela_minima_plano = st.number_input(
+                "Parcela Mínima (R$)",
+                min_value=0.0,
+                value=0.0,
+                format="%.2f",
+                help="Na redução de valor, o prazo é encurtado para a parcela (amortização + juros) não ficar abaixo deste valor",
+                key="parcela_minima_plano"
+            )
+        
+        if st.button("Aplicar Plano"):
+            plano = PlanoAmortizacao(
+                valor=valor_plano,
+                parcela_inicial=int(parcela_inicial_plano),
+                parcela_final=int(parcela_final_plano),
+                frequencia=frequencias[frequencia_plano],
+                crescimento_anual=crescimento_plano / 100,
+                tipo_reducao='prazo' if tipo_reducao_plano == "Redução de Prazo" else 'parcela',
+                parcela_minima=parcela_minima_plano,
+                saldo_minimo=saldo_minimo_plano
+            )
+            df_base = cenario_simulado()
+            df_plano = aplicar_evento(('plano',) + tuple(plano))
+            
+            # Total efetivamente amortizado pelo plano (limitado ao saldo devedor)
+            total_plano = (
+                df_plano.loc[df_plano['tipo'] == 'amortizacao', 'valor_parcela'].sum()
+                - df_base.loc[df_base['tipo'] == 'amortizacao', 'valor_parcela'].sum()
+            )
+            
+            if 'amortizacoes_simuladas' not in st.session_state:
+                st.session_state.amortizacoes_simuladas = []
+            
+            st.session_state.amortizacoes_simuladas.append({
+                'data': datetime.now().strftime("%d/%m/%Y"),
+                'parcela': plano.parcela_inicial,
+                'valor': total_plano,
+                'tipo': f"{tipo_reducao_plano} (plano {frequencia_plano.lower()} até a parcela {plano.parcela_final})"
+            })
+            st.success("Plano de amortização aplicado com sucesso!")
+    
+    # Busca do valor de amortização que atinge uma meta de quitação ou de parcela
+    with st.expander("Meta de Quitação ou Parcela", expanded=False):
+        df_base = cenario_simulado()
+        parcelas_base = df_base[df_base['tipo'] == 'parcela']
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            meta = st.radio(
+                "Meta",
+                ["Quitar até a data", "Parcela de até"],
+                key="meta",
+                help="Na meta de parcela vale a maior parcela após a amortização única ou após a parcela final do plano"
+            )
+        
+        with col2:
+            if meta == "Quitar até a data":
+                data_meta = st.date_input(
+                    "Data de Quitação",
+                    value=parcelas_base['data'].iloc[-1].date(),
+                    min_value=parcelas_base['data'].iloc[0].date(),
+                    max_value=parcelas_base['data'].iloc[-1].date(),
+                    format="DD/MM/YYYY",
+                    key="data_meta"
+                )
+                alvo = parcela_limite(df_base, data_meta)
+            else:
+                alvo = st.number_input(
+                    "Valor Máximo da Parcela (R$)",
+                    min_value=0.0,
+                    value=float(round(parcelas_base['valor_parcela'].max() * 0.8, 2)),
+                    format="%.2f",
+                    key="parcela_meta"
+                )
+        
+        with col3:
+            modo_meta = st.radio(
+                "Amortização",
+                ["Única (controles da simulação)", "Recorrente (plano acima)"],
+                key="modo_meta"
+            )
+        
+        if modo_meta.startswith("Única"):
+            plano_meta = PlanoAmortizacao(
+                valor=0.0,
+                parcela_inicial=int(parcela_alvo),
+                parcela_final=int(parcela_alvo),
+                tipo_reducao='prazo' if tipo_reducao == "Redução de Prazo" else 'parcela'
+            )
+        else:
+            plano_meta = PlanoAmortizacao(
+                valor=0.0,
+                parcela_inicial=int(parcela_inicial_plano),
+                parcela_final=int(parcela_final_plano),
+                frequencia=frequencias[frequencia_plano],
+                crescimento_anual=crescimento_plano / 100,
+                tipo_reducao='prazo' if tipo_reducao_plano == "Redução de Prazo" else 'parcela',
+                parcela_minima=parcela_minima_plano,
+                saldo_minimo=saldo_minimo_plano
+            )
+        
+        # A busca (centenas de recorrências) só roda com o cálculo ativado
+        resultado_meta = None
+        if not st.toggle("Buscar valor da meta", key="buscar_meta"):
+            st.info("Ative a busca para calcular o valor que atinge a meta.")
+        else:
+            try:
+                # Busca sobre o cronograma original, com os eventos do cenário na mesma recorrência
+                resultado_meta = meta_cenario(
+                    hash_base, st.session_state.cenario, plano_meta,
+                    'quitacao' if meta == "Quitar até a data" else 'parcela', alvo
+                )
+            except Exception as e:
+                st.error(f"Erro ao buscar o valor da meta: {str(e)}")
+        
+        if resultado_meta is not None and np.isnan(resultado_meta.valor):
+            st.warning("Meta inatingível: nem quitando o saldo devedor na parcela inicial ela é alcançada.")
+        elif resultado_meta is not None:
+            col_a, col_b, col_c = st.columns(3)
+            col_a.metric(
+                "Valor necessário" if modo_meta.startswith("Única") else "Valor por amortização",
+                formatar_valor_contabil(resultado_meta.valor)
+            )
+            col_b.metric("Última parcela", formatar_numero(resultado_meta.ultima_parcela, 0))
+            col_c.metric("Maior parcela seguinte", formatar_valor_contabil(resultado_meta.maior_parcela))
+            
+            if st.button("Aplicar Valor Encontrado") and resultado_meta.valor > 0:
+                plano = plano_meta._replace(valor=resultado_meta.valor)
+                df_meta = aplicar_evento(('plano',) + tuple(plano))
+                
+                if 'amortizacoes_simuladas' not in st.session_state:
+                    st.session_state.amortizacoes_simuladas = []
+                
+                st.session_state.amortizacoes_simuladas.append({
+                    'data': datetime.now().strftime("%d/%m/%Y"),
+                    'parcela': plano.parcela_inicial,
+                    'valor': (
+                        df_meta.loc[df_meta['tipo'] == 'amortizacao', 'valor_parcela'].sum()
+                        - df_base.loc[df_base['tipo'] == 'amortizacao', 'valor_parcela'].sum()
+                    ),
+                    'tipo': f"Meta: {meta.lower()} ({modo_meta.split(' ')[0].lower()})"
+                })
+                st.success("Valor da meta aplicado com sucesso!")
+    
+    # Portabilidade: o saldo após a parcela (e a amortização) dos controles é levado a cada oferta
+    with st.expander("Portabilidade e Refinanciamento", expanded=False):
+        if 'ofertas_portabilidade' not in st.session_state:
+            st.session_state.ofertas_portabilidade = pd.DataFrame({
+                'Oferta': ["Banco A", "Banco B"],
+                'Taxa Anual (%)': [9.49, 8.99],
+                'Prazo (meses)': [300, 360],
+                'Custo Inicial (R$)': [4000.0, 6000.0],
+                'Tarifa Mensal (R$)': [150.0, 150.0],
+                'Sistema': ["SAC", "PRICE"]
+            })
+        
+        ofertas_editadas = st.data_editor(
+            st.session_state.ofertas_portabilidade,
+            num_rows="dynamic",
+            use_container_width=True,
+            column_config={
+                'Sistema': st.column_config.SelectboxColumn(options=list(SISTEMAS), required=True),
+                'Prazo (meses)': st.column_config.NumberColumn(min_value=1, step=1, required=True),
+                'Taxa Anual (%)': st.column_config.NumberColumn(min_value=0.0, format="%.2f", required=True)
+            },
+            key="editor_ofertas"
+        )
+        
+        taxa_desconto = st.number_input(
+            "Taxa de Desconto Anual (%)",
+            min_value=0.0,
+            value=10.0,
+            format="%.2f",
+            help="Custo de oportunidade usado no valor presente dos pagamentos; a amortização dos controles entra igualmente em todos os cenários",
+            key="taxa_desconto"
+        )
+        
+        df_portabilidade = None
+        if not st.toggle("Avaliar ofertas", key="avaliar_ofertas"):
+            st.info("Ative a avaliação para comparar as ofertas com o contrato atual.")
+        else:
+            try:
+                ofertas, ignoradas = ofertas_do_editor(ofertas_editadas)
+                if ignoradas > 0:
+                    st.warning(f"{ignoradas} oferta(s) sem taxa, prazo ou sistema ignorada(s).")
+                df_portabilidade = ofertas_cenario(
+                    hash_base,
+                    st.session_state.cenario,
+                    ofertas,
+                    int(parcela_alvo),
+                    float(valor_amortizacao),
+                    'prazo' if tipo_reducao == "Redução de Prazo" else 'valor',
+                    taxa_desconto / 100
+                )
+            except Exception as e:
+                st.error(f"Erro ao avaliar as ofertas: {str(e)}")
+        
+        if df_portabilidade is not None:
+            df_display = formatar_tabela(
+                df_portabilidade,
+                ['primeira_parcela', 'total_pago', 'valor_presente', 'economia_total', 'economia_valor_presente']
+            )
+            df_display['taxa_anual'] = df_portabilidade['taxa_anual'].apply(lambda x: formatar_percentual(x))
+            st.dataframe(df_display, use_container_width=True, hide_index=True)
+            botao_exportacao({"Portabilidade": df_portabilidade}, "ofertas_portabilidade", "portabilidade")
+    
+    # Correção monetária do saldo e das parcelas projetadas por um índice da base local
+    with st.expander("Correção Monetária", expanded=False):
+        series = base_indices.nomes()
+        if st.button("Importar fatores do extrato como TR", help="Grava na base os fatores das parcelas pagas e emitidas do extrato"):
+            try:
+                inicio, fatores = fatores_do_extrato(parcelas_para_colunas(dados_json["parcelas"]))
+                base_indices.acrescentar("TR", inicio, fatores)
+                series = base_indices.nomes()
+                st.success(f"{len(fatores)} meses gravados na série TR.")
+            except Exception as e:
+                st.error(f"Erro ao importar os fatores do extrato: {str(e)}")
+        
+        if len(series) == 0:
+            st.info("Nenhuma série na base de índices. Importe os fatores do extrato ou um CSV com `python indices.py importar`.")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                nome_indice = st.selectbox("Índice", series, key="indice_correcao")
+                inicio, fim = base_indices.periodo(nome_indice)
+                st.caption(f"Série gravada de {pd.Timestamp(inicio).strftime('%m/%Y')} a {pd.Timestamp(fim).strftime('%m/%Y')}")
+            with col2:
+                projecao_indice = st.number_input(
+                    "Projeção Mensal (%)",
+                    value=0.0,
+                    format="%.4f",
+                    help="Variação mensal usada nos meses posteriores ao fim da série",
+                    key="projecao_indice"
+                )
+            
+            if any(evento[0] == 'correcao' for evento in st.session_state.cenario):
+                st.warning("O cenário já tem correção monetária; aplicar de novo acumula as correções.")
+            
+            if st.button("Aplicar Correção"):
+                projecao = projecao_indice / 100
+                aplicar_evento(('correcao', nome_indice, projecao, base_indices.versao(nome_indice)))
+                st.success("Correção monetária aplicada com sucesso!")
+    
     # Tabela de amortizações simuladas
     st.markdown("#### Amortizações Aplicadas na Simulação")
     
@@ -637,7 +1512,7 @@ with tab3:
 
     with col2:
         st.markdown("**Com antecipação de pagamento**")
-        df_simulado = st.session_state.get('df_simulado', df_original.copy())
+        df_simulado = cenario_simulado()
         
         # Calcular valores simulados
         total_parcelas_simulado = df_simulado['valor_parcela'].sum()
@@ -672,43 +1547,54 @@ with tab3:
     # Gráfico de evolução do saldo devedor
     st.markdown("#### Evolução do Saldo Devedor")
     
-    # Filtrar apenas valores positivos do saldo devedor
-    df_plot_original = df_original[df_original['saldo_devedor'] > 0]
-    df_plot_simulado = df_simulado[df_simulado['saldo_devedor'] > 0]
-    
-    fig = go.Figure()
+    fig = figura_evolucao_saldo(df_original, df_simulado)
     
-    # Adicionar linha do cenário original
-    fig.add_trace(go.Scatter(
-        x=df_plot_original['data'],
-        y=df_plot_original['saldo_devedor'],
-        name='Sem Antecipação',
-        line=dict(color='#3498db')
-    ))
+    st.plotly_chart(fig, use_container_width=True)
     
-    # Adicionar linha do cenário simulado
-    fig.add_trace(go.Scatter(
-        x=df_plot_simulado['data'],
-        y=df_plot_simulado['saldo_devedor'],
-        name='Com Antecipação',
-        line=dict(color='#2ecc71')
-    ))
+    # Sensibilidade dos juros ao momento da antecipação
+    st.markdown(
+        "#### Valor de R$ 1 antecipado por parcela",
+        help="Juros economizados por real antecipado em cada parcela futura, calculados numa única passada sobre o cronograma"
+    )
     
-    fig.update_layout(
-        xaxis_title='Data',
-        yaxis_title='Saldo Devedor (R$)',
-        height=400,
-        yaxis=dict(
-            rangemode='nonnegative'  # Força o eixo Y a começar do zero
-        ),
-        margin=dict(t=0, b=0)  # Remove margens superior e inferior
+    fig = figura_sensibilidade(
+        df_simulado,
+        'prazo' if tipo_reducao == "Redução de Prazo" else 'valor',
+        valor_amortizacao
     )
     
     st.plotly_chart(fig, use_container_width=True)
+    
+    # Exportação dos dois cenários num único arquivo
+    st.markdown("#### Exportar Cenários")
+    botao_exportacao({"Original": df_original, "Simulado": df_simulado}, "cenarios_simulacao", "simulador")
 
-with tab4:
+def renderizar_debug():
+    """Debug: logs de cálculo, cronogramas detalhados e análise de diferenças"""
     st.markdown("### Debug da Simulação")
     
+    # Estatísticas do cache compartilhado de simulações
+    with st.expander("Cache de Simulações", expanded=False):
+        st.write(cache_simulacoes.estatisticas())
+        st.write({
+            "Memória própria da sessão (bytes)": memoria_sessao(),
+            "Limite por sessão (MB)": LIMITE_MEMORIA_SESSAO_MB
+        })
+    
+    # Conferência dos saldos do extrato com a série de índices
+    with st.expander("Conferência da Correção Monetária", expanded=False):
+        series = base_indices.nomes()
+        if len(series) == 0:
+            st.info("Nenhuma série na base de índices.")
+        else:
+            nome_indice = st.selectbox("Índice", series, key="indice_conferencia")
+            df_conferencia = conferir_extrato(df_original, base_indices, nome_indice)
+            st.dataframe(
+                formatar_tabela(df_conferencia, ['saldo_extrato', 'saldo_reconstituido', 'diferenca'], contabil=False),
+                use_container_width=True,
+                hide_index=True
+            )
+    
     # Seção de Logs
     with st.expander("Logs de Cálculo", expanded=True):
         if 'debug_logs' in st.session_state:
@@ -718,16 +1604,15 @@ with tab4:
     
     # Tabelas Comparativas
     st.markdown("### Cronogramas Detalhados")
+    df_simulado = cenario_simulado()
     
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("#### Cronograma Original")
         # Formatar valores monetários
-        df_display = df_original.copy()
         colunas_monetarias = ['valor_parcela', 'amortizacao', 'juros', 'saldo_devedor']
-        for col in colunas_monetarias:
-            df_display[col] = df_display[col].apply(lambda x: f"R$ {x:,.2f}" if pd.notnull(x) else "-")
+        df_display = formatar_tabela(df_original, colunas_monetarias, contabil=False)
         
         st.dataframe(
             df_display,
@@ -736,11 +1621,9 @@ with tab4:
 
     with col2:
         st.markdown("#### Cronograma Simulado")
-        if 'df_simulado' in st.session_state:
+        if st.session_state.cenario:
             # Formatar valores monetários
-            df_display = st.session_state.df_simulado.copy()
-            for col in colunas_monetarias:
-                df_display[col] = df_display[col].apply(lambda x: f"R$ {x:,.2f}" if pd.notnull(x) else "-")
+            df_display = formatar_tabela(df_simulado, colunas_monetarias, contabil=False)
             
             st.dataframe(
                 df_display,
@@ -750,29 +1633,13 @@ with tab4:
             st.info("Nenhuma simulação realizada ainda.")
     
     # Análise de Diferenças
-    if 'df_simulado' in st.session_state:
+    if st.session_state.cenario:
         st.markdown("### Análise de Diferenças")
         
         # Diferenças nos totais
         st.markdown("#### Totais")
-        df_diff = pd.DataFrame({
-            'Métrica': ['Valor Total', 'Total Amortização', 'Total Juros', 'Número de Parcelas'],
-            'Original': [
-                df_original['valor_parcela'].sum(),
-                df_original['amortizacao'].sum(),
-                df_original['juros'].sum(),
-                len(df_original[df_original['tipo'] == 'parcela'])
-            ],
-            'Simulado': [
-                st.session_state.df_simulado['valor_parcela'].sum(),
-                st.session_state.df_simulado['amortizacao'].sum(),
-                st.session_state.df_simulado['juros'].sum(),
-                len(st.session_state.df_simulado[st.session_state.df_simulado['tipo'] == 'parcela'])
-            ]
-        })
-        
-        df_diff['Diferença'] = df_diff['Simulado'] - df_diff['Original']
-        df_diff['Diferença %'] = (df_diff['Diferença'] / df_diff['Original'] * 100)
+        df_diff_bruto = tabela_diferencas(df_original, df_simulado)
+        df_diff = df_diff_bruto.astype({'Original': object, 'Simulado': object, 'Diferença': object, 'Diferença %': object})
         
         # Formatar valores monetários
         for idx, row in df_diff.iterrows():
@@ -788,30 +1655,21 @@ with tab4:
                 df_diff.at[idx, 'Diferença %'] = formatar_percentual(row['Diferença %'] / 100)
         
         st.dataframe(df_diff, use_container_width=True)
+        botao_exportacao({"Diferenças": df_diff_bruto}, "analise_diferencas", "debug")
         
         # Gráfico de evolução das parcelas
         st.markdown("#### Evolução do Valor das Parcelas")
         
-        fig = go.Figure()
+        fig = figura_evolucao_parcelas(df_original, df_simulado)
         
-        fig.add_trace(go.Scatter(
-            x=df_original['numero'],
-            y=df_original['valor_parcela'],
-            name='Original',
-            line=dict(color='#3498db')
-        ))
-        
-        fig.add_trace(go.Scatter(
-            x=st.session_state.df_simulado['numero'],
-            y=st.session_state.df_simulado['valor_parcela'],
-            name='Simulado',
-            line=dict(color='#2ecc71')
-        ))
-        
-        fig.update_layout(
-            xaxis_title='Número da Parcela',
-            yaxis_title='Valor da Parcela (R$)',
-            height=400
-        )
-        
-        st.plotly_chart(fig, use_container_width=True) 
\ No newline at end of file
+        st.plotly_chart(fig, use_container_width=True)
+
+# Renderizar apenas a visão selecionada
+visoes = {
+    "Visão Geral": renderizar_visao_geral,
+    "Cronograma": renderizar_cronograma,
+    "Simulador": renderizar_simulador,
+    "Debug": renderizar_debug
+}
+visao = st.radio("Visão", list(visoes.keys()), horizontal=True, label_visibility="collapsed", key="visao")
+visoes[visao]()
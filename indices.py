@@ -0,0 +1,256 @@
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DIRETORIO_PADRAO = os.environ.get(
+    "SIMULADOR_INDICES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "indices")
+)
+INDICES_CONHECIDOS = ('TR', 'IPCA', 'INPC')
+
+
+def meses(datas) -> np.ndarray:
+    """Converte datas (dd/mm/aaaa, datetime64 ou Timestamp) para meses datetime64[M]."""
+    datas = pd.Series(datas)
+    if datas.dtype == object:
+        datas = pd.to_datetime(datas, format='%d/%m/%Y')
+    return datas.to_numpy(dtype='datetime64[M]')
+
+
+class BaseIndices:
+    """Séries mensais de fatores de correção (TR, IPCA, INPC...) em arquivos mapeados em memória.
+
+    Cada série ocupa meses consecutivos a partir do mês inicial, então a posição de
+    uma data é só a diferença em meses. Além dos fatores é gravado o produto
+    acumulado (com 1 à frente), e o fator entre dois meses quaisquer sai de uma
+    divisão, para qualquer quantidade de datas de uma vez.
+    """
+
+    def __init__(self, diretorio: str = DIRETORIO_PADRAO):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+        self._abertas: Dict[str, Tuple[float, np.datetime64, np.ndarray, np.ndarray]] = {}
+
+    def _caminho(self, nome: str, extensao: str) -> str:
+        return os.path.join(self.diretorio, f"{nome}.{extensao}")
+
+    def nomes(self) -> List[str]:
+        """Séries disponíveis."""
+        return sorted(arquivo[:-5] for arquivo in os.listdir(self.diretorio) if arquivo.endswith(".json"))
+
+    def gravar(self, nome: str, inicio, fatores: np.ndarray) -> None:
+        """Grava (substituindo) a série de fatores mensais a partir do mês inicial."""
+        fatores = np.asarray(fatores, dtype=np.float64)
+        if np.any(~np.isfinite(fatores)) or np.any(fatores <= 0):
+            raise ValueError(f"Série {nome}: fatores devem ser números positivos")
+        acumulado = np.concatenate([[1.0], np.cumprod(fatores)])
+
+        # Grava em arquivos temporários e troca de uma vez, para leitores concorrentes
+        for sufixo, valores in (("fatores", fatores), ("acumulado", acumulado)):
+            temporario = self._caminho(f"{nome}.{sufixo}.tmp", "npy")
+            np.save(temporario, valores)
+            os.replace(temporario, self._caminho(f"{nome}.{sufixo}", "npy"))
+        metadados = {"inicio": str(meses([inicio])[0]), "meses": len(fatores), "atualizado_em": time.time()}
+        temporario = self._caminho(nome, "json.tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(metadados, f)
+        os.replace(temporario, self._caminho(nome, "json"))
+        self._abertas.pop(nome, None)
+
+    def acrescentar(self, nome: str, inicio, fatores: np.ndarray) -> None:
+        """Inclui ou atualiza meses na série, mantendo os demais."""
+        novo_inicio = meses([inicio])[0]
+        fatores = np.asarray(fatores, dtype=np.float64)
+        if nome not in self.nomes():
+            self.gravar(nome, novo_inicio, fatores)
+            return
+        _, inicio_atual, atuais, _ = self._abrir(nome)
+        primeiro = min(inicio_atual, novo_inicio)
+        ultimo = max(inicio_atual + len(atuais), novo_inicio + len(fatores))
+        combinados = np.full(int((ultimo - primeiro).astype(int)), np.nan)
+        deslocamento = int((inicio_atual - primeiro).astype(int))
+        combinados[deslocamento:deslocamento + len(atuais)] = atuais
+        deslocamento = int((novo_inicio - primeiro).astype(int))
+        combinados[deslocamento:deslocamento + len(fatores)] = fatores
+        if np.isnan(combinados).any():
+            raise ValueError(f"Série {nome}: os novos meses deixariam lacunas na série")
+        self.gravar(nome, primeiro, combinados)
+
+    def _abrir(self, nome: str) -> Tuple[float, np.datetime64, np.ndarray, np.ndarray]:
+        """Metadados e arrays mapeados da série (reabertos se o arquivo foi regravado)."""
+        with open(self._caminho(nome, "json"), encoding="utf-8") as f:
+            metadados = json.load(f)
+        aberta = self._abertas.get(nome)
+        if aberta is None or aberta[0] != metadados["atualizado_em"]:
+            aberta = (
+                metadados["atualizado_em"],
+                np.datetime64(metadados["inicio"], 'M'),
+                np.load(self._caminho(f"{nome}.fatores", "npy"), mmap_mode='r'),
+                np.load(self._caminho(f"{nome}.acumulado", "npy"), mmap_mode='r'),
+            )
+            self._abertas[nome] = aberta
+        return aberta
+
+    def versao(self, nome: str) -> float:
+        """Marca da última gravação da série (para chaves de cache)."""
+        return self._abrir(nome)[0]
+
+    def periodo(self, nome: str) -> Tuple[np.datetime64, np.datetime64]:
+        """Primeiro e último mês com fator gravado."""
+        _, inicio, fatores, _ = self._abrir(nome)
+        return inicio, inicio + len(fatores) - 1
+
+    def _acumulado_ate(self, nome: str, posicoes: np.ndarray, projecao_mensal: float) -> np.ndarray:
+        """Produto dos fatores dos meses anteriores a cada posição, projetando além do fim da série."""
+        _, _, fatores, acumulado = self._abrir(nome)
+        n = len(fatores)
+        dentro = np.clip(posicoes, 0, n)
+        alem = np.maximum(posicoes - n, 0)
+        return acumulado[dentro] * (1 + projecao_mensal) ** alem
+
+    def fatores(self, nome: str, datas, projecao_mensal: float = 0.0) -> np.ndarray:
+        """Fator do mês de cada data; meses após a série usam 1 + projeção, meses anteriores valem 1."""
+        _, inicio, fatores, _ = self._abrir(nome)
+        posicoes = (meses(datas) - inicio).astype(np.int64)
+        resultado = np.ones(len(posicoes))
+        dentro = (posicoes >= 0) & (posicoes < len(fatores))
+        resultado[dentro] = fatores[posicoes[dentro]]
+        resultado[posicoes >= len(fatores)] = 1 + projecao_mensal
+        return resultado
+
+    def fator_acumulado(self, nome: str, de, ate, projecao_mensal: float = 0.0) -> np.ndarray:
+        """Produto dos fatores dos meses de 'de' a 'ate' (inclusive), vetorizado e com broadcasting.
+
+        de e ate são arrays de datetime64 (convertidos para meses); fora do
+        período gravado vale a projeção (depois) ou 1 (antes).
+        """
+        _, inicio, _, _ = self._abrir(nome)
+        de = np.asarray(de).astype('datetime64[M]')
+        ate = np.asarray(ate).astype('datetime64[M]')
+        posicao_de = np.maximum((de - inicio).astype(np.int64), 0)
+        posicao_ate = np.maximum((ate - inicio).astype(np.int64) + 1, posicao_de)
+        return (
+            self._acumulado_ate(nome, posicao_ate, projecao_mensal)
+            / self._acumulado_ate(nome, posicao_de, projecao_mensal)
+        )
+
+    def importar_csv(self, nome: str, caminho: str) -> int:
+        """Importa uma série de um CSV com colunas data;valor (fator ou variação % ao mês)."""
+        dados = pd.read_csv(caminho, sep=None, engine='python', decimal=',', dtype={0: str})
+        datas = pd.to_datetime(dados.iloc[:, 0], dayfirst=True)
+        valores = pd.to_numeric(dados.iloc[:, 1], errors='raise').to_numpy(dtype=np.float64)
+        # Valores em torno de 1 são fatores; os demais, variações percentuais
+        fatores = valores if np.all(np.abs(valores - 1) < 0.5) else 1 + valores / 100
+        ordem = np.argsort(datas.to_numpy())
+        mensais = datas.to_numpy(dtype='datetime64[M]')[ordem]
+        if np.any(np.diff(mensais).astype(int) != 1):
+            raise ValueError(f"Série {nome}: o CSV deve ter um valor por mês, sem lacunas")
+        self.acrescentar(nome, mensais[0], fatores[ordem])
+        return len(fatores)
+
+
+def fatores_do_extrato(colunas: Dict[str, np.ndarray]) -> Tuple[np.datetime64, np.ndarray]:
+    """Fatores de correção informados nas parcelas pagas ou emitidas do extrato (mês inicial, fatores).
+
+    Recebe as colunas de eventos.parcelas_para_colunas.
+    """
+    informadas = (
+        np.isin(colunas['situacao_parcela'], ['Paga', 'Emitida'])
+        & (colunas['indice_correcao_parcela'] > 0)
+    )
+    if not informadas.any():
+        raise ValueError("O extrato não traz fatores de correção nas parcelas pagas")
+    return meses(colunas['vencimento'][informadas])[0], colunas['indice_correcao_parcela'][informadas]
+
+
+def aplicar_correcao(df: pd.DataFrame, base: BaseIndices, nome: str, parcela_inicial: Optional[int] = None,
+                     projecao_mensal: float = 0.0) -> pd.DataFrame:
+    """Corrige saldo e parcelas a partir da parcela inicial pelo fator acumulado do índice.
+
+    No SAC com amortização pelo saldo corrigido sobre o prazo restante, corrigir o saldo
+    mês a mês equivale a multiplicar saldo, amortização, juros e MIP de cada parcela
+    pelo fator acumulado desde o início da correção, então tudo sai de uma única
+    consulta vetorizada à série. Sem parcela inicial, corrige a partir da primeira
+    parcela projetada (pagas e emitidas já vêm corrigidas no extrato). O fator
+    acumulado fica na coluna fator_correcao (multiplicada, se já houver correção),
+    que a recorrência do motor usa para manter a correção nas parcelas recalculadas.
+    """
+    df_novo = df.copy()
+    parcelas = df_novo['tipo'] == 'parcela'
+    if parcela_inicial is None:
+        nao_pagas = df_novo.loc[parcelas & ~df_novo['situacao_parcela'].isin(['Paga', 'Emitida']), 'numero']
+        if len(nao_pagas) == 0:
+            return df_novo
+        parcela_inicial = int(nao_pagas.min())
+
+    # Linhas corrigidas: da parcela inicial em diante, inclusive amortizações extras
+    posicao_inicial = int(np.flatnonzero((parcelas & (df_novo['numero'] >= parcela_inicial)).to_numpy())[0])
+    linhas = np.arange(posicao_inicial, len(df_novo))
+    datas = df_novo['data'].to_numpy(dtype='datetime64[M]')
+    fator = base.fator_acumulado(nome, np.full(len(linhas), datas[posicao_inicial]), datas[linhas], projecao_mensal)
+
+    # Amortizações extras valem o que foi pago: corrigem só o saldo
+    eh_parcela = parcelas.to_numpy()[linhas]
+    colunas = ['amortizacao', 'juros', 'seguro_mip']
+    for coluna in colunas:
+        valores = df_novo[coluna].to_numpy(dtype=np.float64)[linhas]
+        df_novo.iloc[linhas, df_novo.columns.get_loc(coluna)] = np.where(eh_parcela, valores * fator, valores)
+    df_novo.iloc[linhas, df_novo.columns.get_loc('saldo_devedor')] = (
+        df_novo['saldo_devedor'].to_numpy(dtype=np.float64)[linhas] * fator
+    )
+    ajuste = sum(
+        df_novo[coluna].to_numpy(dtype=np.float64)[linhas] - df[coluna].to_numpy(dtype=np.float64)[linhas]
+        for coluna in colunas
+    )
+    df_novo.iloc[linhas, df_novo.columns.get_loc('valor_parcela')] = (
+        df['valor_parcela'].to_numpy(dtype=np.float64)[linhas] + np.nan_to_num(ajuste)
+    )
+    fator_linhas = np.ones(len(df_novo))
+    fator_linhas[linhas] = fator
+    df_novo['fator_correcao'] = df_novo.get('fator_correcao', 1.0) * fator_linhas
+
+    df_novo['valor_total_pago'] = df_novo['valor_parcela'].cumsum()
+    df_novo['valor_total_amortizado'] = df_novo['amortizacao'].cumsum()
+    df_novo['valor_total_juros'] = df_novo['juros'].cumsum()
+    return df_novo
+
+
+def conferir_extrato(df: pd.DataFrame, base: BaseIndices, nome: str) -> pd.DataFrame:
+    """Reconstitui o saldo das parcelas pagas com a série (saldo anterior × fator - amortização) e compara ao extrato."""
+    saldo_anterior = df['saldo_devedor'].shift(1)
+    parcelas = (df['tipo'] == 'parcela') & df['situacao_parcela'].isin(['Paga', 'Emitida']) & saldo_anterior.notna()
+    pagas = df[parcelas]
+    fatores = base.fatores(nome, pagas['data'])
+    reconstituido = saldo_anterior[parcelas].to_numpy() * fatores - pagas['amortizacao'].to_numpy()
+    return pd.DataFrame({
+        'numero': pagas['numero'].astype(int).to_numpy(),
+        'vencimento': pagas['vencimento'].to_numpy(),
+        'fator': fatores,
+        'saldo_extrato': pagas['saldo_devedor'].to_numpy(),
+        'saldo_reconstituido': reconstituido,
+        'diferenca': reconstituido - pagas['saldo_devedor'].to_numpy(),
+        'diferenca_relativa': (reconstituido - pagas['saldo_devedor'].to_numpy()) / pagas['saldo_devedor'].to_numpy(),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Base local de índices de correção (fatores mensais)")
+    parser.add_argument("--diretorio", default=DIRETORIO_PADRAO, help="Diretório da base de índices")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    importar = comandos.add_parser("importar", help="Importa um CSV data;valor (fator ou % ao mês)")
+    importar.add_argument("nome", help=f"Nome da série ({', '.join(INDICES_CONHECIDOS)}...)")
+    importar.add_argument("csv", help="Arquivo CSV")
+    comandos.add_parser("listar", help="Lista as séries gravadas")
+    args = parser.parse_args()
+
+    base = BaseIndices(args.diretorio)
+    if args.comando == "importar":
+        print(f"{base.importar_csv(args.nome, args.csv)} meses importados para {args.nome}")
+    else:
+        for nome in base.nomes():
+            inicio, fim = base.periodo(nome)
+            print(f"{nome}: {inicio} a {fim}")
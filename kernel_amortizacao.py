@@ -0,0 +1,321 @@
+import argparse
+import math
+import os
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # compilação JIT opcional
+    numba = None
+
+# SIMULADOR_JIT=0 força o laço em Python mesmo com o numba instalado
+JIT_ATIVO = numba is not None and os.environ.get('SIMULADOR_JIT', '1') != '0'
+
+# Folga no arredondamento de SD'/A para cima (ruído de ponto flutuante)
+TOLERANCIA_PRAZO = 1e-9
+
+
+def _recorrencia(saldo_original, extras, taxa_mip, fixas, correcao, reducao_prazo, taxa, parcela_minima,
+                 saldo_minimo_extra, juros, amortizacao, prestacao, valor_parcela, saldo,
+                 extras_aplicados, saldo_apos_extra):
+    """Laço da recorrência sobre arrays tipados; altera os arrays de saída recebidos.
+
+    juros, amortizacao, prestacao, valor_parcela e saldo chegam com os valores
+    originais e só são sobrescritos a partir da primeira amortização. reducao_prazo,
+    parcela_minima e saldo_minimo_extra são as regras da amortização de cada parcela;
+    correcao é o fator de correção monetária do mês de cada parcela, que corrige o
+    saldo antes dos juros e, com ele, a amortização mensal e a de referência.
+    Devolve (posição da primeira parcela recalculada, posição da última parcela mantida).
+    Só usa escalares, arrays e laços simples para compilar igual no numba.
+    """
+    m = saldo_original.shape[0]
+    primeira_recalculada = m
+    fim = m - 1
+    ativo = False
+    amortizacao_mensal = 0.0
+    referencia = 0.0
+    saldo_atual = 0.0
+
+    j = 0
+    while j <= fim:
+        if ativo:
+            saldo_atual = saldo_atual * correcao[j]
+            amortizacao_mensal = amortizacao_mensal * correcao[j]
+            referencia = referencia * correcao[j]
+            saldo_anterior = saldo_atual
+            juros[j] = saldo_atual * taxa
+            amortizacao[j] = amortizacao_mensal
+            prestacao[j] = amortizacao_mensal + juros[j]
+            # MIP sobre o saldo antes do pagamento; DFI, seguro residencial e TCA fixos
+            valor_parcela[j] = prestacao[j] + taxa_mip[j] * saldo_anterior + fixas[j]
+            saldo_atual = saldo_atual - amortizacao_mensal
+            saldo[j] = saldo_atual
+        else:
+            saldo_atual = saldo_original[j]
+            referencia = amortizacao[j]
+
+        extra = min(extras[j], saldo_atual)
+        # Amortização condicional: só enquanto o saldo estiver acima do mínimo informado
+        if extra > 0 and saldo_atual >= saldo_minimo_extra[j]:
+            saldo_atual -= extra
+            extras_aplicados[j] = extra
+            saldo_apos_extra[j] = saldo_atual
+            primeira_recalculada = min(primeira_recalculada, j + 1)
+            restantes = fim - j
+            if saldo_atual <= 0:
+                prazo = 0
+            elif reducao_prazo[j]:
+                # Menor prazo em que a amortização não passa da do contrato (A, a da parcela
+                # da primeira amortização extra): n' = teto(SD'/A). Uma amortização ínfima
+                # mantém o prazo e amortizações pequenas sucessivas acumulam a redução
+                if referencia > 0:
+                    prazo = max(int(math.ceil(saldo_atual / referencia - TOLERANCIA_PRAZO)), 1)
+                else:
+                    prazo = restantes
+            else:
+                prazo = restantes
+                # Piso: se a primeira parcela após a amortização (A' + SD'·i) ficar abaixo do mínimo,
+                # o prazo é reduzido para que ela valha o mínimo
+                if prazo > 0 and saldo_atual / prazo + saldo_atual * taxa < parcela_minima[j]:
+                    prazo = max(int(saldo_atual / (parcela_minima[j] - saldo_atual * taxa)), 1)
+            prazo = min(prazo, restantes)
+            amortizacao_mensal = saldo_atual / prazo if prazo > 0 else 0.0
+            fim = j + prazo
+            ativo = True
+        j += 1
+
+    return primeira_recalculada, fim
+
+
+def _criar_lote(recorrencia):
+    def lote(saldo_original, extras, taxa_mip, fixas, correcao, reducao_prazo, taxa, parcelas_minimas,
+             saldos_minimos_extra, juros, amortizacao, prestacao, valor_parcela, saldo,
+             extras_aplicados, saldo_apos_extra, primeiras, fins):
+        for b in range(extras.shape[0]):
+            primeiras[b], fins[b] = recorrencia(
+                saldo_original, extras[b], taxa_mip, fixas, correcao, reducao_prazo[b], taxa, parcelas_minimas[b],
+                saldos_minimos_extra[b], juros[b], amortizacao[b], prestacao[b], valor_parcela[b],
+                saldo[b], extras_aplicados[b], saldo_apos_extra[b]
+            )
+    return lote
+
+
+_lote = _criar_lote(_recorrencia)
+if numba is not None:
+    _recorrencia_jit = numba.njit(cache=True)(_recorrencia)
+    _lote_jit = numba.njit(cache=True)(_criar_lote(_recorrencia_jit))
+else:
+    _recorrencia_jit = _lote_jit = None
+
+
+def jit_disponivel() -> bool:
+    return numba is not None
+
+
+def _usar_jit(jit: Optional[bool]) -> bool:
+    if jit is None:
+        return JIT_ATIVO
+    if jit and numba is None:
+        raise RuntimeError("Kernel compilado requer o pacote 'numba' (pip install numba).")
+    return jit
+
+
+class ResultadoKernel(NamedTuple):
+    """Arrays das parcelas após a recorrência (2D, um cenário por linha, no lote)."""
+    juros: np.ndarray
+    amortizacao: np.ndarray
+    prestacao: np.ndarray
+    valor_parcela: np.ndarray  # com MIP sobre o saldo corrente e tarifas fixas
+    saldo: np.ndarray
+    extras: np.ndarray  # valor efetivamente amortizado após cada parcela (0 se nenhum)
+    saldo_apos_extra: np.ndarray
+    primeira_recalculada: np.ndarray  # int no cenário único
+    fim: np.ndarray  # posição da última parcela mantida; int no cenário único
+
+
+def _float64(valores, tamanho: int) -> np.ndarray:
+    return np.ascontiguousarray(np.broadcast_to(np.asarray(valores, dtype=np.float64), (tamanho,)))
+
+
+def _por_cenario(valores, cenarios: int, m: int, dtype=np.float64) -> np.ndarray:
+    """Escalar, um valor por cenário (cenários,) ou por parcela de cada cenário (cenários, parcelas)."""
+    valores = np.asarray(valores, dtype=dtype)
+    if valores.ndim == 1:
+        valores = valores[:, None]
+    return np.ascontiguousarray(np.broadcast_to(valores, (cenarios, m)))
+
+
+def recorrencia(saldo_original: np.ndarray, juros: np.ndarray, amortizacao: np.ndarray,
+                prestacao: np.ndarray, valor_parcela: np.ndarray, extras: np.ndarray,
+                reducao_prazo, taxa: float, taxa_mip=0.0, fixas=0.0,
+                parcela_minima=0.0, saldo_minimo_extra=0.0, correcao=1.0,
+                jit: Optional[bool] = None) -> ResultadoKernel:
+    """Recorrência de um cenário. Os arrays de entrada não são alterados.
+
+    Sem parcela mínima nem saldo mínimo reproduz recorrencia_amortizacoes do motor;
+    parcela_minima vale para a redução de parcela e limita a primeira parcela após
+    cada amortização (A' + SD'·i, sem seguros e tarifas). reducao_prazo, parcela_minima
+    e saldo_minimo_extra são escalares ou um valor por parcela; correcao, o fator
+    mensal de correção monetária de cada parcela (os arrays originais já corrigidos).
+    jit=None usa o numba quando disponível (e SIMULADOR_JIT diferente de 0).
+    """
+    saldo_original = np.ascontiguousarray(saldo_original, dtype=np.float64)
+    m = len(saldo_original)
+    saida = [np.array(a, dtype=np.float64) for a in (juros, amortizacao, prestacao, valor_parcela, saldo_original)]
+    saida += [np.zeros(m), np.zeros(m)]
+    funcao = _recorrencia_jit if _usar_jit(jit) else _recorrencia
+    primeira, fim = funcao(
+        saldo_original, _float64(extras, m), _float64(taxa_mip, m), _float64(fixas, m), _float64(correcao, m),
+        np.ascontiguousarray(np.broadcast_to(np.asarray(reducao_prazo, dtype=np.bool_), (m,))), float(taxa),
+        _float64(parcela_minima, m), _float64(saldo_minimo_extra, m), *saida
+    )
+    return ResultadoKernel(*saida, int(primeira), int(fim))
+
+
+def recorrencia_lote(saldo_original: np.ndarray, juros: np.ndarray, amortizacao: np.ndarray,
+                     prestacao: np.ndarray, valor_parcela: np.ndarray, extras: np.ndarray,
+                     reducao_prazo, taxa: float, taxa_mip=0.0, fixas=0.0,
+                     parcelas_minimas=0.0, saldos_minimos_extra=0.0, correcao=1.0,
+                     jit: Optional[bool] = None) -> ResultadoKernel:
+    """Recorrência de vários cenários do mesmo contrato num único laço compilado.
+
+    extras tem forma (cenários, parcelas); reducao_prazo, parcelas_minimas e
+    saldos_minimos_extra são escalares, um valor por cenário ou um por parcela de
+    cada cenário; correcao é do contrato, como taxa_mip e fixas. Os resultados têm
+    forma (cenários, parcelas).
+    """
+    saldo_original = np.ascontiguousarray(saldo_original, dtype=np.float64)
+    extras = np.ascontiguousarray(extras, dtype=np.float64)
+    cenarios, m = extras.shape
+    saida = [
+        np.array(np.broadcast_to(np.asarray(a, dtype=np.float64), (cenarios, m)))
+        for a in (juros, amortizacao, prestacao, valor_parcela, saldo_original)
+    ]
+    saida += [np.zeros((cenarios, m)), np.zeros((cenarios, m))]
+    primeiras = np.zeros(cenarios, dtype=np.int64)
+    fins = np.zeros(cenarios, dtype=np.int64)
+    funcao = _lote_jit if _usar_jit(jit) else _lote
+    funcao(
+        saldo_original, extras, _float64(taxa_mip, m), _float64(fixas, m), _float64(correcao, m),
+        _por_cenario(reducao_prazo, cenarios, m, np.bool_), float(taxa),
+        _por_cenario(parcelas_minimas, cenarios, m), _por_cenario(saldos_minimos_extra, cenarios, m),
+        *saida, primeiras, fins
+    )
+    return ResultadoKernel(*saida, primeiras, fins)
+
+
+def cenarios_aleatorios(cenarios: int, parcelas: int = 420, semente: int = 0) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """Contrato SAC sintético, corrigido a partir de um quarto do prazo, e cenários com
+    amortizações esparsas, pisos e saldos mínimos sorteados."""
+    aleatorio = np.random.default_rng(semente)
+    taxa = (1 + 0.1049) ** (1 / 12) - 1
+    valor = 500000.0
+    correcao = np.where(np.arange(parcelas) >= parcelas // 4, 1.0015, 1.0)
+    fator = np.cumprod(correcao)
+    amortizacao = np.full(parcelas, valor / parcelas) * fator
+    saldo = (valor - valor / parcelas * np.arange(1, parcelas + 1)) * fator
+    juros = (saldo + amortizacao) * taxa
+    taxa_mip = np.where(np.arange(parcelas) < parcelas // 2, 0.00012, 0.00025)
+    fixas = np.full(parcelas, 45.0)
+    contrato = {
+        'saldo_original': saldo,
+        'juros': juros,
+        'amortizacao': amortizacao,
+        'prestacao': amortizacao + juros,
+        'valor_parcela': amortizacao + juros + taxa_mip * (saldo + amortizacao) + fixas,
+        'taxa_mip': taxa_mip,
+        'fixas': fixas,
+        'correcao': correcao,
+        'taxa': taxa,
+    }
+    extras = np.where(aleatorio.random((cenarios, parcelas)) < 0.05,
+                      aleatorio.uniform(1000, 40000, (cenarios, parcelas)), 0.0)
+    parametros = {
+        'extras': extras,
+        'parcelas_minimas': np.where(aleatorio.random(cenarios) < 0.5, aleatorio.uniform(1500, 4000, cenarios), 0.0),
+        'saldos_minimos_extra': np.where(aleatorio.random(cenarios) < 0.5, aleatorio.uniform(0, 200000, cenarios), 0.0),
+    }
+    return contrato, parametros
+
+
+def _executar_lote(contrato, parametros, reducao_prazo, jit) -> ResultadoKernel:
+    return recorrencia_lote(
+        contrato['saldo_original'], contrato['juros'], contrato['amortizacao'], contrato['prestacao'],
+        contrato['valor_parcela'], parametros['extras'], reducao_prazo, contrato['taxa'],
+        contrato['taxa_mip'], contrato['fixas'], parametros['parcelas_minimas'],
+        parametros['saldos_minimos_extra'], contrato['correcao'], jit=jit
+    )
+
+
+def conferir_modos(cenarios: int = 500, semente: int = 0) -> Dict[str, float]:
+    """Maior diferença absoluta entre o kernel compilado e o laço em Python, por modo de redução.
+
+    Os dois modos executam as mesmas operações em float64 e devem coincidir bit a bit:
+    qualquer diferença levanta AssertionError. Confere também que o lote e a chamada
+    por cenário coincidem. Exige o numba.
+    """
+    contrato, parametros = cenarios_aleatorios(cenarios, semente=semente)
+    diferencas = {}
+    for reducao_prazo, rotulo in ((True, 'prazo'), (False, 'parcela')):
+        compilado = _executar_lote(contrato, parametros, reducao_prazo, True)
+        python = _executar_lote(contrato, parametros, reducao_prazo, False)
+        if not (np.array_equal(compilado.fim, python.fim)
+                and np.array_equal(compilado.primeira_recalculada, python.primeira_recalculada)):
+            raise AssertionError(f"Prazos diferentes entre os modos (redução de {rotulo})")
+        diferencas[rotulo] = max(
+            float(np.max(np.abs(a - b), initial=0.0)) for a, b in zip(compilado[:7], python[:7])
+        )
+        if diferencas[rotulo] != 0.0:
+            raise AssertionError(
+                f"Valores diferentes entre os modos (redução de {rotulo}): {diferencas[rotulo]:.3e}"
+            )
+        unico = recorrencia(
+            contrato['saldo_original'], contrato['juros'], contrato['amortizacao'], contrato['prestacao'],
+            contrato['valor_parcela'], parametros['extras'][0], reducao_prazo, contrato['taxa'],
+            contrato['taxa_mip'], contrato['fixas'], parametros['parcelas_minimas'][0],
+            parametros['saldos_minimos_extra'][0], contrato['correcao'], jit=False
+        )
+        if unico.fim != python.fim[0] or not all(
+            np.array_equal(a, b[0]) for a, b in zip(unico[:7], python[:7])
+        ):
+            raise AssertionError(f"Lote e cenário único divergem (redução de {rotulo})")
+    return diferencas
+
+
+def medir(cenarios: int = 2000, repeticoes: int = 3, semente: int = 0) -> Dict[str, float]:
+    """Melhor tempo (s) do lote em cada modo disponível; a compilação fica fora da medição."""
+    contrato, parametros = cenarios_aleatorios(cenarios, semente=semente)
+    modos = {'python': False}
+    if jit_disponivel():
+        modos['numba'] = True
+        _executar_lote(contrato, parametros, True, True)  # compila antes de medir
+    tempos = {}
+    for nome, jit in modos.items():
+        melhor = float('inf')
+        for _ in range(repeticoes if jit else 1):
+            inicio = time.perf_counter()
+            _executar_lote(contrato, parametros, True, jit)
+            melhor = min(melhor, time.perf_counter() - inicio)
+        tempos[nome] = melhor
+    return tempos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere e mede o kernel da recorrência de amortizações")
+    parser.add_argument("--cenarios", type=int, default=2000, help="Cenários no lote medido")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    if jit_disponivel():
+        for rotulo, diferenca in conferir_modos(semente=args.semente).items():
+            print(f"Redução de {rotulo}: maior diferença numba x Python = {diferenca:.3e}")
+    else:
+        print("numba não instalado: apenas o laço em Python está disponível")
+    tempos = medir(args.cenarios, semente=args.semente)
+    for nome, segundos in tempos.items():
+        print(f"{nome}: {segundos:.3f} s para {args.cenarios} cenários ({segundos / args.cenarios * 1e6:.1f} µs/cenário)")
+    if 'numba' in tempos:
+        print(f"Aceleração: {tempos['python'] / tempos['numba']:.0f}x")
@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, NamedTuple, Optional, Sequence
+
+from motor_amortizacao import (
+    TAXA_JUROS_ANUAL, taxa_mensal, arrays_parcelas, novo_prazo_continuo,
+    PlanoAmortizacao, valores_plano, combinar_planos, recorrencia_amortizacoes, extras_existentes,
+    Numero
+)
+from kernel_amortizacao import TOLERANCIA_PRAZO
+from tarifas import TabelaTarifas, tabela_do_extrato, posicoes_tabela, tarifas_fixas
+
+PONTOS_GRADE = 64  # valores avaliados por rodada na busca da amortização única
+TOLERANCIA = 0.01  # centavo
+
+
+class ResultadoMeta(NamedTuple):
+    """Amortização necessária para atingir a meta e o cronograma resultante."""
+    valor: float  # NaN quando a meta é inatingível
+    ultima_parcela: int
+    maior_parcela: float  # maior parcela após a parcela final do plano (0 se quitado)
+    avaliacoes: int
+
+
+def metricas_amortizacao_unica(dados: Dict[str, np.ndarray], tarifas: TabelaTarifas, posicao: int,
+                               valores: np.ndarray, tipo_reducao: str, taxa: float) -> Dict[str, np.ndarray]:
+    """Última parcela e maior parcela seguinte para vários valores antecipados, pela forma fechada.
+
+    Após antecipar x na parcela da posição k: SD' = SD - x; na redução de prazo
+    n' = teto(SD'/A), senão n' = parcelas restantes; A' = SD'/n' e a parcela t
+    vale r_t·[A' + (SD' - (t-1)·A')·(i + taxa MIP)] + tarifas fixas, com r_t a
+    correção monetária acumulada desde a parcela k (1 sem correção). Tudo
+    vetorizado na grade de valores.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    restantes = len(dados['saldo_devedor']) - 1 - posicao
+    novo_saldo = np.maximum(dados['saldo_devedor'][posicao] - valores, 0.0)
+
+    if tipo_reducao == 'prazo':
+        prazo = np.ceil(novo_prazo_continuo(novo_saldo, dados['amortizacao'][posicao]) - TOLERANCIA_PRAZO)
+        prazo = np.where(np.isnan(prazo), restantes, np.maximum(prazo, 1))
+        prazo = np.minimum(prazo, restantes)
+    else:
+        prazo = np.full(len(valores), float(restantes))
+    prazo = np.where(novo_saldo > 0, prazo, 0).astype(np.int64)
+
+    # Parcelas seguintes (linhas) para cada valor da grade (colunas)
+    futuras = np.arange(posicao + 1, posicao + 1 + restantes)
+    numeros = dados['numero'][futuras]
+    taxa_mip = tarifas.taxa_mip[posicoes_tabela(tarifas, numeros)]
+    fixas = tarifas_fixas(tarifas, numeros)
+    correcao = (dados['fator_correcao'][futuras] / dados['fator_correcao'][posicao])[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        amortizacao_mensal = np.where(prazo > 0, novo_saldo / prazo, 0.0)
+    decorridas = np.arange(restantes)[:, None]
+    saldo_anterior = novo_saldo[None, :] - decorridas * amortizacao_mensal[None, :]
+    parcelas = (
+        correcao * (amortizacao_mensal[None, :] + saldo_anterior * (taxa + taxa_mip[:, None]))
+        + fixas[:, None]
+    )
+    parcelas = np.where(decorridas < prazo[None, :], parcelas, 0.0)
+
+    ultima_parcela = dados['numero'][posicao + prazo] if restantes > 0 else np.full(len(valores), dados['numero'][posicao])
+    maior_parcela = parcelas.max(axis=0) if restantes > 0 else np.zeros(len(valores))
+
+    # Sem antecipação o cronograma fica como está (a forma fechada recalcularia o prazo)
+    sem_antecipacao = valores <= 0
+    ultima_parcela = np.where(sem_antecipacao, dados['numero'][-1], ultima_parcela)
+    maior_parcela = np.where(sem_antecipacao, dados['valor_parcela'][posicao + 1:].max(initial=0.0), maior_parcela)
+
+    return {
+        'ultima_parcela': ultima_parcela,
+        'maior_parcela': maior_parcela,
+    }
+
+
+def metricas_plano(dados: Dict[str, np.ndarray], tarifas: TabelaTarifas, extras: np.ndarray,
+                   tipo_reducao, taxa: float, posicao_final: int, parcela_minima: Numero = 0.0,
+                   saldo_minimo_extra: Numero = 0.0) -> Dict[str, float]:
+    """Última parcela e maior parcela após o fim do plano (posição posicao_final), direto dos arrays.
+
+    tipo_reducao e os limites aceitam um valor por parcela, como em recorrencia_amortizacoes.
+    """
+    resultado = recorrencia_amortizacoes(
+        dados['saldo_devedor'], dados['juros'], dados['amortizacao'], dados['prestacao'],
+        extras, tipo_reducao, taxa, parcela_minima, saldo_minimo_extra, dados['correcao']
+    )
+    if not resultado.eventos:
+        # Sem amortização: parcelas originais, com seguros e tarifas do extrato
+        return {
+            'ultima_parcela': int(dados['numero'][-1]),
+            'maior_parcela': float(dados['valor_parcela'][posicao_final + 1:].max(initial=0.0)),
+        }
+    seguintes = slice(posicao_final + 1, resultado.fim + 1)
+    numeros = dados['numero'][seguintes]
+    saldo_anterior = resultado.saldo[seguintes] + resultado.amortizacao[seguintes]
+    parcelas = (
+        resultado.prestacao[seguintes]
+        + tarifas.taxa_mip[posicoes_tabela(tarifas, numeros)] * saldo_anterior
+        + tarifas_fixas(tarifas, numeros)
+    )
+    return {
+        'ultima_parcela': int(dados['numero'][resultado.fim]),
+        'maior_parcela': float(parcelas.max()) if len(parcelas) > 0 else 0.0,
+    }
+
+
+def bissecao(atingiu: Callable[[float], bool], minimo: float, maximo: float,
+             tolerancia: float = TOLERANCIA) -> Optional[float]:
+    """Menor valor em [minimo, maximo] que atinge a meta (monótona no valor), ou None."""
+    if not atingiu(maximo):
+        return None
+    if atingiu(minimo):
+        return minimo
+    while maximo - minimo > tolerancia:
+        meio = (minimo + maximo) / 2
+        if atingiu(meio):
+            maximo = meio
+        else:
+            minimo = meio
+    return maximo
+
+
+def resolver_meta(df: pd.DataFrame, plano: PlanoAmortizacao, meta: str, alvo: float,
+                  taxa_anual: float = TAXA_JUROS_ANUAL,
+                  tarifas: Optional[TabelaTarifas] = None,
+                  planos: Sequence[PlanoAmortizacao] = ()) -> ResultadoMeta:
+    """Valor de amortização do plano (único se parcela inicial = final) que atinge a meta.
+
+    meta 'quitacao': última parcela com número <= alvo; meta 'parcela': maior parcela
+    após a parcela final do plano <= alvo (R$). O valor informado no plano é ignorado.
+    A amortização única é buscada por refinamento de grade sobre a forma fechada;
+    o plano recorrente (ou com parcela mínima ou saldo mínimo), por bisseção sobre
+    a recorrência em arrays. df é o cronograma sem simulações e planos, os eventos
+    já aplicados no cenário: entram na recorrência junto com o plano buscado
+    (combinar_planos), assim como as amortizações do extrato a partir do primeiro
+    deles (extras_existentes). Nenhuma das buscas monta DataFrames.
+    """
+    taxa = taxa_mensal(taxa_anual)
+    dados = arrays_parcelas(df)
+    if tarifas is None:
+        tarifas = tabela_do_extrato(df)
+    posicao = int(np.clip(np.searchsorted(dados['numero'], plano.parcela_inicial), 0, len(dados['numero']) - 1))
+    maximo = float(dados['saldo_devedor'][posicao])
+    chave = 'ultima_parcela' if meta == 'quitacao' else 'maior_parcela'
+    tipo_reducao = 'prazo' if plano.tipo_reducao == 'prazo' else 'valor'
+
+    def atende(metricas):
+        return np.asarray(metricas[chave]) <= alvo + (0 if meta == 'quitacao' else 1e-9)
+
+    # Forma fechada só vale sem outras amortizações (do cenário ou do extrato) no caminho
+    regras = combinar_planos([plano._replace(valor=1.0)] + list(planos), dados['numero'])
+    outros = combinar_planos(planos, dados['numero']).extras
+    primeira = np.flatnonzero(regras.extras > 0)
+    existentes = extras_existentes(df, int(primeira[0]) if len(primeira) > 0 else posicao)
+    condicional = plano.parcela_minima > 0 or plano.saldo_minimo > 0
+    empilhada = outros.any() or existentes.any()
+    if plano.parcela_final <= plano.parcela_inicial and not condicional and not empilhada:
+        # Refinamento de grade: cada rodada reduz o intervalo em PONTOS_GRADE vezes
+        avaliar = lambda valores: metricas_amortizacao_unica(dados, tarifas, posicao, valores, tipo_reducao, taxa)
+        minimo, avaliacoes = 0.0, 0
+        if not atende(avaliar(np.array([maximo])))[0]:
+            return ResultadoMeta(np.nan, int(dados['numero'][-1]), np.nan, 1)
+        while maximo - minimo > TOLERANCIA:
+            grade = np.linspace(minimo, maximo, PONTOS_GRADE + 1)
+            ok = atende(avaliar(grade))
+            avaliacoes += len(grade)
+            primeiro = int(np.argmax(ok))
+            if primeiro == 0:
+                maximo = minimo
+                break
+            minimo, maximo = grade[primeiro - 1], grade[primeiro]
+        valor = float(np.ceil(round(maximo, 6) * 100) / 100) if maximo > 0 else 0.0
+        valor = min(valor, float(dados['saldo_devedor'][posicao]))
+        metricas = avaliar(np.array([valor]))
+        return ResultadoMeta(valor, int(metricas['ultima_parcela'][0]), float(metricas['maior_parcela'][0]), avaliacoes + 2)
+
+    # Plano recorrente: o valor de cada amortização escala o vetor de extras do plano;
+    # as regras de cada parcela não dependem do valor
+    base = valores_plano(plano._replace(valor=1.0), dados['numero'])
+    fixos = outros + existentes
+    posicao_final = int(np.searchsorted(dados['numero'], plano.parcela_final, side='right')) - 1
+    avaliacoes = 0
+
+    def atingiu(valor):
+        nonlocal avaliacoes
+        avaliacoes += 1
+        return bool(atende(metricas_plano(dados, tarifas, base * valor + fixos, regras.reducao_prazo, taxa,
+                                          posicao_final, regras.parcela_minima, regras.saldo_minimo)))
+
+    valor = bissecao(atingiu, 0.0, maximo)
+    if valor is None:
+        return ResultadoMeta(np.nan, int(dados['numero'][-1]), np.nan, avaliacoes)
+    valor = float(np.ceil(round(valor, 6) * 100) / 100)
+    metricas = metricas_plano(dados, tarifas, base * valor + fixos, regras.reducao_prazo, taxa, posicao_final,
+                              regras.parcela_minima, regras.saldo_minimo)
+    return ResultadoMeta(valor, metricas['ultima_parcela'], metricas['maior_parcela'], avaliacoes + 1)
+
+
+def parcela_limite(df: pd.DataFrame, data_limite) -> int:
+    """Número da última parcela com vencimento até a data informada (0 se nenhuma)."""
+    parcelas = df[df['tipo'] == 'parcela']
+    ate_data = parcelas.loc[parcelas['data'] <= pd.Timestamp(data_limite), 'numero']
+    return int(ate_data.max()) if len(ate_data) > 0 else 0
@@ -0,0 +1,413 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from tarifas import TabelaTarifas, tabela_do_extrato, aplicar_tarifas
+from kernel_amortizacao import TOLERANCIA_PRAZO, recorrencia
+
+# Taxa de juros anual do contrato
+TAXA_JUROS_ANUAL = 0.10490  # 10.49%
+
+# Incrementar sempre que uma mudança nos cálculos alterar os cronogramas gerados
+VERSAO_MOTOR = "7"
+
+# Situação das linhas de amortização extra geradas pelo simulador (as do extrato são 'Amortizado')
+SITUACAO_SIMULADA = 'Simulado'
+
+Numero = Union[float, np.ndarray]
+
+
+def taxa_mensal(taxa_anual: float = TAXA_JUROS_ANUAL) -> float:
+    """Converte a taxa anual efetiva em taxa mensal equivalente."""
+    return (1 + taxa_anual) ** (1/12) - 1
+
+
+def arrays_parcelas(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Extrai do cronograma os arrays das parcelas (sem as linhas de amortização extra).
+
+    'fator_correcao' é o fator acumulado da correção monetária de cada parcela (1 sem
+    correção, ver indices.aplicar_correcao) e 'correcao', o fator do mês dela.
+    """
+    parcelas = df[df['tipo'] == 'parcela']
+    if 'fator_correcao' in parcelas:
+        fator = parcelas['fator_correcao'].fillna(1.0).to_numpy(dtype=np.float64)
+    else:
+        fator = np.ones(len(parcelas))
+    return {
+        'numero': parcelas['numero'].to_numpy(dtype=np.int64),
+        'vencimento': parcelas['vencimento'].to_numpy(dtype=object),
+        'saldo_devedor': parcelas['saldo_devedor'].to_numpy(dtype=np.float64),
+        'valor_parcela': parcelas['valor_parcela'].to_numpy(dtype=np.float64),
+        # Parcela sem seguros e tarifas: é ela que a redução de prazo procura manter
+        'prestacao': (parcelas['amortizacao'] + parcelas['juros']).to_numpy(dtype=np.float64),
+        'juros': parcelas['juros'].to_numpy(dtype=np.float64),
+        'amortizacao': parcelas['amortizacao'].to_numpy(dtype=np.float64),
+        'situacao_parcela': parcelas['situacao_parcela'].to_numpy(dtype=object),
+        'fator_correcao': fator,
+        'correcao': fator / np.concatenate([[1.0], fator[:-1]]),
+    }
+
+
+def novo_prazo_continuo(saldo: Numero, amortizacao: Numero) -> Numero:
+    """n' = SD' / A, sem arredondamento; NaN quando não há amortização."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(amortizacao > 0, saldo / amortizacao, np.nan)
+
+
+def somas_correcao(fator_correcao: np.ndarray, posicoes: Numero, prazo: Numero) -> Tuple[np.ndarray, np.ndarray]:
+    """Somas de r_d e de d·r_d para d = 0..n'-1, com r_d = F(k+1+d)/F(k) e k a posição.
+
+    São as somas que a correção monetária acrescenta às formas fechadas: a parcela d
+    após a posição k tem saldo e amortização multiplicados por r_d. Usam somas
+    prefixadas dos fatores, então valem para qualquer grade de posições e prazos.
+    """
+    fator = np.asarray(fator_correcao, dtype=np.float64)
+    m = len(fator)
+    soma = np.concatenate([[0.0], np.cumsum(fator)])
+    soma_indice = np.concatenate([[0.0], np.cumsum(np.arange(m) * fator)])
+    posicoes = np.asarray(posicoes, dtype=np.int64)
+    inicio = posicoes + 1
+    fim = np.clip(inicio + np.nan_to_num(np.asarray(prazo, dtype=np.float64)).astype(np.int64), inicio, m)
+    inicio = np.minimum(inicio, m)
+    soma_r = soma[fim] - soma[inicio]
+    soma_dr = soma_indice[fim] - soma_indice[inicio] - inicio * soma_r
+    return soma_r / fator[posicoes], soma_dr / fator[posicoes]
+
+
+def juros_futuros(saldo: Numero, amortizacao: Numero, parcelas_restantes: Numero,
+                  taxa: float, tipo_reducao: str = 'prazo',
+                  fator_correcao: Optional[np.ndarray] = None, posicoes: Optional[Numero] = None) -> Numero:
+    """Total de juros futuros da recorrência de calcular_nova_tabela a partir do saldo SD'.
+
+    Com amortização constante A' = SD'/n' por n' parcelas, os juros somam
+    i·SD'·(n'+1)/2. Na redução de prazo n' = teto(SD'/A), com A a amortização
+    atual, limitado às parcelas restantes; na redução de valor n' é o próprio
+    número de parcelas restantes. Com fator_correcao (por parcela do cronograma) e a
+    posição de cada saldo, os juros passam a i·SD'·Σ r_d·(1 - d/n') (somas_correcao).
+    """
+    saldo = np.asarray(saldo, dtype=np.float64)
+    restantes = np.asarray(parcelas_restantes, dtype=np.float64)
+    if tipo_reducao == 'prazo':
+        prazo = np.ceil(novo_prazo_continuo(saldo, amortizacao) - TOLERANCIA_PRAZO)
+        prazo = np.fmin(np.maximum(prazo, 1), restantes)
+    else:
+        prazo = restantes
+    if fator_correcao is None:
+        with np.errstate(invalid='ignore'):
+            return np.where(saldo > 0, taxa * saldo * (prazo + 1) / 2, 0.0)
+    soma_r, soma_dr = somas_correcao(fator_correcao, posicoes, prazo)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where((saldo > 0) & (prazo > 0), taxa * saldo * (soma_r - soma_dr / prazo), 0.0)
+
+
+def sensibilidade_juros(df: pd.DataFrame, tipo_reducao: str = 'prazo', valor_amortizacao: float = 0.0,
+                        taxa_anual: float = TAXA_JUROS_ANUAL) -> pd.DataFrame:
+    """Valor de R$ 1 antecipado em cada parcela futura, calculado numa única passada vetorizada.
+
+    'economia_marginal' é a derivada -dJ/dx em x = 0 (juros economizados por real
+    antecipado); 'economia_media' é a economia por real para o valor informado,
+    (J(SD) - J(SD - x)) / x, usando o prazo arredondado como em calcular_nova_tabela.
+    Com correção monetária no cronograma as duas incluem os fatores (somas_correcao).
+    """
+    taxa = taxa_mensal(taxa_anual)
+    parcelas = arrays_parcelas(df)
+    futuras = parcelas['situacao_parcela'] != 'Paga'
+
+    saldo = parcelas['saldo_devedor'][futuras]
+    amortizacao = parcelas['amortizacao'][futuras]
+    # Parcelas posteriores a cada parcela alvo
+    restantes = (len(saldo) - 1 - np.arange(len(saldo))).astype(np.float64)
+    corrigido = bool(np.any(parcelas['fator_correcao'] != 1.0))
+    fator = parcelas['fator_correcao'] if corrigido else None
+    posicoes = np.flatnonzero(futuras)
+
+    if corrigido:
+        # Com J = i·SD·Σ r_d·(1 - d/n'): na redução de valor dJ/dS = i·Σ r_d·(1 - d/n);
+        # na de prazo n' = SD/A também varia e dJ/dS = i·(Σ r_d + r_n'/2)
+        if tipo_reducao == 'prazo':
+            prazo = np.fmin(np.ceil(novo_prazo_continuo(saldo, amortizacao) - TOLERANCIA_PRAZO), restantes)
+        else:
+            prazo = restantes
+        soma_r, soma_dr = somas_correcao(fator, posicoes, prazo)
+        if tipo_reducao == 'prazo':
+            ultima = np.minimum(posicoes + np.nan_to_num(prazo).astype(np.int64), len(fator) - 1)
+            economia_marginal = taxa * (soma_r + fator[ultima] / fator[posicoes] / 2)
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                economia_marginal = taxa * (soma_r - np.where(prazo > 0, soma_dr / prazo, 0.0))
+    elif tipo_reducao == 'prazo':
+        # n' = SD/A cai junto com o saldo: dJ/dS = i/2·[(n'+1) + SD/A] = i/2·(2n'+1)
+        prazo = np.fmin(novo_prazo_continuo(saldo, amortizacao), restantes)
+        economia_marginal = taxa / 2 * (2 * prazo + 1)
+    else:
+        # Redução de valor: J é linear no saldo, dJ/dS = i·(n+1)/2
+        economia_marginal = taxa * (restantes + 1) / 2
+    economia_marginal = np.where(saldo > 0, economia_marginal, 0.0)
+
+    resultado = pd.DataFrame({
+        'numero': parcelas['numero'][futuras],
+        'vencimento': parcelas['vencimento'][futuras],
+        'saldo_devedor': saldo,
+        'juros_futuros': juros_futuros(saldo, amortizacao, restantes, taxa, tipo_reducao, fator, posicoes),
+        'economia_marginal': economia_marginal,
+    })
+
+    if valor_amortizacao > 0:
+        novo_saldo = np.maximum(saldo - valor_amortizacao, 0.0)
+        juros_novos = juros_futuros(novo_saldo, amortizacao, restantes, taxa, tipo_reducao, fator, posicoes)
+        valido = saldo >= valor_amortizacao
+        resultado['economia_media'] = np.where(
+            valido, (resultado['juros_futuros'] - juros_novos) / valor_amortizacao, np.nan
+        )
+
+    return resultado
+
+
+class PlanoAmortizacao(NamedTuple):
+    """Amortização extra recorrente entre duas parcelas."""
+    valor: float
+    parcela_inicial: int
+    parcela_final: int
+    frequencia: int = 1  # a cada quantas parcelas
+    crescimento_anual: float = 0.0  # reajuste do valor a cada 12 parcelas
+    tipo_reducao: str = 'prazo'  # 'prazo' ou 'parcela'
+    parcela_minima: float = 0.0  # piso da parcela (sem seguros e tarifas) na redução de parcela
+    saldo_minimo: float = 0.0  # só amortiza enquanto o saldo devedor for ao menos este valor
+
+
+def valores_plano(plano: PlanoAmortizacao, numeros: np.ndarray) -> np.ndarray:
+    """Valor extra a ser amortizado após cada parcela (zero fora do plano)."""
+    numeros = np.asarray(numeros, dtype=np.int64)
+    decorrido = numeros - plano.parcela_inicial
+    no_plano = (
+        (numeros >= plano.parcela_inicial)
+        & (numeros <= plano.parcela_final)
+        & (decorrido % max(plano.frequencia, 1) == 0)
+    )
+    fator = (1 + plano.crescimento_anual) ** np.floor_divide(np.maximum(decorrido, 0), 12)
+    return np.where(no_plano, plano.valor * fator, 0.0)
+
+
+class RegrasAmortizacao(NamedTuple):
+    """Extras somados por parcela e as regras da recorrência em cada parcela."""
+    extras: np.ndarray
+    reducao_prazo: np.ndarray
+    parcela_minima: np.ndarray
+    saldo_minimo: np.ndarray
+
+
+def combinar_planos(planos: Sequence[PlanoAmortizacao], numeros: np.ndarray) -> RegrasAmortizacao:
+    """Junta vários planos num único vetor de extras, com as regras de cada parcela.
+
+    Numa parcela com mais de um plano os valores se somam, vale a redução de prazo
+    se algum deles for de prazo, o maior piso de parcela e o menor saldo mínimo, de
+    modo que o resultado não depende da ordem dos planos. Parcelas sem plano (as do
+    extrato, refeitas na recorrência) usam a redução de prazo, sem piso nem saldo mínimo.
+    """
+    m = len(numeros)
+    extras = np.zeros(m)
+    com_plano = np.zeros(m, dtype=bool)
+    com_prazo = np.zeros(m, dtype=bool)
+    parcela_minima = np.zeros(m)
+    saldo_minimo = np.full(m, np.inf)
+    for plano in planos:
+        valores = valores_plano(plano, numeros)
+        no_plano = valores > 0
+        extras += valores
+        com_plano |= no_plano
+        com_prazo |= no_plano & (plano.tipo_reducao == 'prazo')
+        parcela_minima = np.where(no_plano, np.maximum(parcela_minima, plano.parcela_minima), parcela_minima)
+        saldo_minimo = np.where(no_plano, np.minimum(saldo_minimo, plano.saldo_minimo), saldo_minimo)
+    return RegrasAmortizacao(
+        extras, com_prazo | ~com_plano, parcela_minima, np.where(com_plano, saldo_minimo, 0.0)
+    )
+
+
+class ResultadoRecorrencia(NamedTuple):
+    """Arrays das parcelas após a recorrência e posições afetadas."""
+    juros: np.ndarray
+    amortizacao: np.ndarray
+    prestacao: np.ndarray
+    saldo: np.ndarray
+    eventos: List[Tuple[int, float, float]]  # (posição da parcela, valor amortizado, saldo após amortização)
+    primeira_recalculada: int
+    fim: int  # posição da última parcela mantida
+
+
+def recorrencia_amortizacoes(saldo_original: np.ndarray, juros: np.ndarray, amortizacao: np.ndarray,
+                             prestacao: np.ndarray, extras: np.ndarray, tipo_reducao: Union[str, np.ndarray],
+                             taxa: float, parcela_minima: Numero = 0.0,
+                             saldo_minimo_extra: Numero = 0.0, correcao: Numero = 1.0) -> ResultadoRecorrencia:
+    """Recorrência de calcular_nova_tabela sobre arrays das parcelas, sem montar DataFrames.
+
+    Os arrays de entrada não são alterados. Na redução de prazo n' = teto(SD'/A),
+    com A a amortização da parcela da primeira amortização extra (a do contrato,
+    mantida nas seguintes), e A' = SD'/n', truncando o cronograma; na redução de
+    parcela A' = SD'/n com n igual às parcelas restantes (ou menor, se a parcela cair
+    abaixo de parcela_minima). Extras só são aplicados com saldo >= saldo_minimo_extra.
+    tipo_reducao pode ser um array (True para redução de prazo) e os limites, um valor
+    por parcela (combinar_planos). correcao é o fator mensal da correção monetária
+    (arrays_parcelas): saldo, A e A' acompanham os fatores nas parcelas recalculadas,
+    como nas já corrigidas. O laço roda no kernel compilado quando o numba está
+    instalado (kernel_amortizacao).
+    """
+    resultado = recorrencia(
+        saldo_original, juros, amortizacao, prestacao, prestacao, extras,
+        reducao_prazo(tipo_reducao), taxa, parcela_minima=parcela_minima,
+        saldo_minimo_extra=saldo_minimo_extra, correcao=correcao
+    )
+    posicoes = np.flatnonzero(resultado.extras > 0)
+    eventos = [(int(j), float(resultado.extras[j]), float(resultado.saldo_apos_extra[j])) for j in posicoes]
+    return ResultadoRecorrencia(
+        resultado.juros, resultado.amortizacao, resultado.prestacao, resultado.saldo,
+        eventos, resultado.primeira_recalculada, resultado.fim
+    )
+
+
+def reducao_prazo(tipo_reducao: Union[str, np.ndarray]) -> Union[bool, np.ndarray]:
+    """'prazo' (ou array booleano por parcela, já convertido) para o argumento do kernel."""
+    if isinstance(tipo_reducao, str):
+        return tipo_reducao == 'prazo'
+    return np.asarray(tipo_reducao, dtype=bool)
+
+
+def extras_existentes(df: pd.DataFrame, inicio: int) -> np.ndarray:
+    """Amortizações do extrato a partir da parcela da posição inicio, somadas por parcela.
+
+    O resultado fica alinhado às parcelas (zero antes de inicio): as amortizações
+    anteriores já estão nos saldos do cronograma e as seguintes são refeitas na
+    recorrência junto com as simuladas.
+    """
+    tipos = df['tipo'].to_numpy()
+    # Cada linha de amortização pertence à última parcela anterior a ela
+    posicao_parcela = np.cumsum(tipos == 'parcela') - 1
+    extras = np.zeros(int(posicao_parcela[-1]) + 1 if len(tipos) > 0 else 0)
+    linhas = (tipos == 'amortizacao') & (posicao_parcela >= max(inicio, 0))
+    np.add.at(extras, posicao_parcela[linhas], df['amortizacao'].to_numpy(dtype=np.float64)[linhas])
+    return extras
+
+
+def conferir_base(df: pd.DataFrame) -> None:
+    """Exige o cronograma sem simulações: os eventos são sempre refeitos a partir dele.
+
+    Simular sobre um cronograma já truncado por outra simulação limitaria o novo prazo
+    ao prazo truncado e o resultado passaria a depender da ordem dos eventos.
+    """
+    if (df['situacao_parcela'].to_numpy() == SITUACAO_SIMULADA).any():
+        raise ValueError("Cronograma já contém amortizações simuladas; combine os eventos "
+                         "a partir do cronograma original (simular_planos).")
+
+
+def aplicar_amortizacoes(df: pd.DataFrame, extras: np.ndarray, tipo_reducao: Union[str, np.ndarray] = 'prazo',
+                         taxa_anual: float = TAXA_JUROS_ANUAL,
+                         tarifas: Optional[TabelaTarifas] = None, parcela_minima: Numero = 0.0,
+                         saldo_minimo_extra: Numero = 0.0) -> pd.DataFrame:
+    """Aplica amortizações extras (uma por parcela, alinhadas às parcelas do cronograma) numa única passada.
+
+    A recorrência roda sobre arrays (recorrencia_amortizacoes); os seguros e tarifas
+    são recalculados depois, de uma vez, sobre os novos saldos (tabela calibrada do
+    próprio cronograma se não informada). df deve ser o cronograma sem simulações
+    (conferir_base). Amortizações do extrato a partir da primeira nova entram na
+    mesma recorrência, com as regras da sua parcela; as anteriores ficam como estão.
+    """
+    conferir_base(df)
+    taxa = taxa_mensal(taxa_anual)
+    parcelas = arrays_parcelas(df)
+    if tarifas is None:
+        tarifas = tabela_do_extrato(df)
+
+    extras = np.asarray(extras, dtype=np.float64)
+    novas = np.flatnonzero(extras > 0)
+    if len(novas) == 0:
+        return df.copy()
+    inicio = int(novas[0])
+    existentes = extras_existentes(df, inicio)
+
+    resultado = recorrencia_amortizacoes(
+        parcelas['saldo_devedor'],
+        parcelas['juros'],
+        parcelas['amortizacao'],
+        parcelas['prestacao'],
+        extras + existentes,
+        tipo_reducao,
+        taxa,
+        parcela_minima,
+        saldo_minimo_extra,
+        parcelas['correcao']
+    )
+    juros, amortizacao, _, saldo, eventos, primeira_recalculada, fim = resultado
+
+    if not eventos:
+        return df.copy()
+
+    # Linhas de amortização do extrato a partir da primeira nova são refeitas a partir
+    # dos eventos (mantendo a situação original quando não há valor simulado na parcela)
+    tipos = df['tipo'].to_numpy()
+    posicao_parcela = np.cumsum(tipos == 'parcela') - 1
+    refeitas = (tipos == 'amortizacao') & (posicao_parcela >= inicio)
+    situacoes = dict(zip(posicao_parcela[refeitas], df['situacao_parcela'].to_numpy()[refeitas]))
+    df = df[~refeitas].reset_index(drop=True)
+
+    # Parcelas mantidas e recalculadas
+    posicoes = np.flatnonzero((df['tipo'] == 'parcela').to_numpy())
+    df_novo = df.iloc[:posicoes[fim] + 1].copy()
+    recalculadas = posicoes[primeira_recalculada:fim + 1]
+    faixa = slice(primeira_recalculada, fim + 1)
+    for coluna, valores in (('juros', juros), ('amortizacao', amortizacao), ('saldo_devedor', saldo)):
+        df_novo.iloc[recalculadas, df_novo.columns.get_loc(coluna)] = valores[faixa]
+    # Seguros e tarifas sobre os novos saldos; o valor da parcela passa a incluí-los
+    aplicar_tarifas(df_novo, recalculadas, tarifas)
+
+    # Linhas de amortização extra, inseridas logo após a parcela correspondente
+    pos_eventos = np.array([e[0] for e in eventos])
+    linhas = pd.DataFrame({
+        'numero': np.nan,
+        'vencimento': parcelas['vencimento'][pos_eventos],
+        'amortizacao': [e[1] for e in eventos],
+        'juros': 0.0,
+        'seguro_mip': 0.0,
+        'seguro_dfi': 0.0,
+        'seguro_res': 0.0,
+        'tca': 0.0,
+        'valor_parcela': [e[1] for e in eventos],
+        'saldo_devedor': [e[2] for e in eventos],
+        'situacao_parcela': [SITUACAO_SIMULADA if extras[p] > 0 else situacoes.get(p, SITUACAO_SIMULADA)
+                             for p in pos_eventos],
+        'tipo': 'amortizacao',
+        'data': df_novo['data'].to_numpy()[posicoes[pos_eventos]],
+    }, columns=df_novo.columns.drop(['valor_total_pago', 'valor_total_amortizado', 'valor_total_juros'],
+                                    errors='ignore'))
+    # Colunas sem valor (número da parcela e as que só existem no cronograma) ficam de
+    # fora do concat para não interferirem nos tipos das colunas do cronograma
+    linhas = linhas.dropna(axis=1, how='all')
+    ordem = np.concatenate([np.arange(len(df_novo), dtype=np.float64), posicoes[pos_eventos] + 0.5])
+    df_novo = pd.concat([df_novo, linhas], ignore_index=True)
+    df_novo = df_novo.iloc[np.argsort(ordem, kind='stable')].reset_index(drop=True)
+
+    # Recalcular valores acumulados
+    df_novo['valor_total_pago'] = df_novo['valor_parcela'].cumsum()
+    df_novo['valor_total_amortizado'] = df_novo['amortizacao'].cumsum()
+    df_novo['valor_total_juros'] = df_novo['juros'].cumsum()
+
+    return df_novo
+
+
+def simular_planos(df: pd.DataFrame, planos: Sequence[PlanoAmortizacao],
+                   taxa_anual: float = TAXA_JUROS_ANUAL,
+                   tarifas: Optional[TabelaTarifas] = None) -> pd.DataFrame:
+    """Cronograma com todos os planos aplicados juntos, numa única recorrência sobre o cronograma base.
+
+    Refazer o cenário inteiro a partir do cronograma sem simulações torna o resultado
+    independente da ordem em que os planos foram adicionados.
+    """
+    numeros = df.loc[df['tipo'] == 'parcela', 'numero'].to_numpy()
+    regras = combinar_planos(planos, numeros)
+    return aplicar_amortizacoes(df, regras.extras, regras.reducao_prazo, taxa_anual, tarifas,
+                                regras.parcela_minima, regras.saldo_minimo)
+
+
+def simular_plano(df: pd.DataFrame, plano: PlanoAmortizacao,
+                  taxa_anual: float = TAXA_JUROS_ANUAL,
+                  tarifas: Optional[TabelaTarifas] = None) -> pd.DataFrame:
+    """Cronograma resultante de um plano de amortização recorrente."""
+    return simular_planos(df, [plano], taxa_anual, tarifas)
@@ -1,8 +1,12 @@
 import pdfplumber
 import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+
+from eventos import Parcela, Operacao
 
 def formatar_valor(valor_str: str) -> float:
     """Converte string de valor para float, tratando formato brasileiro de números."""
@@ -57,7 +61,7 @@ def limpar_valor(valor_str: str) -> str:
     valor_str = re.sub(r'[^\d.,]', '', valor_str)
     return valor_str
 
-def extrair_parcelas(texto: str) -> List[Dict[str, Any]]:
+def extrair_parcelas(texto: str) -> List[Parcela]:
     """Extrai as informações das parcelas do texto do PDF."""
     parcelas = []
     
@@ -73,27 +77,26 @@ def extrair_parcelas(texto: str) -> List[Dict[str, Any]]:
                 print(f"Partes encontradas: {partes}")
                 
                 if len(partes) >= 17:  # Ajustado para o número correto de campos
-                    parcela = {
-                        'tipo': 'parcela',
-                        'numero': int(partes[0]),
-                        'vencimento': partes[1],
-                        'amortizacao': formatar_valor(partes[2]),
-                        'juros': formatar_valor(partes[3]),
-                        'indice_correcao_parcela': formatar_valor(partes[4]),
-                        'seguro_mip': formatar_valor(partes[5]),
-                        'seguro_dfi': formatar_valor(partes[6]),
-                        'seguro_res': formatar_valor(partes[7]),
-                        'tca': formatar_valor(partes[8]),
-                        'indice_correcao_saldo': formatar_valor(partes[9]),
-                        'multa': formatar_valor(partes[10]),
-                        'mora': formatar_valor(partes[11]),
-                        'ajuste_financeiro': formatar_valor(partes[12]),
-                        'fgts_mensal': formatar_valor(partes[13]),
-                        'parcelado_acordado': formatar_valor(partes[14]),
-                        'situacao_parcela': partes[15],  # Situação da Parcela
-                        'valor_parcela': formatar_valor(partes[16]),
-                        'saldo_devedor': formatar_valor(partes[17])
-                    }
+                    parcela = Parcela(
+                        numero=int(partes[0]),
+                        vencimento=partes[1],
+                        amortizacao=formatar_valor(partes[2]),
+                        juros=formatar_valor(partes[3]),
+                        indice_correcao_parcela=formatar_valor(partes[4]),
+                        seguro_mip=formatar_valor(partes[5]),
+                        seguro_dfi=formatar_valor(partes[6]),
+                        seguro_res=formatar_valor(partes[7]),
+                        tca=formatar_valor(partes[8]),
+                        indice_correcao_saldo=formatar_valor(partes[9]),
+                        multa=formatar_valor(partes[10]),
+                        mora=formatar_valor(partes[11]),
+                        ajuste_financeiro=formatar_valor(partes[12]),
+                        fgts_mensal=formatar_valor(partes[13]),
+                        parcelado_acordado=formatar_valor(partes[14]),
+                        situacao_parcela=partes[15],  # Situação da Parcela
+                        valor_parcela=formatar_valor(partes[16]),
+                        saldo_devedor=formatar_valor(partes[17])
+                    )
                     
                     print(f"Parcela processada: {parcela}")
                     parcelas.append(parcela)
@@ -109,7 +112,7 @@ def extrair_parcelas(texto: str) -> List[Dict[str, Any]]:
     
     return parcelas
 
-def extrair_operacoes(texto: str) -> List[Dict[str, Any]]:
+def extrair_operacoes(texto: str) -> List[Operacao]:
     """Extrai as informações das operações especiais do texto do PDF."""
     operacoes = []
     
@@ -151,43 +154,209 @@ def extrair_operacoes(texto: str) -> List[Dict[str, Any]]:
             if valor_match:
                 valor_operacao = formatar_valor(valor_match.group(1))
         
-        operacao = {
-            'tipo': 'operacao',
-            'descricao': descricao,
-            'data': data,
-            'valor': valor_operacao,
-            'juros_pro_rata': juros_pro_rata,
-            'atualizacao_monetaria': atualizacao_monetaria
-        }
-        
-        # Remove valores None do dicionário
-        operacao = {k: v for k, v in operacao.items() if v is not None}
+        operacao = Operacao(
+            descricao=descricao,
+            data=data,
+            valor=valor_operacao,
+            juros_pro_rata=juros_pro_rata,
+            atualizacao_monetaria=atualizacao_monetaria
+        )
         
         operacoes.append(operacao)
     
     return operacoes
 
-def converter_pdf_para_json(caminho_pdf: str, caminho_json: str) -> None:
-    """Converte o PDF para JSON e salva o resultado."""
-    data = {"metadados": {}, "eventos": []}
+# Padrões pré-compilados do analisador de passada única
+PADRAO_LINHA_PARCELA = re.compile(r'^\s*\d+\s+\d{2}/\d{2}/\d{4}')
+PADRAO_DATA = re.compile(r'(\d{2}/\d{2}/\d{4})')
+PADRAO_CAMPOS_AMORTIZACAO = re.compile(r'(JurosPró-rata|Atualizaçãomonetária|ValordaOperação):([\d.,]+)')
+CHAVE_OPERACAO = 'Operação:'
+CAMPOS_AMORTIZACAO = {
+    'JurosPró-rata': 'juros_pro_rata',
+    'Atualizaçãomonetária': 'atualizacao_monetaria',
+    'ValordaOperação': 'valor'
+}
+
+# Metadados: (chave literal, padrão). Os padrões são os de extrair_metadados: o \s*
+# após a chave atravessa quebras de linha, então o valor pode estar na linha seguinte.
+CAMPOS_METADADOS = {
+    'cliente': ('Cliente:', r'Cliente:\s*(.*?)(?=\n)'),
+    'cpf': ('CPF:', r'CPF:\s*(\d{3}\.\d{3}\.\d{3}-\d{2})'),
+    'agencia': ('Agência:', r'Agência:\s*(\d+)'),
+    'conta': ('Conta:', r'Conta:\s*(\d+-\d+)'),
+    'valor_operacao': ('Valor da Operação:', r'Valor da Operação:\s*R\$\s*([\d.,]+)'),
+    'taxa_juros_mensal': ('Taxa de Juros Mensal:', r'Taxa de Juros Mensal:\s*([\d.,]+)'),
+    'sistema_amortizacao': ('Sistema de Amortização:', r'Sistema de Amortização:\s*(.*?)(?=\n)'),
+    'data_vencimento_final': ('Data de Vencimento Final:', r'Data de Vencimento Final:\s*(\d{2}/\d{2}/\d{4})')
+}
+CAMPOS_METADADOS_NUMERICOS = ('valor_operacao', 'taxa_juros_mensal')
+PADROES_METADADOS = {campo: (chave, re.compile(padrao)) for campo, (chave, padrao) in CAMPOS_METADADOS.items()}
+# Como em extrair_operacoes: 'Operação:' no fim da linha leva a linha seguinte, qualquer que seja
+PADRAO_OPERACAO = re.compile(re.escape(CHAVE_OPERACAO) + r'\s*(.*?)(?=\n)')
+
+def parcela_de_partes(partes: List[str]) -> Parcela:
+    """Monta a Parcela a partir dos campos de uma linha da tabela de parcelas."""
+    return Parcela(
+        numero=int(partes[0]),
+        vencimento=partes[1],
+        amortizacao=formatar_valor(partes[2]),
+        juros=formatar_valor(partes[3]),
+        indice_correcao_parcela=formatar_valor(partes[4]),
+        seguro_mip=formatar_valor(partes[5]),
+        seguro_dfi=formatar_valor(partes[6]),
+        seguro_res=formatar_valor(partes[7]),
+        tca=formatar_valor(partes[8]),
+        indice_correcao_saldo=formatar_valor(partes[9]),
+        multa=formatar_valor(partes[10]),
+        mora=formatar_valor(partes[11]),
+        ajuste_financeiro=formatar_valor(partes[12]),
+        fgts_mensal=formatar_valor(partes[13]),
+        parcelado_acordado=formatar_valor(partes[14]),
+        situacao_parcela=partes[15],
+        valor_parcela=formatar_valor(partes[16]),
+        saldo_devedor=formatar_valor(partes[17])
+    )
+
+def operacao_de_texto(linha_operacao: str) -> Operacao:
+    """Monta a Operacao a partir do texto que segue 'Operação:'."""
+    linha_operacao = linha_operacao.strip()
+    data_match = PADRAO_DATA.search(linha_operacao)
+    descricao = linha_operacao.split('Data:')[0].strip()
+    
+    campos = {}
+    if "Amortizacaoreducaodeprazorecursoproprio" in descricao:
+        # Uma única varredura; vale a primeira ocorrência de cada campo
+        for match in PADRAO_CAMPOS_AMORTIZACAO.finditer(linha_operacao):
+            campo = CAMPOS_AMORTIZACAO[match.group(1)]
+            if campo not in campos:
+                campos[campo] = formatar_valor(match.group(2))
     
+    return Operacao(
+        descricao=descricao,
+        data=data_match.group(1) if data_match else None,
+        **campos
+    )
+
+def analisar_texto(texto: str) -> Tuple[Dict[str, Any], List[Parcela], List[Operacao]]:
+    """Extrai metadados, parcelas e operações percorrendo o texto uma única vez.
+
+    Linhas que começam com número seguido de data viram parcelas. Os padrões de
+    metadados e de 'Operação:' só são aplicados a partir da linha em que a chave
+    aparece (sobre o texto inteiro, pois o valor pode continuar na linha seguinte,
+    inclusive numa linha de parcela); depois que todos os metadados são
+    encontrados, cada linha custa uma busca pela chave de operação. Equivale a
+    extrair_metadados, extrair_parcelas e extrair_operacoes aplicadas ao mesmo texto.
+    """
+    metadados = {}
+    parcelas = []
+    operacoes = []
+    
+    faltando = dict(PADROES_METADADOS)
+    fim_operacao = 0  # posição no texto onde terminou a última operação encontrada
+    inicio = 0
+    
+    for linha in texto.split('\n'):
+        inicio_linha, inicio = inicio, inicio + len(linha) + 1
+        
+        if PADRAO_LINHA_PARCELA.match(linha):
+            partes = linha.split()
+            try:
+                parcelas.append(parcela_de_partes(partes))
+            except Exception as e:
+                print(f"Linha de parcela ignorada ({len(partes)} campos): {linha}")
+                print(f"Erro detalhado: {str(e)}")
+        
+        # Primeira linha com a chave: a busca a partir dela dá a mesma ocorrência de re.search
+        for campo, (chave, padrao) in list(faltando.items()):
+            if chave in linha:
+                match = padrao.search(texto, inicio_linha)
+                if match:
+                    metadados[campo] = match.group(1)
+                del faltando[campo]
+        
+        # Operações: cada ocorrência consome o restante da linha (ou a linha seguinte)
+        if inicio_linha >= fim_operacao and CHAVE_OPERACAO in linha:
+            match = PADRAO_OPERACAO.search(texto, inicio_linha)
+            if match:
+                operacoes.append(operacao_de_texto(match.group(1)))
+                fim_operacao = match.end()
+            else:
+                fim_operacao = len(texto) + 1
+    
+    for campo in CAMPOS_METADADOS_NUMERICOS:
+        if campo in metadados:
+            metadados[campo] = formatar_valor(metadados[campo])
+    
+    return metadados, parcelas, operacoes
+
+def conferir_paridade(texto: str) -> bool:
+    """Confere se analisar_texto produz o mesmo resultado das três funções de extração."""
+    metadados, parcelas, operacoes = analisar_texto(texto)
+    return (
+        metadados == extrair_metadados(texto)
+        and parcelas == extrair_parcelas(texto)
+        and operacoes == extrair_operacoes(texto)
+    )
+
+def extrair_texto_paginas(caminho_pdf: str, intervalo: Tuple[int, int]) -> List[str]:
+    """Extrai o texto das páginas [inicio, fim) abrindo o documento no próprio processo."""
+    inicio, fim = intervalo
     with pdfplumber.open(caminho_pdf) as pdf:
-        texto_completo = ""
-        for page in pdf.pages:
-            texto_completo += page.extract_text() + "\n"
+        return [pdf.pages[i].extract_text() + "\n" for i in range(inicio, fim)]
+
+def dividir_paginas(total_paginas: int, num_partes: int) -> List[Tuple[int, int]]:
+    """Divide as páginas em intervalos contíguos de tamanho equilibrado."""
+    num_partes = max(1, min(num_partes, total_paginas))
+    tamanho, resto = divmod(total_paginas, num_partes)
+    intervalos = []
+    inicio = 0
+    for i in range(num_partes):
+        fim = inicio + tamanho + (1 if i < resto else 0)
+        intervalos.append((inicio, fim))
+        inicio = fim
+    return intervalos
+
+def extrair_texto_pdf(caminho_pdf: str, num_processos: Optional[int] = None) -> str:
+    """Extrai o texto de todas as páginas, em paralelo quando num_processos > 1.
+
+    num_processos=None usa todos os núcleos disponíveis; num_processos=1 mantém o
+    modo serial. O texto é remontado na ordem das páginas, idêntico ao serial.
+    """
+    with pdfplumber.open(caminho_pdf) as pdf:
+        total_paginas = len(pdf.pages)
+        if num_processos is None:
+            num_processos = os.cpu_count() or 1
+        if num_processos <= 1 or total_paginas <= 1:
+            texto_completo = ""
+            for page in pdf.pages:
+                texto_completo += page.extract_text() + "\n"
+            return texto_completo
+    
+    intervalos = dividir_paginas(total_paginas, num_processos)
+    try:
+        with ProcessPoolExecutor(max_workers=len(intervalos)) as executor:
+            # map preserva a ordem dos intervalos
+            partes = executor.map(extrair_texto_paginas, [caminho_pdf] * len(intervalos), intervalos)
+            return "".join(texto for paginas in partes for texto in paginas)
+    except (OSError, RuntimeError) as e:
+        print(f"Extração paralela indisponível, usando modo serial: {str(e)}")
+        return extrair_texto_pdf(caminho_pdf, num_processos=1)
+
+def converter_pdf_para_json(caminho_pdf: str, caminho_json: str, num_processos: Optional[int] = None) -> None:
+    """Converte o PDF para JSON e salva o resultado."""
+    data = {"metadados": {}, "eventos": []}
     
-    # Extrair metadados
-    data["metadados"] = extrair_metadados(texto_completo)
+    texto_completo = extrair_texto_pdf(caminho_pdf, num_processos)
     
-    # Extrair parcelas e operações
-    parcelas = extrair_parcelas(texto_completo)
-    operacoes = extrair_operacoes(texto_completo)
+    # Extrair metadados, parcelas e operações numa única passada
+    data["metadados"], parcelas, operacoes = analisar_texto(texto_completo)
     
     # Combinar e ordenar eventos
-    data["eventos"] = sorted(
+    eventos = sorted(
         parcelas + operacoes,
-        key=lambda x: datetime.strptime(x['vencimento'] if x['tipo'] == 'parcela' else x['data'], '%d/%m/%Y')
+        key=lambda x: datetime.strptime(x.data_evento, '%d/%m/%Y')
     )
+    data["eventos"] = [evento.para_dict() for evento in eventos]
     
     # Salvar como JSON
     with open(caminho_json, 'w', encoding='utf-8') as f:
@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, NamedTuple, Optional, Sequence
+
+from motor_amortizacao import (
+    TAXA_JUROS_ANUAL, taxa_mensal, arrays_parcelas, PlanoAmortizacao, combinar_planos,
+    recorrencia_amortizacoes, extras_existentes
+)
+from tarifas import TabelaTarifas, tabela_do_extrato, posicoes_tabela, tarifas_fixas
+
+SISTEMAS = ('SAC', 'PRICE')
+
+
+class OfertaPortabilidade(NamedTuple):
+    """Proposta de portabilidade ou refinanciamento do saldo devedor."""
+    nome: str
+    taxa_anual: float
+    prazo: int  # meses
+    custo_inicial: float = 0.0  # tarifas, avaliação e registro pagos na contratação
+    tarifa_mensal: float = 0.0  # seguros e tarifas mensais do novo contrato
+    sistema: str = 'SAC'  # 'SAC' ou 'PRICE'
+
+
+def fatores_desconto(taxa_desconto: float, prazos: np.ndarray) -> Dict[str, np.ndarray]:
+    """Valor presente de 1 por mês (a_n) e da sequência crescente 1, 2, ..., n (Ia_n), por prazo."""
+    prazos = np.asarray(prazos, dtype=np.float64)
+    if taxa_desconto == 0:
+        return {'anuidade': prazos, 'crescente': prazos * (prazos + 1) / 2}
+    v = 1 / (1 + taxa_desconto)
+    anuidade = (1 - v ** prazos) / taxa_desconto
+    crescente = (anuidade * (1 + taxa_desconto) - prazos * v ** prazos) / taxa_desconto
+    return {'anuidade': anuidade, 'crescente': crescente}
+
+
+def custos_ofertas(saldos: np.ndarray, taxas_anuais: np.ndarray, prazos: np.ndarray,
+                   custos_iniciais: np.ndarray, tarifas_mensais: np.ndarray, price: np.ndarray,
+                   taxa_desconto_anual: float = TAXA_JUROS_ANUAL) -> Dict[str, np.ndarray]:
+    """Total pago e valor presente de cada oferta para cada saldo, em forma fechada.
+
+    saldos tem forma (contratos,) e os parâmetros das ofertas (ofertas,); os
+    resultados têm forma (contratos, ofertas). No SAC a parcela t vale
+    A + i·(S - (t-1)·A) + tarifa, com A = S/n; na Price é constante,
+    S·i/(1 - (1+i)^-n) + tarifa. O custo inicial entra no total e no valor presente.
+    """
+    saldos = np.asarray(saldos, dtype=np.float64)[:, None]
+    taxas = taxa_mensal(np.asarray(taxas_anuais, dtype=np.float64))[None, :]
+    prazos = np.maximum(np.asarray(prazos, dtype=np.float64), 1)[None, :]
+    custos_iniciais = np.asarray(custos_iniciais, dtype=np.float64)[None, :]
+    tarifas_mensais = np.asarray(tarifas_mensais, dtype=np.float64)[None, :]
+    price = np.asarray(price, dtype=bool)[None, :]
+
+    desconto = taxa_mensal(taxa_desconto_anual)
+    fatores = fatores_desconto(desconto, prazos)
+    anuidade, crescente = fatores['anuidade'], fatores['crescente']
+
+    # SAC
+    amortizacao = saldos / prazos
+    juros_sac = taxas * saldos * (prazos + 1) / 2
+    # Σ v^t·(t-1) = Ia_n - a_n
+    vp_sac = (amortizacao + taxas * saldos) * anuidade - taxas * amortizacao * (crescente - anuidade)
+    primeira_sac = amortizacao + taxas * saldos
+
+    # Price
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prestacao_price = np.where(
+            taxas > 0, saldos * taxas / (1 - (1 + taxas) ** -prazos), saldos / prazos
+        )
+    juros_price = prestacao_price * prazos - saldos
+    vp_price = prestacao_price * anuidade
+
+    juros = np.where(price, juros_price, juros_sac)
+    return {
+        'juros': juros,
+        'total_pago': saldos + juros + tarifas_mensais * prazos + custos_iniciais,
+        'valor_presente': np.where(price, vp_price, vp_sac) + tarifas_mensais * anuidade + custos_iniciais,
+        'primeira_parcela': np.where(price, prestacao_price, primeira_sac) + tarifas_mensais,
+    }
+
+
+def recorrencia_cenario(df: pd.DataFrame, dados: Dict[str, np.ndarray], planos: Sequence[PlanoAmortizacao],
+                        taxa_anual: float = TAXA_JUROS_ANUAL):
+    """Recorrência dos planos sobre o cronograma sem simulações, com as amortizações do extrato
+    a partir do primeiro evento; None se nenhum plano amortiza."""
+    regras = combinar_planos(planos, dados['numero'])
+    primeira = np.flatnonzero(regras.extras > 0)
+    if len(primeira) == 0:
+        return None
+    extras = regras.extras + extras_existentes(df, int(primeira[0]))
+    return recorrencia_amortizacoes(
+        dados['saldo_devedor'], dados['juros'], dados['amortizacao'], dados['prestacao'],
+        extras, regras.reducao_prazo, taxa_mensal(taxa_anual), regras.parcela_minima, regras.saldo_minimo,
+        dados['correcao']
+    )
+
+
+def saldo_cenario(df: pd.DataFrame, posicao: int, taxa_anual: float = TAXA_JUROS_ANUAL,
+                  planos: Sequence[PlanoAmortizacao] = ()) -> float:
+    """Saldo devedor após a parcela da posição informada e das amortizações feitas logo após ela."""
+    dados = arrays_parcelas(df)
+    resultado = recorrencia_cenario(df, dados, planos, taxa_anual)
+    if resultado is None or posicao < resultado.primeira_recalculada - 1:
+        # Antes do primeiro evento o cronograma é o do extrato
+        return max(float(dados['saldo_devedor'][posicao]) - extras_existentes(df, posicao)[posicao], 0.0)
+    if posicao > resultado.fim:
+        return 0.0
+    apos_extra = {j: saldo for j, _, saldo in resultado.eventos}
+    return float(apos_extra.get(posicao, resultado.saldo[posicao]))
+
+
+def fluxo_contrato_atual(df: pd.DataFrame, posicao: int, valor_amortizacao: float = 0.0,
+                         tipo_reducao: str = 'prazo', taxa_anual: float = TAXA_JUROS_ANUAL,
+                         tarifas: Optional[TabelaTarifas] = None,
+                         planos: Sequence[PlanoAmortizacao] = ()) -> np.ndarray:
+    """Parcelas (com seguros e tarifas) que restam no contrato atual após a parcela da posição informada.
+
+    Com amortização, segue a mesma recorrência do simulador sobre os arrays do
+    cronograma sem simulações, sem montar DataFrame, junto com os planos já aplicados
+    no cenário e as amortizações do extrato a partir do primeiro evento.
+    """
+    dados = arrays_parcelas(df)
+    numero = dados['numero'][posicao]
+    planos = list(planos)
+    if valor_amortizacao > 0:
+        planos.append(PlanoAmortizacao(valor_amortizacao, numero, numero, tipo_reducao=tipo_reducao))
+    resultado = recorrencia_cenario(df, dados, planos, taxa_anual)
+    if resultado is None:
+        return dados['valor_parcela'][posicao + 1:]
+    if tarifas is None:
+        tarifas = tabela_do_extrato(df)
+    seguintes = slice(posicao + 1, resultado.fim + 1)
+    numeros = dados['numero'][seguintes]
+    saldo_anterior = resultado.saldo[seguintes] + resultado.amortizacao[seguintes]
+    return (
+        resultado.prestacao[seguintes]
+        + tarifas.taxa_mip[posicoes_tabela(tarifas, numeros)] * saldo_anterior
+        + tarifas_fixas(tarifas, numeros)
+    )
+
+
+def avaliar_ofertas(df: pd.DataFrame, ofertas: Sequence[OfertaPortabilidade], parcela: int,
+                    valor_amortizacao: float = 0.0, tipo_reducao: str = 'prazo',
+                    taxa_desconto_anual: float = TAXA_JUROS_ANUAL,
+                    taxa_anual: float = TAXA_JUROS_ANUAL,
+                    planos: Sequence[PlanoAmortizacao] = ()) -> pd.DataFrame:
+    """Compara o contrato atual com cada oferta a partir da parcela informada, ordenando pelo valor presente.
+
+    df é o cronograma sem simulações e planos, os eventos já aplicados no cenário.
+    O saldo após a parcela (e após a amortização informada, se houver) é portado
+    para cada oferta. A amortização é paga igualmente em todos os cenários e por
+    isso fica fora dos totais.
+    """
+    dados = arrays_parcelas(df)
+    posicao = int(np.clip(np.searchsorted(dados['numero'], parcela), 0, len(dados['numero']) - 1))
+
+    # Contrato atual: fluxo efetivo das parcelas restantes
+    fluxo = fluxo_contrato_atual(df, posicao, valor_amortizacao, tipo_reducao, taxa_anual, planos=planos)
+    # Saldo portado: o do cenário após a parcela (com as amortizações já aplicadas até ela)
+    saldo = max(saldo_cenario(df, posicao, taxa_anual, planos) - valor_amortizacao, 0.0)
+
+    desconto = taxa_mensal(taxa_desconto_anual)
+    vp_atual = float(np.sum(fluxo / (1 + desconto) ** np.arange(1, len(fluxo) + 1)))
+    atual = {
+        'oferta': 'Contrato atual',
+        'taxa_anual': taxa_anual,
+        'prazo': len(fluxo),
+        'primeira_parcela': float(fluxo[0]) if len(fluxo) > 0 else 0.0,
+        'total_pago': float(fluxo.sum()),
+        'valor_presente': vp_atual,
+    }
+
+    if len(ofertas) > 0:
+        custos = custos_ofertas(
+            np.array([saldo]),
+            [o.taxa_anual for o in ofertas],
+            [o.prazo for o in ofertas],
+            [o.custo_inicial for o in ofertas],
+            [o.tarifa_mensal for o in ofertas],
+            [o.sistema.upper() == 'PRICE' for o in ofertas],
+            taxa_desconto_anual
+        )
+        df_ofertas = pd.DataFrame({
+            'oferta': [o.nome for o in ofertas],
+            'taxa_anual': [o.taxa_anual for o in ofertas],
+            'prazo': [o.prazo for o in ofertas],
+            'primeira_parcela': custos['primeira_parcela'][0],
+            'total_pago': custos['total_pago'][0],
+            'valor_presente': custos['valor_presente'][0],
+        })
+        resultado = pd.concat([pd.DataFrame([atual]), df_ofertas], ignore_index=True)
+    else:
+        resultado = pd.DataFrame([atual])
+
+    resultado['economia_total'] = atual['total_pago'] - resultado['total_pago']
+    resultado['economia_valor_presente'] = atual['valor_presente'] - resultado['valor_presente']
+    resultado = resultado.sort_values('valor_presente', kind='stable').reset_index(drop=True)
+    resultado.insert(0, 'ranking', np.arange(1, len(resultado) + 1))
+    return resultado
+
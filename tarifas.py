@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, NamedTuple, Optional
+
+COLUNAS_TARIFAS = ('seguro_mip', 'seguro_dfi', 'seguro_res', 'tca')
+
+
+class TabelaTarifas(NamedTuple):
+    """Taxas e tarifas de cada parcela do contrato, indexadas pelo número da parcela.
+
+    O MIP é cobrado como fração do saldo devedor antes do pagamento (a fração muda
+    com a faixa etária do mutuário); DFI (sobre o valor do imóvel), seguro
+    residencial e TCA são valores mensais que não dependem do saldo.
+    """
+    numero: np.ndarray
+    taxa_mip: np.ndarray
+    seguro_dfi: np.ndarray
+    seguro_res: np.ndarray
+    tca: np.ndarray
+
+
+def saldo_anterior(df: pd.DataFrame) -> np.ndarray:
+    """Saldo devedor de cada linha antes do pagamento (saldo após + amortização)."""
+    return df['saldo_devedor'].to_numpy(dtype=np.float64) + df['amortizacao'].to_numpy(dtype=np.float64)
+
+
+def tabela_do_extrato(df: pd.DataFrame) -> TabelaTarifas:
+    """Calibra a tabela a partir das parcelas do extrato.
+
+    A taxa do MIP de cada parcela é o prêmio cobrado dividido pelo saldo anterior,
+    o que já reproduz as mudanças de faixa etária projetadas pelo banco.
+    """
+    parcelas = df[df['tipo'] == 'parcela']
+    base = saldo_anterior(parcelas)
+    mip = parcelas['seguro_mip'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taxa_mip = np.where(base > 0, mip / base, 0.0)
+    return TabelaTarifas(
+        numero=parcelas['numero'].to_numpy(dtype=np.int64),
+        taxa_mip=np.nan_to_num(taxa_mip),
+        seguro_dfi=np.nan_to_num(parcelas['seguro_dfi'].to_numpy(dtype=np.float64)),
+        seguro_res=np.nan_to_num(parcelas['seguro_res'].to_numpy(dtype=np.float64)),
+        tca=np.nan_to_num(parcelas['tca'].to_numpy(dtype=np.float64)),
+    )
+
+
+def posicoes_tabela(tabela: TabelaTarifas, numeros: np.ndarray) -> np.ndarray:
+    """Posição de cada número de parcela na tabela (limitada às parcelas existentes)."""
+    posicoes = np.searchsorted(tabela.numero, np.asarray(numeros, dtype=np.int64))
+    return np.clip(posicoes, 0, len(tabela.numero) - 1)
+
+
+def tarifas_fixas(tabela: TabelaTarifas, numeros: np.ndarray) -> np.ndarray:
+    """Soma das tarifas que não dependem do saldo (DFI, seguro residencial e TCA) por parcela."""
+    posicoes = posicoes_tabela(tabela, numeros)
+    return tabela.seguro_dfi[posicoes] + tabela.seguro_res[posicoes] + tabela.tca[posicoes]
+
+
+def calcular_tarifas(tabela: TabelaTarifas, numeros: np.ndarray, saldos_anteriores: np.ndarray) -> Dict[str, np.ndarray]:
+    """Seguros e tarifas de cada parcela a partir do saldo anterior, numa única operação vetorizada."""
+    posicoes = posicoes_tabela(tabela, numeros)
+    saldos_anteriores = np.maximum(np.asarray(saldos_anteriores, dtype=np.float64), 0.0)
+    return {
+        'seguro_mip': tabela.taxa_mip[posicoes] * saldos_anteriores,
+        'seguro_dfi': tabela.seguro_dfi[posicoes],
+        'seguro_res': tabela.seguro_res[posicoes],
+        'tca': tabela.tca[posicoes],
+    }
+
+
+def aplicar_tarifas(df: pd.DataFrame, linhas: np.ndarray, tabela: Optional[TabelaTarifas] = None) -> pd.DataFrame:
+    """Recalcula seguros e tarifas das parcelas nas linhas informadas e soma ao valor da parcela.
+
+    Altera o DataFrame recebido (que deve ser uma cópia do cronograma). Sem tabela,
+    as taxas são calibradas do próprio cronograma.
+    """
+    if tabela is None:
+        tabela = tabela_do_extrato(df)
+    linhas = np.asarray(linhas, dtype=np.int64)
+    linhas = linhas[(df['tipo'].to_numpy()[linhas] == 'parcela')]
+    if len(linhas) == 0:
+        return df
+
+    recalculadas = df.iloc[linhas]
+    tarifas = calcular_tarifas(tabela, recalculadas['numero'].to_numpy(), saldo_anterior(recalculadas))
+    for coluna in COLUNAS_TARIFAS:
+        df.iloc[linhas, df.columns.get_loc(coluna)] = tarifas[coluna]
+    df.iloc[linhas, df.columns.get_loc('valor_parcela')] = (
+        recalculadas['amortizacao'].to_numpy(dtype=np.float64)
+        + recalculadas['juros'].to_numpy(dtype=np.float64)
+        + sum(tarifas[coluna] for coluna in COLUNAS_TARIFAS)
+    )
+    return df
@@ -0,0 +1,114 @@
+import argparse
+import gc
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from typing import Dict, Iterator, List
+
+from streamlit.testing.v1 import AppTest
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_PADRAO = os.path.join(DIRETORIO, "financiamento_simulador.py")
+VALORES_REDONDOS = [1000.0, 5000.0, 10000.0, 20000.0, 50000.0]
+
+
+def memoria_residente() -> int:
+    """Memória residente atual do processo em bytes (pico, se /proc não estiver disponível)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico if sys.platform == "darwin" else pico * 1024
+
+
+def executar(app: AppTest, latencias: List[float]) -> None:
+    """Reexecuta o script registrando a latência e falhando em exceções do app."""
+    inicio = time.perf_counter()
+    app.run()
+    latencias.append(time.perf_counter() - inicio)
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+
+
+def simular_sessao(app: AppTest, interacoes: int, semente: int, latencias: List[float]) -> Iterator[None]:
+    """Percorre o Simulador como um usuário; devolve o controle após cada rerun."""
+    aleatorio = random.Random(semente)
+    executar(app, latencias)
+    yield
+    app.radio(key="visao").set_value("Simulador")
+    executar(app, latencias)
+    yield
+
+    for _ in range(interacoes):
+        app.number_input[0].set_value(aleatorio.randint(1, 60))
+        executar(app, latencias)
+        yield
+        app.number_input[1].set_value(aleatorio.choice(VALORES_REDONDOS))
+        executar(app, latencias)
+        yield
+        [b for b in app.button if b.label == "Aplicar Amortização"][0].click()
+        executar(app, latencias)
+        yield
+        if aleatorio.random() < 0.2:
+            [b for b in app.button if b.label == "Resetar Simulação"][0].click()
+            executar(app, latencias)
+            yield
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil p (0 a 1) pelo vizinho mais próximo."""
+    ordenados = sorted(valores)
+    return ordenados[min(int(round(p * (len(ordenados) - 1))), len(ordenados) - 1)]
+
+
+def teste_carga(sessoes: int, interacoes: int, script: str = SCRIPT_PADRAO, timeout: float = 120) -> Dict[str, float]:
+    """Mantém N sessões simuladas abertas ao mesmo tempo e mede memória por sessão e latência dos reruns.
+
+    O runtime de teste do Streamlit é global ao processo, então as sessões avançam
+    intercaladas, um rerun de cada vez, todas com o estado vivo simultaneamente.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+
+    # Aquecimento: carrega dependências e os recursos compartilhados do processo
+    aquecimento = AppTest.from_file(script, default_timeout=timeout)
+    aquecimento.run()
+    del aquecimento
+    gc.collect()
+    memoria_base = memoria_residente()
+
+    latencias = []
+    apps = [AppTest.from_file(script, default_timeout=timeout) for _ in range(sessoes)]
+    ativas = [simular_sessao(app, interacoes, semente, latencias) for semente, app in enumerate(apps)]
+    while ativas:
+        for sessao in list(ativas):
+            if next(sessao, StopIteration) is StopIteration:
+                ativas.remove(sessao)
+
+    gc.collect()
+    memoria_final = memoria_residente()
+
+    return {
+        "sessoes": sessoes,
+        "reruns": len(latencias),
+        "memoria_por_sessao_mb": (memoria_final - memoria_base) / sessoes / 1024 / 1024,
+        "latencia_media_ms": statistics.mean(latencias) * 1000,
+        "latencia_p50_ms": percentil(latencias, 0.50) * 1000,
+        "latencia_p95_ms": percentil(latencias, 0.95) * 1000,
+        "latencia_max_ms": max(latencias) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas do simulador")
+    parser.add_argument("--sessoes", type=int, default=10, help="Número de sessões simultâneas")
+    parser.add_argument("--interacoes", type=int, default=5, help="Amortizações aplicadas por sessão")
+    parser.add_argument("--script", default=SCRIPT_PADRAO, help="Script Streamlit a ser exercitado")
+    args = parser.parse_args()
+
+    for chave, valor in teste_carga(args.sessoes, args.interacoes, args.script).items():
+        print(f"{chave}: {valor:.2f}" if isinstance(valor, float) else f"{chave}: {valor}")
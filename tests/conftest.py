@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TAXA_MENSAL = (1 + 0.1049) ** (1 / 12) - 1
+
+
+def montar_cronograma(parcelas: int = 360, valor: float = 540000.0, pagas: int = 12) -> pd.DataFrame:
+    """Cronograma SAC no formato de criar_tabela_consolidada, com MIP sobre o saldo e tarifas fixas."""
+    amortizacao = np.full(parcelas, round(valor / parcelas, 2))
+    saldo = np.round(valor - np.cumsum(amortizacao), 2)
+    saldo[-1] = 0.0
+    saldo_anterior = saldo + amortizacao
+    juros = np.round(saldo_anterior * TAXA_MENSAL, 2)
+    seguro_mip = np.round(saldo_anterior * 0.00015, 2)
+    datas = pd.date_range('2024-11-02', periods=parcelas, freq='MS') + pd.Timedelta(days=1)
+    df = pd.DataFrame({
+        'numero': np.arange(1, parcelas + 1, dtype=np.float64),
+        'vencimento': datas.strftime('%d/%m/%Y'),
+        'amortizacao': amortizacao,
+        'juros': juros,
+        'seguro_mip': seguro_mip,
+        'seguro_dfi': 70.0,
+        'seguro_res': 39.9,
+        'tca': 25.0,
+        'valor_parcela': amortizacao + juros + seguro_mip + 70.0 + 39.9 + 25.0,
+        'saldo_devedor': saldo,
+        'situacao_parcela': np.where(np.arange(parcelas) < pagas, 'Paga', 'Projetada'),
+        'tipo': 'parcela',
+        'data': datas,
+    })
+    df['valor_total_pago'] = df['valor_parcela'].cumsum()
+    df['valor_total_amortizado'] = df['amortizacao'].cumsum()
+    df['valor_total_juros'] = df['juros'].cumsum()
+    return df
+
+
+@pytest.fixture
+def cronograma() -> pd.DataFrame:
+    return montar_cronograma()
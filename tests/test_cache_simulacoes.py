@@ -0,0 +1,19 @@
+from cache_simulacoes import CacheSimulacoes
+from motor_amortizacao import PlanoAmortizacao
+
+
+def chave(*eventos):
+    return CacheSimulacoes.chave('contrato', list(eventos))
+
+
+def test_valores_em_reais_sao_arredondados_a_centavos():
+    assert chave(('unica', 20, 10000.004, 'prazo')) == chave(('unica', 20, 10000.0, 'prazo'))
+    plano = PlanoAmortizacao(1000.001, 10, 100, parcela_minima=2500.004, saldo_minimo=0.001)
+    assert chave(('plano',) + tuple(plano)) == chave(('plano',) + tuple(PlanoAmortizacao(1000.0, 10, 100, parcela_minima=2500.0)))
+
+
+def test_taxas_e_projecoes_mantem_precisao():
+    assert chave(('plano',) + tuple(PlanoAmortizacao(1000.0, 10, 100, crescimento_anual=0.04))) != \
+        chave(('plano',) + tuple(PlanoAmortizacao(1000.0, 10, 100, crescimento_anual=0.044)))
+    assert chave(('correcao', 'TR', 0.003, 1760000000.123)) != chave(('correcao', 'TR', 0.0, 1760000000.123))
+    assert chave(('correcao', 'TR', 0.003, 1760000000.123)) != chave(('correcao', 'TR', 0.003, 1760000000.124))
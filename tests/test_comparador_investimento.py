@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from comparador_investimento import DIAS_POR_MES, aliquota_ir, comparar_antecipacao_investimento
+from motor_amortizacao import PlanoAmortizacao, simular_plano
+
+
+@pytest.mark.parametrize('tipo', ['prazo', 'valor'])
+@pytest.mark.parametrize('parcela, valor', [(20, 20000.0), (150, 80000.0)])
+def test_taxa_de_equilibrio_iguala_economia_simulada_e_rendimento(cronograma, tipo, parcela, valor):
+    resultado = comparar_antecipacao_investimento(cronograma, [0.1], [parcela], [valor], tipo)
+    equilibrio = resultado['taxa_equilibrio'][0, 0]
+
+    # Economia de juros pela simulação completa da antecipação
+    simulado = simular_plano(cronograma, PlanoAmortizacao(
+        valor, parcela, parcela, tipo_reducao='prazo' if tipo == 'prazo' else 'parcela'
+    ))
+    economia = (
+        cronograma.loc[cronograma['numero'] > parcela, 'juros'].sum()
+        - simulado.loc[(simulado['tipo'] == 'parcela') & (simulado['numero'] > parcela), 'juros'].sum()
+    )
+    # Rendimento líquido do valor aplicado à taxa de equilíbrio até o fim do prazo restante
+    restantes = int((cronograma['numero'] > parcela).sum())
+    rendimento = valor * ((1 + equilibrio) ** (restantes / 12) - 1) * (1 - aliquota_ir(restantes * DIAS_POR_MES))
+
+    assert resultado['economia_juros'][0, 0] == pytest.approx(economia, abs=0.05 * restantes)
+    assert rendimento == pytest.approx(economia, abs=0.05 * restantes)
+
+
+def test_vantagem_de_investir_troca_de_sinal_no_equilibrio(cronograma):
+    equilibrio = comparar_antecipacao_investimento(cronograma, [0.0], [60], [30000.0])['taxa_equilibrio'][0, 0]
+    taxas = [equilibrio - 0.01, equilibrio, equilibrio + 0.01]
+    vantagem = comparar_antecipacao_investimento(cronograma, taxas, [60], [30000.0])['vantagem_investir'][:, 0, 0]
+
+    assert vantagem[0] < 0 < vantagem[2]
+    assert vantagem[1] == pytest.approx(0.0, abs=1e-6)
+    # Valores acima do saldo ficam fora da grade
+    acima = comparar_antecipacao_investimento(cronograma, taxas, [60], [1e7])
+    assert np.isnan(acima['vantagem_investir']).all() and np.isnan(acima['taxa_equilibrio']).all()
@@ -0,0 +1,108 @@
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from exportacao import colunas_tabela, escrever_csv, escrever_xlsx
+
+NS = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+COLUNAS = ['numero', 'data', 'valor_parcela', 'saldo_devedor', 'fator_correcao', 'situacao_parcela']
+
+
+@pytest.fixture
+def tabela(cronograma):
+    df = cronograma.head(40).copy()
+    df['fator_correcao'] = np.cumprod(np.full(len(df), 1.0017))
+    df.loc[3, 'valor_parcela'] = np.nan
+    return df[COLUNAS]
+
+
+def ler_csv(df, formato):
+    # Blocos menores que a tabela para atravessar as fronteiras entre blocos
+    destino = io.StringIO()
+    fontes = [({'cenario': nome}, colunas_tabela(df)) for nome in ('Original', 'Simulado')]
+    linhas = escrever_csv(destino, fontes, formato, tamanho_bloco=7)
+    assert linhas == 2 * len(df)
+    destino.seek(0)
+    if formato == 'br':
+        return pd.read_csv(destino, sep=';', decimal=',', thousands='.', float_precision='round_trip')
+    return pd.read_csv(destino, float_precision='round_trip')
+
+
+def test_csv_bruto_em_blocos_reproduz_a_tabela(tabela):
+    lido = ler_csv(tabela, 'bruto')
+
+    assert list(lido.columns) == ['cenario'] + COLUNAS
+    assert list(lido['cenario']) == ['Original'] * len(tabela) + ['Simulado'] * len(tabela)
+    for _, parte in lido.groupby('cenario'):
+        parte = parte.reset_index(drop=True)
+        assert (pd.to_datetime(parte['data']) == tabela['data'].reset_index(drop=True)).all()
+        assert list(parte['situacao_parcela']) == list(tabela['situacao_parcela'])
+        for coluna in ['numero', 'valor_parcela', 'saldo_devedor', 'fator_correcao']:
+            # repr dos floats: ida e volta exata
+            np.testing.assert_array_equal(parte[coluna].to_numpy(), tabela[coluna].to_numpy())
+
+
+def test_csv_brasileiro_arredonda_valores_e_preserva_indices(tabela):
+    lido = ler_csv(tabela, 'br')
+    parte = lido[lido['cenario'] == 'Simulado'].reset_index(drop=True)
+
+    assert (pd.to_datetime(parte['data'], format='%d/%m/%Y') == tabela['data'].reset_index(drop=True)).all()
+    np.testing.assert_array_equal(parte['numero'].to_numpy(), tabela['numero'].to_numpy())
+    np.testing.assert_array_equal(parte['saldo_devedor'].to_numpy(), tabela['saldo_devedor'].round(2).to_numpy())
+    np.testing.assert_array_equal(parte['valor_parcela'].to_numpy(), tabela['valor_parcela'].round(2).to_numpy())
+    # Fatores de correção sem arredondar a centavos
+    np.testing.assert_array_equal(parte['fator_correcao'].to_numpy(), tabela['fator_correcao'].to_numpy())
+
+
+def ler_xlsx(dados):
+    """Células da primeira planilha ({referência: (valor, formato numérico)}), sem depender de leitor de XLSX."""
+    with zipfile.ZipFile(io.BytesIO(dados)) as arquivo:
+        planilha = ET.fromstring(arquivo.read('xl/worksheets/sheet1.xml'))
+        estilos = ET.fromstring(arquivo.read('xl/styles.xml'))
+    codigos = {f.get('numFmtId'): f.get('formatCode') for f in estilos.iterfind('x:numFmts/x:numFmt', NS)}
+    codigos['0'] = 'General'
+    formatos = [codigos.get(xf.get('numFmtId'), xf.get('numFmtId')) for xf in estilos.iterfind('x:cellXfs/x:xf', NS)]
+    celulas = {}
+    for celula in planilha.iterfind('.//x:c', NS):
+        valor = celula.find('x:v', NS)
+        texto = celula.find('x:is/x:t', NS)
+        conteudo = texto.text if texto is not None else float(valor.text)
+        celulas[celula.get('r')] = (conteudo, formatos[int(celula.get('s', 0))])
+    return celulas
+
+
+def coluna_xlsx(celulas, letra, linhas):
+    return [celulas.get(f"{letra}{i}") for i in range(2, linhas + 2)]
+
+
+@pytest.mark.parametrize('formato', ['bruto', 'br'])
+def test_xlsx_em_blocos_reproduz_a_tabela(tabela, formato):
+    pytest.importorskip('xlsxwriter')
+    destino = io.BytesIO()
+    assert escrever_xlsx(destino, [({}, colunas_tabela(tabela))], formato, tamanho_bloco=7) == len(tabela)
+    celulas = ler_xlsx(destino.getvalue())
+    letras = {coluna: chr(ord('A') + i) for i, coluna in enumerate(COLUNAS)}
+
+    assert [celulas[f"{letra}1"][0] for letra in letras.values()] == COLUNAS
+    assert [c[0] for c in coluna_xlsx(celulas, letras['situacao_parcela'], len(tabela))] == list(tabela['situacao_parcela'])
+    for coluna in ['numero', 'valor_parcela', 'saldo_devedor', 'fator_correcao']:
+        valores = [np.nan if c is None else c[0] for c in coluna_xlsx(celulas, letras[coluna], len(tabela))]
+        # Valores gravados sem arredondamento (16 algarismos significativos no XLSX); o formato só muda a exibição
+        np.testing.assert_allclose(valores, tabela[coluna].to_numpy(), rtol=1e-15)
+
+    formato_de = lambda coluna: {c[1] for c in coluna_xlsx(celulas, letras[coluna], len(tabela)) if c is not None}
+    assert formato_de('numero') == {'General'}
+    if formato == 'br':
+        assert formato_de('valor_parcela') == {'#,##0.00'}
+        assert formato_de('fator_correcao') == {'0.000000'}
+        assert formato_de('data') == {'dd/mm/yyyy'}
+    else:
+        assert formato_de('valor_parcela') == formato_de('fator_correcao') == {'General'}
+        assert formato_de('data') == {'yyyy-mm-dd'}
+    # Datas como número de série do Excel
+    serie = (tabela['data'] - pd.Timestamp('1899-12-30')).dt.days.to_numpy()
+    np.testing.assert_array_equal([c[0] for c in coluna_xlsx(celulas, letras['data'], len(tabela))], serie)
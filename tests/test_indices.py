@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from indices import BaseIndices, aplicar_correcao
+from motor_amortizacao import PlanoAmortizacao, simular_plano
+
+
+def parcelas(df):
+    return df[df['tipo'] == 'parcela'].reset_index(drop=True)
+
+
+@pytest.fixture
+def corrigido(cronograma, tmp_path):
+    base = BaseIndices(str(tmp_path))
+    # 0,4% ao mês desde a primeira parcela, projetado além do fim da série
+    base.gravar('TR', cronograma['data'].iloc[0], np.full(24, 1.004))
+    return aplicar_correcao(cronograma, base, 'TR', None, 0.004)
+
+
+def test_correcao_se_mantem_apos_amortizacao(corrigido):
+    simulado = simular_plano(corrigido, PlanoAmortizacao(1000.0, 30, 30))
+    antes, depois = parcelas(corrigido), parcelas(simulado)
+
+    # R$ 1.000 não mudam o prazo (teto de SD'/A): o cronograma corrigido é só
+    # reescalado por SD'/SD nas parcelas seguintes, com os mesmos fatores
+    saldo = antes['saldo_devedor'].iloc[29]
+    escala = (saldo - 1000.0) / saldo
+    seguintes = slice(30, len(antes))
+    assert len(depois) == len(antes)
+    for coluna in ('saldo_devedor', 'amortizacao'):
+        np.testing.assert_allclose(depois[coluna].iloc[seguintes], antes[coluna].iloc[seguintes] * escala, rtol=1e-9, atol=1e-6)
+    # Juros do cronograma base vêm arredondados a centavos (antes da correção)
+    np.testing.assert_allclose(depois['juros'].iloc[seguintes], antes['juros'].iloc[seguintes] * escala, atol=0.05)
+    # A amortização continua acompanhando o índice
+    np.testing.assert_allclose(depois['amortizacao'].iloc[31:100].to_numpy() / depois['amortizacao'].iloc[30:99].to_numpy(), 1.004)
+
+
+def test_amortizacao_com_reducao_de_prazo_segue_corrigida(corrigido):
+    simulado = simular_plano(corrigido, PlanoAmortizacao(50000.0, 30, 30))
+    depois = parcelas(simulado)
+
+    # A referência da redução de prazo é a amortização corrigida da parcela 30
+    referencia = parcelas(corrigido)['amortizacao'].iloc[29]
+    assert depois['amortizacao'].iloc[30] <= referencia * 1.004 + 1e-9
+    assert abs(depois['saldo_devedor'].iloc[-1]) < 1e-6
+    assert simulado['juros'].sum() < corrigido['juros'].sum()
+    assert (depois['fator_correcao'] == parcelas(corrigido)['fator_correcao'].iloc[:len(depois)]).all()
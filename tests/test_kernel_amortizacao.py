@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from kernel_amortizacao import cenarios_aleatorios, conferir_modos, recorrencia, recorrencia_lote
+
+
+def test_kernel_compilado_coincide_com_laco_em_python():
+    pytest.importorskip('numba')
+    assert conferir_modos(cenarios=200) == {'prazo': 0.0, 'parcela': 0.0}
+
+
+@pytest.mark.parametrize('reducao_prazo', [True, False])
+def test_lote_coincide_com_cenario_unico(reducao_prazo):
+    contrato, parametros = cenarios_aleatorios(20, semente=1)
+    argumentos = [contrato[c] for c in ('saldo_original', 'juros', 'amortizacao', 'prestacao', 'valor_parcela')]
+    lote = recorrencia_lote(*argumentos, parametros['extras'], reducao_prazo, contrato['taxa'],
+                            contrato['taxa_mip'], contrato['fixas'], parametros['parcelas_minimas'],
+                            parametros['saldos_minimos_extra'], contrato['correcao'], jit=False)
+    for k in range(len(parametros['extras'])):
+        unico = recorrencia(*argumentos, parametros['extras'][k], reducao_prazo, contrato['taxa'],
+                            contrato['taxa_mip'], contrato['fixas'], parametros['parcelas_minimas'][k],
+                            parametros['saldos_minimos_extra'][k], contrato['correcao'], jit=False)
+        assert unico.fim == lote.fim[k]
+        for a, b in zip(unico[:7], lote[:7]):
+            np.testing.assert_array_equal(a, b[k])
@@ -0,0 +1,73 @@
+import ast
+import os
+
+import pytest
+
+from meta_amortizacao import PONTOS_GRADE, resolver_meta
+from motor_amortizacao import PlanoAmortizacao, simular_plano
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'financiamento_simulador.py')
+
+
+def funcao_do_app(nome):
+    """Função do app com os imports e constantes do módulo, sem executar o script
+    (importar o app montaria a interface e carregaria o contrato)."""
+    with open(APP, 'r', encoding='utf-8') as f:
+        arvore = ast.parse(f.read())
+    nos = [
+        no for no in arvore.body
+        if isinstance(no, (ast.Import, ast.ImportFrom))
+        or (isinstance(no, ast.Assign) and all(isinstance(alvo, ast.Name) and alvo.id.isupper() for alvo in no.targets))
+        or (isinstance(no, ast.FunctionDef) and no.name == nome)
+    ]
+    namespace = {}
+    exec(compile(ast.Module(nos, type_ignores=[]), APP, 'exec'), namespace)
+    return namespace[nome]
+
+
+def metricas(df, parcela_final):
+    """Última parcela e maior parcela após a parcela final, medidas no cronograma simulado."""
+    parcelas = df[df['tipo'] == 'parcela']
+    seguintes = parcelas.loc[parcelas['numero'] > parcela_final, 'valor_parcela']
+    return int(parcelas['numero'].max()), float(seguintes.max()) if len(seguintes) > 0 else 0.0
+
+
+def atinge(df, meta, alvo, parcela_final):
+    ultima, maior = metricas(df, parcela_final)
+    return ultima <= alvo if meta == 'quitacao' else maior <= alvo + 1e-9
+
+
+@pytest.mark.parametrize('tipo, meta, alvo', [
+    ('prazo', 'quitacao', 250),
+    ('prazo', 'parcela', 4000.0),
+    ('valor', 'parcela', 4000.0),
+])
+def test_valor_da_meta_unica_confere_com_calcular_nova_tabela(cronograma, tipo, meta, alvo):
+    calcular_nova_tabela = funcao_do_app('calcular_nova_tabela')
+    plano = PlanoAmortizacao(0.0, 20, 20, tipo_reducao='prazo' if tipo == 'prazo' else 'parcela')
+    resultado = resolver_meta(cronograma, plano, meta, alvo)
+
+    assert resultado.valor > 1
+    assert resultado.avaliacoes > PONTOS_GRADE  # refinamento de grade da forma fechada
+    df = calcular_nova_tabela(cronograma, 20, resultado.valor, tipo)
+    assert atinge(df, meta, alvo, 20)
+    assert metricas(df, 20) == (resultado.ultima_parcela, pytest.approx(resultado.maior_parcela))
+    assert not atinge(calcular_nova_tabela(cronograma, 20, resultado.valor - 1, tipo), meta, alvo, 20)
+
+
+@pytest.mark.parametrize('plano, meta, alvo', [
+    (PlanoAmortizacao(0.0, 20, 200, frequencia=6, tipo_reducao='parcela', parcela_minima=2500.0, saldo_minimo=100000.0),
+     'parcela', 3000.0),
+    (PlanoAmortizacao(0.0, 20, 200, frequencia=6, tipo_reducao='prazo', saldo_minimo=100000.0), 'quitacao', 200),
+    # Amortização única com saldo mínimo também vai para a bisseção
+    (PlanoAmortizacao(0.0, 20, 20, tipo_reducao='prazo', saldo_minimo=500000.0), 'quitacao', 250),
+])
+def test_bissecao_com_parcela_minima_e_saldo_minimo(cronograma, plano, meta, alvo):
+    resultado = resolver_meta(cronograma, plano, meta, alvo)
+
+    assert resultado.valor > 1
+    assert resultado.avaliacoes < PONTOS_GRADE  # bisseção, não a grade da forma fechada
+    df = simular_plano(cronograma, plano._replace(valor=resultado.valor))
+    assert atinge(df, meta, alvo, plano.parcela_final)
+    assert metricas(df, plano.parcela_final) == (resultado.ultima_parcela, pytest.approx(resultado.maior_parcela))
+    assert not atinge(simular_plano(cronograma, plano._replace(valor=resultado.valor - 1)), meta, alvo, plano.parcela_final)
@@ -0,0 +1,114 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from motor_amortizacao import (
+    PlanoAmortizacao, SITUACAO_SIMULADA, aplicar_amortizacoes, simular_plano, simular_planos, sensibilidade_juros
+)
+
+
+def ultima_parcela(df):
+    return int(df.loc[df['tipo'] == 'parcela', 'numero'].max())
+
+
+def parcelas(df):
+    return df[df['tipo'] == 'parcela'].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('tipo_reducao', ['prazo', 'parcela'])
+@pytest.mark.parametrize('inicial, final', [(10, 130), (100, 100)])
+def test_plano_com_valor_infimo_reproduz_cronograma(cronograma, tipo_reducao, inicial, final):
+    plano = PlanoAmortizacao(0.01, inicial, final, tipo_reducao=tipo_reducao)
+    simulado = simular_plano(cronograma, plano)
+
+    assert ultima_parcela(simulado) == ultima_parcela(cronograma)
+    original, novo = parcelas(cronograma), parcelas(simulado)
+    for coluna in ('amortizacao', 'juros', 'saldo_devedor', 'valor_parcela'):
+        np.testing.assert_allclose(novo[coluna], original[coluna], atol=1.5)
+    assert simulado['juros'].sum() == pytest.approx(cronograma['juros'].sum(), abs=5.0)
+
+
+def test_amortizacoes_pequenas_acumulam_reducao_de_prazo(cronograma):
+    # 80 amortizações de R$ 1.000 com amortização mensal de R$ 1.500: 80.000 / 1.500 = 53,3 parcelas
+    simulado = simular_plano(cronograma, PlanoAmortizacao(1000.0, 20, 99))
+    assert ultima_parcela(simulado) == ultima_parcela(cronograma) - 53
+
+
+def test_amortizacao_unica_reduz_prazo_pelo_valor_antecipado(cronograma):
+    # R$ 15.000 / R$ 1.500 = 10 parcelas
+    simulado = simular_plano(cronograma, PlanoAmortizacao(15000.0, 50, 50))
+    assert ultima_parcela(simulado) == ultima_parcela(cronograma) - 10
+    assert parcelas(simulado)['amortizacao'].iloc[50:].max() <= 1500.0 + 1e-9
+
+
+def test_economia_marginal_confere_com_diferenca_finita(cronograma):
+    sensibilidade = sensibilidade_juros(cronograma, 'prazo', valor_amortizacao=1500.0)
+    # Antecipar uma amortização inteira remove uma parcela: a média i·n fica perto da
+    # derivada i·(n + 1/2) enquanto restam muitas parcelas
+    futuras = sensibilidade.iloc[:300]
+    np.testing.assert_allclose(futuras['economia_media'], futuras['economia_marginal'], rtol=0.02)
+
+
+def linha_do_extrato(df, posicao, valor):
+    """Cronograma com uma amortização do extrato logo após a parcela da posição informada."""
+    parcela = df.iloc[posicao]
+    linha = parcela.copy()
+    linha[['numero', 'juros', 'seguro_mip', 'seguro_dfi', 'seguro_res', 'tca']] = [np.nan, 0.0, 0.0, 0.0, 0.0, 0.0]
+    linha[['amortizacao', 'valor_parcela']] = valor
+    linha['saldo_devedor'] = parcela['saldo_devedor'] - valor
+    linha[['situacao_parcela', 'tipo']] = ['Amortizado', 'amortizacao']
+    return pd.concat([df.iloc[:posicao + 1], pd.DataFrame([linha]), df.iloc[posicao + 1:]], ignore_index=True)
+
+
+@pytest.mark.parametrize('tipo_reducao', ['prazo', 'parcela'])
+def test_planos_combinados_equivalem_ao_vetor_conjunto(cronograma, tipo_reducao):
+    extras = np.zeros(len(cronograma))
+    extras[[49, 99]] = 50000.0
+    conjunto = aplicar_amortizacoes(cronograma, extras, tipo_reducao)
+
+    anterior = PlanoAmortizacao(50000.0, 50, 50, tipo_reducao=tipo_reducao)
+    posterior = PlanoAmortizacao(50000.0, 100, 100, tipo_reducao=tipo_reducao)
+    for planos in ([anterior, posterior], [posterior, anterior]):
+        simulado = simular_planos(cronograma, planos)
+        assert ultima_parcela(simulado) == ultima_parcela(conjunto)
+        assert (simulado['tipo'] == 'amortizacao').sum() == 2
+        np.testing.assert_allclose(parcelas(simulado)['saldo_devedor'], parcelas(conjunto)['saldo_devedor'], atol=1e-6)
+        assert simulado['juros'].sum() == pytest.approx(conjunto['juros'].sum())
+
+
+def test_resultado_independe_da_ordem_dos_eventos(cronograma):
+    # Amortizações pequenas em parcelas próximas, com regras diferentes: aplicadas uma
+    # sobre a outra, a ordem mudava o prazo e a amortização mensal
+    eventos = [
+        PlanoAmortizacao(1000.0, 30, 30),
+        PlanoAmortizacao(1000.0, 20, 20, tipo_reducao='parcela'),
+        PlanoAmortizacao(500.0, 10, 130, frequencia=12),
+    ]
+    resultados = [simular_planos(cronograma, ordem) for ordem in itertools.permutations(eventos)]
+
+    referencia = resultados[0]
+    for simulado in resultados[1:]:
+        assert ultima_parcela(simulado) == ultima_parcela(referencia)
+        np.testing.assert_array_equal(parcelas(simulado)['amortizacao'], parcelas(referencia)['amortizacao'])
+        assert simulado['juros'].sum() == referencia['juros'].sum()
+    # A redução de prazo nunca eleva a amortização acima da do contrato
+    assert parcelas(referencia)['amortizacao'].max() <= 1500.0 + 1e-9
+
+
+def test_simulacao_sobre_cronograma_simulado_e_recusada(cronograma):
+    simulado = simular_plano(cronograma, PlanoAmortizacao(15000.0, 50, 50))
+    with pytest.raises(ValueError):
+        simular_plano(simulado, PlanoAmortizacao(15000.0, 20, 20))
+
+
+def test_amortizacao_do_extrato_posterior_entra_na_recorrencia(cronograma):
+    com_extrato = linha_do_extrato(cronograma, 80, 30000.0)
+    simulado = simular_plano(com_extrato, PlanoAmortizacao(15000.0, 50, 50))
+
+    # 45.000 / 1.500 = 30 parcelas, e a linha do extrato mantém a situação original
+    assert ultima_parcela(simulado) == ultima_parcela(cronograma) - 30
+    extras = simulado[simulado['tipo'] == 'amortizacao']
+    assert extras['situacao_parcela'].tolist() == [SITUACAO_SIMULADA, 'Amortizado']
+    assert (np.diff(parcelas(simulado)['saldo_devedor']) < 0).all()
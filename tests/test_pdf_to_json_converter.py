@@ -0,0 +1,128 @@
+import pytest
+
+from pdf_to_json_converter import (
+    analisar_texto, conferir_paridade, dividir_paginas, extrair_metadados, extrair_operacoes, extrair_parcelas
+)
+
+PARCELA = '{} {} 1.500,00 4.200,35 0,00 81,00 70,00 39,90 25,00 0,00 0,00 0,00 0,00 0,00 0,00 Paga 5.916,25 {}'
+
+EXTRATO = '\n'.join([
+    'EXTRATO DE FINANCIAMENTO HABITACIONAL',
+    'Cliente: FULANO DE TAL',
+    'CPF: 123.456.789-00 Agência: 1234 Conta: 56789-0',
+    'Valor da Operação: R$ 540.000,00',
+    'Taxa de Juros Mensal:',
+    '0,8355',
+    'Sistema de Amortização:',
+    'SAC',
+    'Data de Vencimento Final: 02/10/2054',
+    'Operação: Implantacaodecontrato Data: 02/10/2024',
+    PARCELA.format(1, '02/11/2024', '538.500,00'),
+    PARCELA.format(2, '02/12/2024', '537.000,00'),
+    '3 02/01/2025 1.500,00 4.187,83 Paga',
+    'Operação: Amortizacaoreducaodeprazorecursoproprio Data: 15/01/2025 JurosPró-rata:12,34 '
+    'Atualizaçãomonetária:0,00 ValordaOperação:17.000,00',
+    'Operação: Seguro Data: 20/01/2025 Operação: Tarifa Data: 20/01/2025',
+    'Operação:',
+    PARCELA.format(4, '02/02/2025', '518.500,00'),
+    PARCELA.format(5, '02/03/2025', '517.000,00'),
+    '',
+]) + '\n'
+
+
+def test_analisar_texto_reproduz_extratores_originais():
+    metadados, parcelas, operacoes = analisar_texto(EXTRATO)
+
+    assert metadados == extrair_metadados(EXTRATO)
+    assert parcelas == extrair_parcelas(EXTRATO)
+    assert operacoes == extrair_operacoes(EXTRATO)
+    assert conferir_paridade(EXTRATO)
+
+
+def test_campos_do_extrato_representativo():
+    metadados, parcelas, operacoes = analisar_texto(EXTRATO)
+
+    # Valor na linha seguinte à chave
+    assert metadados['taxa_juros_mensal'] == pytest.approx(0.8355)
+    assert metadados['sistema_amortizacao'] == 'SAC'
+    # Linha de parcela curta é ignorada
+    assert [p.numero for p in parcelas] == [1, 2, 4, 5]
+    # 'Valor da Operação:' também contém a chave de operação, como nos extratores originais
+    assert operacoes[0].descricao == 'R$ 540.000,00'
+    amortizacao = operacoes[2]
+    assert (amortizacao.valor, amortizacao.juros_pro_rata) == (17000.0, 12.34)
+    # Duas operações na mesma linha: a primeira consome o restante da linha
+    assert operacoes[3].descricao == 'Seguro'
+    # 'Operação:' no fim da linha leva a linha seguinte, mesmo sendo de parcela,
+    # que também continua registrada como parcela
+    assert operacoes[4].descricao.startswith('4 02/02/2025')
+    assert len(operacoes) == 5
+
+
+@pytest.mark.parametrize('texto', [
+    'Cliente:\n\nFULANO\n',
+    'Valor da Operação: R$\n1.000,00\n',
+    'Operação:   \n',
+    'Operação: Seguro Data: 01/01/2025',
+    'Cliente: FULANO',
+])
+def test_paridade_nos_limites_de_linha(texto):
+    assert conferir_paridade(texto)
+
+
+@pytest.mark.parametrize('total_paginas', [0, 1, 2, 7, 30])
+@pytest.mark.parametrize('num_partes', [1, 2, 3, 8, 64])
+def test_dividir_paginas_cobre_todas_as_paginas_em_ordem(total_paginas, num_partes):
+    intervalos = dividir_paginas(total_paginas, num_partes)
+
+    assert len(intervalos) == max(1, min(num_partes, total_paginas))
+    assert intervalos[0][0] == 0 and intervalos[-1][1] == total_paginas
+    # Contíguos: cada intervalo começa onde o anterior termina
+    assert all(fim == inicio for (_, fim), (inicio, _) in zip(intervalos, intervalos[1:]))
+    tamanhos = [fim - inicio for inicio, fim in intervalos]
+    assert max(tamanhos) - min(tamanhos) <= 1
+    assert total_paginas == 0 or min(tamanhos) >= 1
+
+
+def gerar_pdf(caminho, paginas):
+    """PDF mínimo com uma linha de texto por item de cada página (Helvetica, sem dependências)."""
+    objetos = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>']
+    filhos = []
+    for linhas in paginas:
+        texto = ' '.join(
+            f"({linha.replace(chr(92), chr(92) * 2).replace('(', chr(92) + '(').replace(')', chr(92) + ')')}) Tj T*"
+            for linha in linhas
+        )
+        conteudo = f"BT /F1 8 Tf 10 TL 20 800 Td {texto} ET"
+        objetos.append(f"<< /Length {len(conteudo.encode('latin-1'))} >>\nstream\n{conteudo}\nendstream")
+        objetos.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objetos)} 0 R >>")
+        filhos.append(f"{len(objetos)} 0 R")
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(filhos)}] /Count {len(filhos)} >>"
+
+    dados = b'%PDF-1.4\n'
+    posicoes = []
+    for i, objeto in enumerate(objetos, start=1):
+        posicoes.append(len(dados))
+        dados += f"{i} 0 obj\n{objeto}\nendobj\n".encode('latin-1')
+    inicio_xref = len(dados)
+    dados += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    dados += ''.join(f"{posicao:010d} 00000 n \n" for posicao in posicoes).encode('latin-1')
+    dados += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode('latin-1')
+    with open(caminho, 'wb') as f:
+        f.write(dados)
+
+
+def test_extracao_paralela_igual_a_serial(tmp_path):
+    pytest.importorskip('pdfplumber')
+    from pdf_to_json_converter import extrair_texto_pdf
+
+    linhas = [linha for linha in EXTRATO.splitlines() if linha]
+    paginas = [linhas[i:i + 4] for i in range(0, len(linhas), 4)]
+    caminho = str(tmp_path / 'extrato.pdf')
+    gerar_pdf(caminho, paginas)
+
+    serial = extrair_texto_pdf(caminho, num_processos=1)
+    assert [linha for linha in serial.splitlines() if linha] == linhas
+    for num_processos in (2, 3, 8):
+        assert extrair_texto_pdf(caminho, num_processos=num_processos) == serial
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from motor_amortizacao import taxa_mensal
+from portabilidade import OfertaPortabilidade, avaliar_ofertas, custos_ofertas
+
+
+def cronograma_direto(saldo, taxa_anual, prazo, tarifa, price, taxa_desconto_anual):
+    """Parcelas do novo contrato mês a mês, como referência para as formas fechadas."""
+    i = taxa_mensal(taxa_anual)
+    v = 1 / (1 + taxa_mensal(taxa_desconto_anual))
+    prestacao = saldo / prazo if i == 0 else saldo * i / (1 - (1 + i) ** -prazo)
+    amortizacao_sac = saldo / prazo
+    parcelas = []
+    juros = 0.0
+    for _ in range(prazo):
+        juros_mes = saldo * i
+        amortizacao = prestacao - juros_mes if price else amortizacao_sac
+        parcelas.append(amortizacao + juros_mes + tarifa)
+        juros += juros_mes
+        saldo -= amortizacao
+    assert saldo == pytest.approx(0.0, abs=1e-6)
+    parcelas = np.array(parcelas)
+    return {
+        'juros': juros,
+        'total_pago': parcelas.sum(),
+        'valor_presente': float(np.sum(parcelas * v ** np.arange(1, prazo + 1))),
+        'primeira_parcela': parcelas[0],
+    }
+
+
+@pytest.mark.parametrize('taxa_desconto_anual', [0.0, 0.1])
+def test_custos_ofertas_conferem_com_cronograma_direto(taxa_desconto_anual):
+    saldos = np.array([250000.0, 812315.84])
+    ofertas = [
+        # (taxa anual, prazo, custo inicial, tarifa mensal, Price)
+        (0.0949, 300, 4000.0, 150.0, False),
+        (0.0899, 360, 6000.0, 150.0, True),
+        (0.0, 120, 0.0, 25.0, False),
+        (0.0, 120, 1000.0, 0.0, True),
+        (0.12, 1, 0.0, 0.0, True),
+    ]
+    taxas, prazos, custos, tarifas, price = map(np.array, zip(*ofertas))
+    resultado = custos_ofertas(saldos, taxas, prazos, custos, tarifas, price, taxa_desconto_anual)
+
+    for c, saldo in enumerate(saldos):
+        for o, (taxa, prazo, custo, tarifa, e_price) in enumerate(ofertas):
+            direto = cronograma_direto(saldo, taxa, prazo, tarifa, e_price, taxa_desconto_anual)
+            assert resultado['juros'][c, o] == pytest.approx(direto['juros'], rel=1e-9, abs=1e-6)
+            assert resultado['total_pago'][c, o] == pytest.approx(direto['total_pago'] + custo, rel=1e-9)
+            assert resultado['valor_presente'][c, o] == pytest.approx(direto['valor_presente'] + custo, rel=1e-9)
+            assert resultado['primeira_parcela'][c, o] == pytest.approx(direto['primeira_parcela'], rel=1e-9)
+
+
+def test_avaliar_ofertas_sem_ofertas(cronograma):
+    resultado = avaliar_ofertas(cronograma, [], parcela=20, taxa_desconto_anual=0.1)
+
+    assert list(resultado['oferta']) == ['Contrato atual']
+    assert resultado['ranking'].tolist() == [1]
+    assert resultado['economia_total'].tolist() == [0.0]
+    assert resultado['economia_valor_presente'].tolist() == [0.0]
+    restantes = cronograma.loc[cronograma['numero'] > 20, 'valor_parcela']
+    assert resultado['prazo'].iloc[0] == len(restantes)
+    assert resultado['total_pago'].iloc[0] == pytest.approx(restantes.sum())
+
+
+def test_contrato_atual_e_ofertas_usam_o_mesmo_saldo(cronograma):
+    # Oferta com as condições do próprio contrato (SAC, mesma taxa e prazo restante), sem seguros e tarifas
+    restantes = cronograma[cronograma['numero'] > 20]
+    oferta = OfertaPortabilidade('Igual', 0.1049, len(restantes), sistema='SAC')
+    resultado = avaliar_ofertas(cronograma, [oferta], parcela=20, taxa_anual=0.1049).set_index('oferta')
+
+    juros_atuais = restantes['juros'].sum()
+    tarifas = restantes[['seguro_mip', 'seguro_dfi', 'seguro_res', 'tca']].to_numpy().sum()
+    assert resultado.loc['Igual', 'total_pago'] == pytest.approx(
+        resultado.loc['Contrato atual', 'total_pago'] - tarifas, rel=1e-4
+    )
+    assert resultado.loc['Igual', 'total_pago'] - restantes['amortizacao'].sum() == pytest.approx(juros_atuais, rel=1e-4)
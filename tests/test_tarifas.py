@@ -0,0 +1,60 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from eventos import eventos_de_json, parcelas_para_colunas
+from motor_amortizacao import PlanoAmortizacao, simular_plano
+from tarifas import COLUNAS_TARIFAS, calcular_tarifas, saldo_anterior, tabela_do_extrato
+
+EXTRATO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'financiamento.json')
+
+
+def conferir_pagas(df):
+    """Tarifas recalculadas das parcelas pagas contra as colunas do extrato."""
+    pagas = df[(df['tipo'] == 'parcela') & (df['situacao_parcela'] == 'Paga')]
+    assert len(pagas) > 0
+    tarifas = calcular_tarifas(tabela_do_extrato(df), pagas['numero'].to_numpy(), saldo_anterior(pagas))
+    for coluna in COLUNAS_TARIFAS:
+        np.testing.assert_allclose(tarifas[coluna], pagas[coluna].to_numpy(dtype=np.float64), rtol=0, atol=1e-9)
+
+
+@pytest.mark.skipif(not os.path.exists(EXTRATO), reason="extrato de exemplo ausente")
+def test_tarifas_reproduzem_parcelas_pagas_do_extrato():
+    with open(EXTRATO, 'r', encoding='utf-8') as f:
+        parcelas, _ = eventos_de_json(json.load(f)["eventos"])
+    df = pd.DataFrame(parcelas_para_colunas(parcelas))
+    df['tipo'] = 'parcela'
+    conferir_pagas(df)
+
+
+def test_tarifas_com_mudanca_de_faixa_e_amortizacoes_no_extrato(cronograma):
+    # MIP com taxa maior a partir da parcela 6 (mudança de faixa etária no meio das pagas)
+    df = cronograma.copy()
+    taxa = np.where(df['numero'] >= 6, 0.00031, 0.00015)
+    df['seguro_mip'] = taxa * saldo_anterior(df)
+    df['seguro_dfi'] = np.linspace(70.0, 75.0, len(df))
+    # Linha de amortização entre parcelas pagas não desloca a tabela
+    amortizacao = df.iloc[[4]].assign(tipo='amortizacao', situacao_parcela='Amortizado', seguro_mip=0.0, seguro_dfi=0.0)
+    df = pd.concat([df.iloc[:5], amortizacao, df.iloc[5:]], ignore_index=True)
+    conferir_pagas(df)
+
+    # Em saldo menor, o MIP segue a taxa da faixa de cada parcela
+    tabela = tabela_do_extrato(df)
+    tarifas = calcular_tarifas(tabela, np.array([5, 6, 360, 400]), np.array([1000.0, 1000.0, 1000.0, -5.0]))
+    np.testing.assert_allclose(tarifas['seguro_mip'], [0.15, 0.31, 0.31, 0.0])
+    # Parcelas além do fim da tabela usam a última linha
+    assert tarifas['seguro_dfi'][3] == pytest.approx(75.0)
+
+
+def test_parcelas_simuladas_levam_as_tarifas_no_valor(cronograma):
+    df = simular_plano(cronograma, PlanoAmortizacao(50000.0, 20, 20, tipo_reducao='parcela'))
+    parcelas = df[df['tipo'] == 'parcela']
+    tarifas = calcular_tarifas(tabela_do_extrato(cronograma), parcelas['numero'].to_numpy(), saldo_anterior(parcelas))
+    np.testing.assert_allclose(parcelas['seguro_mip'], tarifas['seguro_mip'])
+    np.testing.assert_allclose(
+        parcelas['valor_parcela'],
+        parcelas['amortizacao'] + parcelas['juros'] + sum(parcelas[coluna] for coluna in COLUNAS_TARIFAS)
+    )